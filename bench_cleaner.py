@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""正文清理的微基准：比较原来逐条re.sub的清理链和xwlb_text.clean_text
+
+用法：python3 bench_cleaner.py [已保存的文字版文件 ...]
+默认使用仓库中保存的文字版（xwlb_*.txt、latest_xwlb.txt和*新闻联播文字版.txt）。
+"""
+
+import glob
+import re
+import sys
+import time
+
+from xwlb_text import clean_text
+
+
+def legacy_clean(content):
+    """原get_news_content中普通新闻分支的清理链（去重替换改为本意的\\1\\n）"""
+    content = re.sub(r"[\r\n]{3,}", "\n\n", content)
+    content = re.sub(r"编辑：.*?责任编辑：.*?", "", content)
+    content = re.sub(r"刘亮", "", content)
+    content = re.sub(r"编辑：.*?", "", content)
+    content = re.sub(r"责任编辑：.*?", "", content)
+    content = re.sub(r"(.+?)\n\1\n", r"\1\n", content)
+    content = re.sub(r"\n\n+", "\n\n", content).strip()
+    content = re.sub(r"\n\n+", "\n\n", content).strip()
+    content = re.sub(r"央视网消息（新闻联播）：", "", content)
+    return content
+
+
+def load_story_texts(paths):
+    """把文字版按标题拆成单条新闻正文，并加上详情页中常见的来源和编辑信息"""
+    texts = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            sections = re.split(r"^#+ .*$", f.read(), flags=re.M)
+        for section in sections:
+            paragraphs = [p.strip() for p in section.split("\n") if p.strip()]
+            if paragraphs:
+                texts.append("央视网消息（新闻联播）：" + "\n\n".join(paragraphs) + "\n\n编辑：王晓明 责任编辑：刘亮")
+    return texts
+
+
+def bench(func, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+
+def main(paths):
+    if not paths:
+        paths = sorted(set(glob.glob("xwlb_*.txt") + glob.glob("latest_xwlb.txt") + glob.glob("*新闻联播文字版.txt")))
+    texts = load_story_texts(paths)
+    print(f"文件 {len(paths)} 个，正文 {len(texts)} 段，平均 {sum(map(len, texts)) // max(1, len(texts))} 字符")
+
+    # 两者只在原清理链的已知问题上有差异：单独的"责任编辑："会残留"责任"二字
+    differ = sum(1 for text in texts if legacy_clean(text) != clean_text(text))
+    rounds = 50
+    legacy_us = bench(legacy_clean, texts, rounds)
+    new_us = bench(clean_text, texts, rounds)
+    print(f"原清理链     {legacy_us:8.1f} 微秒/段")
+    print(f"clean_text   {new_us:8.1f} 微秒/段  提速 {legacy_us / new_us:.1f}x")
+    print(f"输出不同的段落: {differ}/{len(texts)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""比较不同HTML解析后端：检查提取结果完全一致，并统计每页的解析耗时
+
+用法：python3 bench_parser.py [已保存的新闻详情页HTML文件 ...]
+不提供文件时，用xwlb_20251226.txt中的新闻生成模拟的详情页。
+"""
+
+import sys
+import time
+
+from xwlb_html import available_backends, set_parser_backend
+from xwlb_scraper import parse_news_page, extract_vide_links
+
+BASE_URL = "https://tv.cctv.com"
+# 模拟页面中导航、推荐和页脚的链接数，接近真实详情页的规模
+FILLER_LINKS = 150
+
+
+def load_stories(path="xwlb_20251226.txt"):
+    """从已保存的文字版中读取新闻，返回[(标题, [段落或(小标题, 内容)])]"""
+    stories = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("### "):
+                stories.append((line[4:], []))
+            elif stories and line.startswith("#### "):
+                stories[-1][1].append((line[5:], ""))
+            elif stories and line.strip():
+                items = stories[-1][1]
+                if items and isinstance(items[-1], tuple) and not items[-1][1]:
+                    items[-1] = (items[-1][0], line.strip())
+                else:
+                    items.append(line.strip())
+    return stories
+
+
+def _filler(prefix):
+    links = "".join(f'<li><a href="/2025/12/{i % 28 + 1:02d}/ARTI{prefix}{i:04d}.shtml">推荐内容{i}</a></li>'
+                    for i in range(FILLER_LINKS // 3))
+    return f'<div class="{prefix}"><ul>{links}</ul></div><script>var data_{prefix} = {list(range(200))};</script>'
+
+
+def build_detail_page(title, parts):
+    """用新闻标题和段落生成结构接近央视网详情页的HTML"""
+    body = []
+    for part in parts:
+        if isinstance(part, tuple):
+            body.append(f"<p><strong>{part[0]}</strong></p><p>{part[1]}</p>")
+        else:
+            body.append(f"<p>{part}</p>")
+    body.append("<p>编辑：王晓明 责任编辑：刘亮</p>")
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>[视频]{title}</title>"
+            f"<link rel=\"stylesheet\" href=\"/style.css\">{_filler('head')}</head><body>"
+            f"{_filler('nav')}<div class=\"w1200\"><div class=\"title_area\"><h1>{title}</h1></div>"
+            f"<div id=\"content\"><p>央视网消息（新闻联播）：</p>{''.join(body)}</div></div>"
+            f"{_filler('recommend')}{_filler('footer')}</body></html>")
+
+
+def build_list_page(count=20):
+    """生成包含VIDE链接的新闻列表页"""
+    links = "".join(f'<li><a href="/2025/12/26/VIDE{i:020d}251226.shtml">新闻{i}</a></li>' for i in range(count))
+    return f"<html><head><title>新闻联播</title></head><body>{_filler('nav')}<ul class=\"rililist\">{links}</ul>{_filler('footer')}</body></html>"
+
+
+def time_calls(func, inputs, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in inputs:
+            func(item)
+    return (time.perf_counter() - start) / (rounds * len(inputs))
+
+
+def main(paths):
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                pages.append(f.read())
+    else:
+        pages = [build_detail_page(title, parts) for title, parts in load_stories()]
+    list_pages = [build_list_page()]
+    rounds = 5
+
+    backends = available_backends()
+    print(f"可用的解析后端: {', '.join(backends)}")
+    print(f"详情页 {len(pages)} 个，平均 {sum(len(p) for p in pages) // len(pages)} 字符\n")
+
+    reference = None
+    baseline = None
+    for backend in reversed(backends):  # html.parser作为基准先运行
+        set_parser_backend(backend)
+        results = [parse_news_page(page, f"{BASE_URL}/page{i}.shtml") for i, page in enumerate(pages)]
+        links = [extract_vide_links(page, BASE_URL) for page in list_pages]
+        if reference is None:
+            reference = (results, links)
+            same = "基准"
+        else:
+            same = "一致" if (results, links) == reference else "不一致"
+
+        detail_ms = time_calls(lambda page: parse_news_page(page, BASE_URL), pages, rounds) * 1000
+        list_ms = time_calls(lambda page: extract_vide_links(page, BASE_URL), list_pages, rounds) * 1000
+        if baseline is None:
+            baseline = detail_ms
+        print(f"{backend:12s} 详情页 {detail_ms:7.2f} 毫秒/页  列表页 {list_ms:7.2f} 毫秒/页  "
+              f"提速 {baseline / detail_ms:4.2f}x  输出{same}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""联播快讯切分的最坏情况基准：比较原entry_pattern正则和FlashSegmenter
+
+最坏输入是句子中间不断出现触发词、而句末之后没有触发词的长文本：
+正则在每个触发词处都要向后尝试所有句末边界后才失败，耗时随长度平方增长。
+"""
+
+import re
+import time
+
+from xwlb_segment import FlashSegmenter, LEGACY_ENTRY_PATTERN
+
+
+def worst_case(sentences):
+    """构造最坏输入：每句中间都有触发词，句末之后不是触发词，文本不以句末标点结尾"""
+    return "记者北京报道。" * sentences + "未完"
+
+
+def typical(items):
+    """构造普通的快讯正文：每条以地名开头，由两句话组成"""
+    return "\n\n".join(f"上海今天发布第{i}项措施，支持产业发展。措施自明年起实施。" for i in range(items))
+
+
+def timed(func, text):
+    start = time.perf_counter()
+    result = func(text)
+    return time.perf_counter() - start, result
+
+
+def main():
+    legacy = re.compile(LEGACY_ENTRY_PATTERN, re.DOTALL)
+    segmenter = FlashSegmenter()
+    print(f"{'输入':<12}{'长度':>8}{'正则(毫秒)':>14}{'切分器(毫秒)':>14}{'结果一致':>10}")
+    cases = [("普通", typical(10)), ("普通", typical(200))]
+    cases += [("最坏情况", worst_case(n)) for n in (100, 400, 1600)]
+    for name, text in cases:
+        regex_time, regex_result = timed(legacy.findall, text)
+        seg_time, seg_result = timed(segmenter.split, text)
+        print(f"{name:<12}{len(text):>8}{regex_time * 1000:>14.2f}{seg_time * 1000:>14.2f}"
+              f"{'是' if regex_result == seg_result else '否':>10}")
+
+
+if __name__ == "__main__":
+    main()
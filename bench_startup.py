@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""命令行启动基准：测量xwlb_scraper.py各条路径从解释器启动到退出的时间，并检查是否导入了requests/bs4
+
+    help            --help
+    bad_args        参数错误（--workers x）
+    skip_existing   --date 已有输出的日期 --skip-existing
+    verify          --date 已有输出的日期 --verify
+    verify_archive  --date 只在归档中的日期 --verify --archive
+    offline_scrape  --date --offline，从fixtures/页面组成的缓存完整抓取一天
+
+用法：
+    python3 bench_startup.py                        运行基准，结果写入bench_startup.json
+    python3 bench_startup.py --compare old.json     与之前版本的结果对比
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_suite import FIXTURE_DATE, load_fixtures, percentile
+from xwlb_archive import BroadcastArchive
+from xwlb_cache import ResponseCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRAPER = os.path.join(HERE, "xwlb_scraper.py")
+SAMPLE = os.path.join(HERE, "xwlb_20251226.txt")
+DEFAULT_OUTPUT = "bench_startup.json"
+# 只在归档中的日期（输出目录中没有对应的文件）
+ARCHIVED_DATE = "20251225"
+HEAVY_MODULES = ("requests", "bs4")
+
+
+def prepare(workdir):
+    """准备输出目录、归档和离线缓存，返回各条路径的命令行参数"""
+    output_dir = os.path.join(workdir, "out")
+    os.makedirs(output_dir)
+    shutil.copy(SAMPLE, os.path.join(output_dir, "2025年12月26日新闻联播文字版.txt"))
+    archive_path = os.path.join(workdir, "xwlb.archive")
+    archive = BroadcastArchive(archive_path)
+    with open(SAMPLE, encoding="utf-8") as f:
+        archive.append(ARCHIVED_DATE, f.read().replace(FIXTURE_DATE, ARCHIVED_DATE))
+    archive.close()
+    cache_dir = os.path.join(workdir, "cache")
+    cache = ResponseCache(cache_dir)
+    for _, url, html in load_fixtures()[1]:
+        cache.put(url, html.encode("utf-8"))
+    cache.close()
+    return {
+        "help": ["--help"],
+        "bad_args": ["--workers", "x"],
+        "skip_existing": ["--date", FIXTURE_DATE, "--output-dir", output_dir, "--skip-existing"],
+        "verify": ["--date", FIXTURE_DATE, "--output-dir", output_dir, "--verify"],
+        "verify_archive": ["--date", ARCHIVED_DATE, "--output-dir", output_dir, "--archive", archive_path, "--verify"],
+        "offline_scrape": ["--date", FIXTURE_DATE, "--output-dir", os.path.join(workdir, "scrape"),
+                           "--cache-dir", cache_dir, "--offline"],
+    }
+
+
+def run_once(args, importtime=False):
+    """运行一次命令行，返回(耗时毫秒, 退出码, 标准错误)"""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [SCRAPER] + args
+    start = time.perf_counter()
+    completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return (time.perf_counter() - start) * 1000, completed.returncode, completed.stderr
+
+
+def heavy_imports(stderr):
+    """-X importtime的输出中导入过的重量级模块"""
+    imported = set()
+    for line in stderr.splitlines():
+        name = line.rsplit("|", 1)[-1].strip()
+        if name.split(".")[0] in HEAVY_MODULES:
+            imported.add(name.split(".")[0])
+    return sorted(imported)
+
+
+def run_bench(rounds):
+    workdir = tempfile.mkdtemp(prefix="xwlb_startup_")
+    try:
+        paths = prepare(workdir)
+        results = {}
+        for name, args in paths.items():
+            _, code, stderr = run_once(args, importtime=True)
+            timings = []
+            for _ in range(rounds):
+                if name == "offline_scrape":
+                    shutil.rmtree(os.path.join(workdir, "scrape"), ignore_errors=True)
+                timings.append(run_once(args)[0])
+            timings.sort()
+            results[name] = {"exit_code": code, "heavy_imports": heavy_imports(stderr),
+                             "p50_ms": percentile(timings, 0.5), "p90_ms": percentile(timings, 0.9)}
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_results(results, baseline=None):
+    print(f"{'路径':<16}{'退出码':>6}{'p50(ms)':>10}{'p90(ms)':>10}  导入的重量级模块")
+    for name, result in results.items():
+        line = (f"{name:<16}{result['exit_code']:>6}{result['p50_ms']:>10.1f}{result['p90_ms']:>10.1f}  "
+                f"{', '.join(result['heavy_imports']) or '-'}")
+        if baseline and name in baseline:
+            before = baseline[name]["p50_ms"]
+            line += f"  （之前 {before:.1f}，{(result['p50_ms'] - before) / before * 100:+.0f}%）"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="命令行各条路径的启动到退出时间")
+    parser.add_argument("--rounds", help="每条路径的运行次数，默认10", type=int, default=10)
+    parser.add_argument("--output", help=f"结果文件，默认{DEFAULT_OUTPUT}", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="与之前保存的结果文件对比", default=None)
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = run_bench(args.rounds)
+    print_results(results, baseline)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    print(f"\n结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""离线基准测试：用fixtures/目录中保存的页面测量抓取各阶段的吞吐量和延迟分位数
+
+页面通过离线模式的HttpClient（临时目录中的响应缓存）提供，测量的是真实代码路径，不访问网络：
+    get_news_content   每个详情页的抓取和解析（普通新闻、带/不带加粗标签的国内/国际联播快讯）
+    extract_vide_links 列表页和日期页的链接提取
+    render_document    一天文字版的最终组合
+    end_to_end         get_latest_xwlb_text完整跑一天
+
+用法：
+    python3 bench_suite.py                          运行基准，结果写入bench_results.json
+    python3 bench_suite.py --compare old.json       与之前版本的结果对比
+    python3 bench_suite.py --regenerate-fixtures    用xwlb_20251226.txt重新生成fixtures/
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from bench_parser import _filler, build_detail_page, load_stories
+from xwlb_cache import ResponseCache
+from xwlb_html import get_parser_backend, set_parser_backend, AUTO_BACKEND, PARSER_BACKENDS
+from xwlb_http import HttpClient
+from xwlb_markdown import render_document
+from xwlb_scraper import extract_vide_links, get_latest_xwlb_text, get_news_content
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MANIFEST = "manifest.json"
+DEFAULT_OUTPUT = "bench_results.json"
+BASE_URL = "https://tv.cctv.com"
+FIXTURE_DATE = "20251226"
+HEADERS = {"User-Agent": "Mozilla/5.0 (xwlb bench_suite)"}
+
+
+def _story_url(i):
+    return f"{BASE_URL}/2025/12/26/VIDE{FIXTURE_DATE}story{i:02d}xwlb251226.shtml"
+
+
+def _list_page(title, links):
+    """生成列表页：每条新闻有图片和标题两个链接，前后是导航和页脚"""
+    items = "".join(f'<li><a href="{url[len(BASE_URL):]}"><img src="/img/{i}.jpg"></a>'
+                    f'<a href="{url[len(BASE_URL):]}">{text}</a></li>' for i, (url, text) in enumerate(links))
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title}</title>{_filler('head')}</head>"
+            f"<body>{_filler('nav')}<div class=\"w1200\"><ul class=\"rililist\">{items}</ul></div>"
+            f"{_filler('footer')}</body></html>")
+
+
+def _plain_flash_page(title, parts):
+    """生成不带加粗标签的联播快讯详情页：每个条目只有正文段落，需要靠触发词切分"""
+    return build_detail_page(title, [content for _, content in parts])
+
+
+def regenerate_fixtures(path=FIXTURES_DIR):
+    """用保存的文字版生成结构接近央视网的列表页、日期页和详情页，并写入清单"""
+    stories = load_stories()
+    os.makedirs(path, exist_ok=True)
+    pages = []
+
+    def add(kind, url, name, html):
+        with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        pages.append({"kind": kind, "url": url, "file": name})
+
+    program_url = f"{BASE_URL}/2025/12/26/VIDE0{FIXTURE_DATE}full0xwlb251226.shtml"
+    links = [(program_url, f"《新闻联播》 {FIXTURE_DATE} 19:00")]
+    links += [(_story_url(i), title) for i, (title, _) in enumerate(stories)]
+    add("list", f"{BASE_URL}/lm/xwlb/", "list.html", _list_page("新闻联播_CCTV节目官网", links))
+    add("day", f"{BASE_URL}/lm/xwlb/day/{FIXTURE_DATE}.shtml", f"day_{FIXTURE_DATE}.html",
+        _list_page(f"新闻联播 {FIXTURE_DATE}", links))
+    add("program", program_url, "program.html", build_detail_page(f"《新闻联播》 {FIXTURE_DATE} 19:00", []))
+
+    for i, (title, parts) in enumerate(stories):
+        kind = "story"
+        if "联播快讯" in title:
+            # 国内快讯保留加粗的小标题，国际快讯去掉加粗标签，两种解析分支都有覆盖
+            kind = "flash_bold" if "国内" in title else "flash_plain"
+        html = _plain_flash_page(title, parts) if kind == "flash_plain" else build_detail_page(title, parts)
+        add(kind, _story_url(i), f"story_{i:02d}.html", html)
+
+    # 另一种形式的快讯页：只用于单页解析的基准，不在列表页中
+    for title, parts in stories:
+        if "联播快讯" not in title:
+            continue
+        plain = "国内" in title
+        name = "flash_domestic_plain.html" if plain else "flash_international_bold.html"
+        html = _plain_flash_page(title, parts) if plain else build_detail_page(title, parts)
+        add("flash_plain" if plain else "flash_bold", f"{BASE_URL}/2025/12/26/VIDE{FIXTURE_DATE}{name[:-5]}.shtml",
+            name, html)
+
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"date": FIXTURE_DATE, "pages": pages}, f, ensure_ascii=False, indent=1)
+    return pages
+
+
+def load_fixtures(path=FIXTURES_DIR):
+    """读取清单和页面，返回[(kind, url, html)]"""
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    pages = []
+    for page in manifest["pages"]:
+        with open(os.path.join(path, page["file"]), encoding="utf-8") as f:
+            pages.append((page["kind"], page["url"], f.read()))
+    return manifest["date"], pages
+
+
+def percentile(sorted_values, fraction):
+    """线性插值的分位数"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * fraction
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def measure(func, inputs, rounds):
+    """对每个输入逐次计时，返回每秒处理数和延迟分位数（毫秒）"""
+    func(inputs[0])  # 预热
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in inputs:
+            call_start = time.perf_counter()
+            func(item)
+            latencies.append((time.perf_counter() - call_start) * 1000)
+    total = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "per_second": round(len(latencies) / total, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 4),
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p90_ms": round(percentile(latencies, 0.90), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "max_ms": round(latencies[-1], 4),
+    }
+
+
+def _quiet(func):
+    """屏蔽被测函数的进度输出"""
+    def wrapper(*args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args)
+    return wrapper
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(fixtures_dir=FIXTURES_DIR, rounds=20):
+    """运行全部基准，返回结果字典"""
+    date_key, pages = load_fixtures(fixtures_dir)
+    cache_dir = tempfile.mkdtemp(prefix="xwlb_bench_")
+    try:
+        cache = ResponseCache(cache_dir)
+        for _, url, html in pages:
+            cache.put(url, html.encode("utf-8"), content_type="text/html; charset=utf-8")
+        client = HttpClient(cache=cache, offline=True)
+
+        benchmarks = {}
+        detail_kinds = ("story", "flash_bold", "flash_plain")
+        for kind in detail_kinds:
+            urls = [url for page_kind, url, _ in pages if page_kind == kind]
+            benchmarks[f"get_news_content.{kind}"] = measure(
+                _quiet(lambda url: get_news_content(url, HEADERS, client)), urls, rounds)
+        detail_urls = [url for kind, url, _ in pages if kind in detail_kinds]
+        benchmarks["get_news_content.all"] = measure(
+            _quiet(lambda url: get_news_content(url, HEADERS, client)), detail_urls, rounds)
+
+        for kind in ("list", "day"):
+            htmls = [html for page_kind, _, html in pages if page_kind == kind]
+            benchmarks[f"extract_vide_links.{kind}"] = measure(
+                lambda html: extract_vide_links(html, BASE_URL), htmls, rounds * 5)
+
+        target_date = datetime.strptime(date_key, "%Y%m%d")
+        data = _quiet(get_latest_xwlb_text)(target_date, 1, client)
+        detailed_news = data["detailed_news"]
+        benchmarks["render_document"] = measure(
+            lambda news: render_document(data["date"], news), [detailed_news], rounds * 5)
+        benchmarks["end_to_end"] = measure(
+            _quiet(lambda _: get_latest_xwlb_text(target_date, 1, client)), [None], max(3, rounds // 4))
+        client.close()
+        cache.close()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        "version": 1,
+        "revision": _git_revision(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parser_backend": get_parser_backend(),
+        "rounds": rounds,
+        "fixtures": {"date": date_key, "pages": len(pages), "stories": len(detailed_news)},
+        "benchmarks": benchmarks,
+    }
+
+
+def print_results(results, baseline=None):
+    """打印结果表格；提供baseline时显示p50延迟的变化"""
+    print(f"版本 {results['revision'] or '未知'}  Python {results['python']}  解析后端 {results['parser_backend']}"
+          f"  页面 {results['fixtures']['pages']} 个")
+    header = f"{'基准':<32}{'次/秒':>10}{'p50(毫秒)':>12}{'p90(毫秒)':>12}{'p99(毫秒)':>12}"
+    if baseline:
+        header += f"{'p50变化':>10}"
+    print(header)
+    for name, stats in results["benchmarks"].items():
+        line = f"{name:<32}{stats['per_second']:>10.1f}{stats['p50_ms']:>12.3f}{stats['p90_ms']:>12.3f}{stats['p99_ms']:>12.3f}"
+        old = (baseline or {}).get("benchmarks", {}).get(name)
+        if old and old["p50_ms"]:
+            line += f"{(stats['p50_ms'] / old['p50_ms'] - 1) * 100:>+9.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="基于fixtures/页面的离线基准测试")
+    parser.add_argument("--fixtures", help="页面目录，默认为仓库中的fixtures/", default=FIXTURES_DIR)
+    parser.add_argument("--output", help=f"结果文件，默认{DEFAULT_OUTPUT}", default=DEFAULT_OUTPUT)
+    parser.add_argument("--rounds", help="每个输入的重复次数，默认20", type=int, default=20)
+    parser.add_argument("--compare", help="与之前保存的结果文件对比", default=None)
+    parser.add_argument("--parser", help="HTML解析后端", choices=(AUTO_BACKEND,) + PARSER_BACKENDS, default=AUTO_BACKEND)
+    parser.add_argument("--regenerate-fixtures", help="用保存的文字版重新生成页面", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.regenerate_fixtures:
+        pages = regenerate_fixtures(args.fixtures)
+        print(f"已生成 {len(pages)} 个页面到 {args.fixtures}")
+        return
+    try:
+        set_parser_backend(args.parser)
+    except ValueError as e:
+        parser.error(str(e))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = run_suite(args.fixtures, args.rounds)
+    print_results(results, baseline)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    print(f"\n结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
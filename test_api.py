@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查流式接口：同步和异步版本按顺序产出相同的新闻，write_markdown的输出与命令行生成的文件一致，
+异步版本提前结束时等已经开始的抓取结束后才关闭自己创建的客户端"""
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+from bench_suite import load_fixtures
+from xwlb_api import Story, aiter_broadcast, iter_broadcast, write_markdown
+from xwlb_cache import ResponseCache
+from xwlb_http import HttpClient
+from xwlb_scraper import get_latest_xwlb_text, get_news_content
+
+DATE_KEY, PAGES = load_fixtures()
+
+
+def offline_client(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    return HttpClient(cache=cache, offline=True)
+
+
+def test_sync_and_async_streams(tmp_path):
+    client = offline_client(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stories = list(iter_broadcast(DATE_KEY, client=client, max_workers=4))
+
+        async def collect():
+            return [story async for story in aiter_broadcast(DATE_KEY, client=client, max_workers=4)]
+
+        async_stories = asyncio.run(collect())
+        expected = get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client)
+        path = write_markdown(iter_broadcast(DATE_KEY, client=client), str(tmp_path / "out"))
+    client.close()
+
+    assert [story.index for story in stories] == list(range(len(expected["detailed_news"])))
+    assert {story.date for story in stories} == {"2025-12-26"}
+    assert [story.to_news() for story in stories] == [story.to_news() for story in async_stories]
+    assert [story.to_news() for story in stories] == [
+        {**news, "structured_content": news.get("structured_content")} for news in expected["detailed_news"]]
+    assert any(story.items for story in stories)
+    assert not hasattr(stories[0], "__dict__") and Story.__slots__
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == expected["content"]
+
+
+def test_async_break_waits_before_closing_owned_client(tmp_path):
+    client = offline_client(tmp_path)
+    events = []
+    lock = threading.Lock()
+
+    def slow_fetch(url, headers, client=None):
+        # 第一条新闻立即返回，其余的在迭代结束时还在抓取
+        with lock:
+            first = not events
+            events.append("started")
+        if not first:
+            time.sleep(0.2)
+        news = get_news_content(url, headers, client)
+        with lock:
+            events.append("fetched")
+        return news
+
+    def close():
+        events.append("closed")
+
+    client.close = close
+
+    async def first_story():
+        async for story in aiter_broadcast(DATE_KEY, max_workers=4):
+            return story
+
+    with contextlib.redirect_stdout(io.StringIO()), patch("xwlb_api.HttpClient", lambda pool_size: client), \
+            patch("xwlb_api.get_news_content", slow_fetch):
+        story = asyncio.run(first_story())
+    assert story.index == 0
+    deadline = time.monotonic() + 5
+    while "closed" not in events and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert events[-1] == "closed" and events.count("closed") == 1 and events.count("fetched") == events.count("started")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查单文件归档：按日期随机读取、内容不变时不追加、被中断的追加能恢复（只读打开时不修改归档）、损坏的帧报错而不是被截掉、只从标题行读取文件的日期、导出与原文件一致"""
+
+import contextlib
+import io
+import os
+
+import pytest
+
+from xwlb_archive import ArchiveError, BroadcastArchive, INDEX_ENTRY, archive_file, export_day, pack
+from xwlb_manifest import manifest_path_for
+from xwlb_markdown import render_header
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PATHS = [os.path.join(HERE, "xwlb_20251226.txt"), os.path.join(HERE, "latest_xwlb.txt")]
+with open(SAMPLE_PATHS[0], encoding="utf-8") as f:
+    SAMPLE = f.read()
+
+
+def test_append_read_and_export(tmp_path):
+    path = str(tmp_path / "xwlb.archive")
+    archive = BroadcastArchive(path)
+    for day in range(1, 31):
+        assert archive.append(f"2025-11-{day:02d}", SAMPLE.replace("20251226", f"202511{day:02d}"))
+    assert pack(archive, SAMPLE_PATHS) == (1, 0)
+    assert archive.append("20251101", SAMPLE) is True
+    assert len(archive) == 31 and archive.dates()[0] == "2025-11-01" and "2025年12月26日" in archive
+
+    # 另一个实例（例如另一个进程）能看到新追加的帧，每天只解压自己的帧
+    other = BroadcastArchive(path)
+    assert other.get("20251101") == SAMPLE
+    assert other.get("2025-11-15") == SAMPLE.replace("20251226", "20251115")
+    assert other.get("2024-01-01") is None
+    exported = export_day(other, "20251226", str(tmp_path / "out"))
+    with open(exported, encoding="utf-8") as f:
+        assert f.read() == SAMPLE
+    assert os.path.basename(exported) == "2025年12月26日新闻联播文字版.txt"
+    assert os.path.getsize(path) < len(SAMPLE.encode("utf-8")) * 32 / 2
+    archive.close()
+    other.close()
+
+
+def test_recovers_interrupted_append(tmp_path):
+    path = str(tmp_path / "xwlb.archive")
+    archive = BroadcastArchive(path)
+    archive.append("2025-12-25", SAMPLE + "前一天")
+    archive.append("2025-12-26", SAMPLE)
+    archive.close()
+
+    # 索引最后一条没写上，帧的尾部也残留了半帧
+    with open(path + ".idx", "r+b") as f:
+        f.truncate(INDEX_ENTRY.size)
+    with open(path, "ab") as f:
+        f.write(b"XWF1" + b"\0" * 10)
+
+    size = os.path.getsize(path)
+    # 只读取的进程能读到没写进索引的帧，但不修改归档和索引
+    reader = BroadcastArchive(path, readonly=True)
+    assert reader.dates() == ["2025-12-25", "2025-12-26"]
+    assert reader.get("2025-12-26") == SAMPLE
+    reader.close()
+    archive = BroadcastArchive(path)
+    assert archive.get("2025-12-26") == SAMPLE
+    assert os.path.getsize(path) == size and os.path.getsize(path + ".idx") == INDEX_ENTRY.size
+
+    # 追加时截掉半帧并补全索引
+    assert archive.append("2025-12-27", SAMPLE) and archive.get("2025-12-27") == SAMPLE
+    assert os.path.getsize(path + ".idx") == 3 * INDEX_ENTRY.size
+    assert archive.dates() == ["2025-12-25", "2025-12-26", "2025-12-27"]
+    archive.close()
+
+
+def test_corrupt_frame_is_an_error(tmp_path):
+    path = str(tmp_path / "xwlb.archive")
+    archive = BroadcastArchive(path)
+    archive.append("2025-12-26", SAMPLE)
+    archive.close()
+    with open(path + ".idx", "r+b") as f:
+        f.truncate(0)
+    with open(path, "r+b") as f:
+        f.write(b"XXXX")
+    size = os.path.getsize(path)
+    # 不是帧头的数据不会被当成不完整的尾部截掉
+    for readonly in (True, False):
+        with pytest.raises(ArchiveError):
+            BroadcastArchive(path, readonly=readonly)
+    assert os.path.getsize(path) == size
+
+
+def test_pack_reads_dates_only_from_headers(tmp_path):
+    # 没有日期的标题：开头配图地址中的数字不能被当成日期
+    undated = tmp_path / "新闻联播文字版.txt"
+    undated.write_text(render_header("") + "# 新闻大纲\n- 新闻\n", encoding="utf-8")
+    dated = tmp_path / "latest.txt"
+    dated.write_text(SAMPLE, encoding="utf-8")
+    archive = BroadcastArchive(str(tmp_path / "xwlb.archive"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert pack(archive, [str(undated), str(dated)]) == (1, 1)
+    assert archive.dates() == ["2025-12-26"]
+    archive.close()
+
+
+def test_archive_file_removes_day_outputs(tmp_path):
+    path = str(tmp_path / "2025年12月26日新闻联播文字版.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(SAMPLE)
+    with open(manifest_path_for(path), "w", encoding="utf-8") as f:
+        f.write("{}")
+    assert archive_file(str(tmp_path / "xwlb.archive"), "20251226", path, remove=True)
+    assert sorted(os.listdir(tmp_path)) == ["xwlb.archive", "xwlb.archive.idx"]
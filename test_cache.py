@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查响应缓存：替换记录时总大小正确，超过上限时按最近最少使用淘汰，另一个进程打开同一目录时看到相同的总大小；
+提前结束的流式下载缓存的页面前缀不会返回给需要完整页面的请求；
+往日页面只有在该日结束一段时间后获取的才永不过期"""
+
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from xwlb_cache import CacheEntry, ResponseCache, settled_at
+from xwlb_html import ContentScanner
+from xwlb_http import HttpClient
+
+PAGE = ('<html><head><title>新闻</title></head><body><div id="content"><p>正文</p></div>'
+        + "<p>页面的其余部分</p>" * 20000 + "</body></html>").encode("utf-8")
+
+
+def test_running_total_and_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=3000)
+    for i in range(3):
+        cache.put(f"https://tv.cctv.com/2025/12/26/VIDE{i}.shtml", b"x" * 1000)
+        time.sleep(0.01)
+    cache.put("https://tv.cctv.com/2025/12/26/VIDE1.shtml", b"y" * 500)
+    assert cache.total_bytes() == 2500
+    time.sleep(0.01)
+    cache.get("https://tv.cctv.com/2025/12/26/VIDE0.shtml")
+
+    cache.put("https://tv.cctv.com/2025/12/26/VIDE3.shtml", b"z" * 1000)
+    assert cache.get("https://tv.cctv.com/2025/12/26/VIDE2.shtml") is None
+    assert cache.get("https://tv.cctv.com/2025/12/26/VIDE0.shtml").body == b"x" * 1000
+    assert cache.total_bytes() == 2500
+    other = ResponseCache(str(tmp_path), max_bytes=3000)
+    assert other.total_bytes() == 2500
+    other.close()
+    cache.close()
+
+
+def test_dated_pages_fetched_on_the_day_still_expire(tmp_path):
+    cache = ResponseCache(str(tmp_path), default_ttl=3600)
+    url = "https://tv.cctv.com/2025/12/26/VIDE1.shtml"
+    # 北京时间2025-12-26 20:30获取，当时页面可能还没有更新完
+    on_the_day = CacheEntry(url, b"", None, None, None, 1766752200.0)
+    assert cache.ttl_for(url, on_the_day.fetched_at) == 3600
+    assert not cache.is_fresh(on_the_day)
+    settled = CacheEntry(url, b"", None, None, None, settled_at(date(2025, 12, 26)))
+    assert cache.ttl_for(url, settled.fetched_at) is None
+    assert cache.is_fresh(settled)
+    cache.close()
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        try:
+            self.wfile.write(PAGE)
+        except OSError:
+            # 客户端读到正文后提前关闭了连接
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def test_truncated_responses_are_not_served_as_full_pages(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/2025/12/26/VIDE1.shtml"
+    cache = ResponseCache(str(tmp_path))
+    client = HttpClient(cache=cache, rate_limit=0)
+    try:
+        streamed = client.get(url, stop_when=ContentScanner)
+        assert streamed.truncated and streamed.content == PAGE[:PAGE.index(b"</div>") + 6]
+        assert cache.get(url).partial
+        assert client.get(url, stop_when=ContentScanner).from_cache
+        full = client.get(url)
+        assert not getattr(full, "from_cache", False) and full.content == PAGE
+        assert not cache.get(url).partial
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查跨天的近似重复检测：快讯条目和后续报道指向更早日期的出现，去掉重复后快讯的正文只包含保留的条目，导出仍能按天读回"""
+
+from xwlb_dedup import DuplicateIndex, drop_duplicates, minhash, similarity
+from xwlb_export import append_jsonl, load_records
+
+GDP = "国家统计局今天发布数据，今年前三季度国内生产总值同比增长百分之五点二，经济运行总体平稳、稳中有进，高质量发展扎实推进。"
+MEETING = "中共中央政治局召开会议，研究部署明年经济工作，会议强调要坚持稳中求进工作总基调，完整准确全面贯彻新发展理念。"
+RAIL = "我国高速铁路运营里程突破四万五千公里，覆盖全国百分之九十七的五十万人口以上城市，为群众出行提供更多便利。"
+
+
+def day(date, story, items):
+    return [
+        {"date": date, "story_index": 0, "title": "政治局会议", "url": None, "body": story, "items": None},
+        {"date": date, "story_index": 1, "title": "联播快讯", "url": None,
+         "body": "\n\n".join(title + content for title, content in items),
+         "items": [{"title": title, "content": content} for title, content in items]},
+    ]
+
+
+def test_signature_similarity():
+    edited = GDP.replace("五点二", "五点三").replace("今天", "昨天")
+    assert similarity(minhash(GDP), minhash(edited)) >= 0.7
+    assert similarity(minhash(GDP), minhash(MEETING)) < 0.3
+    assert minhash("太短的文本") is None
+
+
+def test_tags_nearest_previous_occurrence(tmp_path):
+    index = DuplicateIndex(str(tmp_path / "dedup.sqlite3"))
+    first = index.tag_records(day("2025-12-25", MEETING, [("经济数据", GDP)]))
+    assert first[0]["duplicate_of"] is None
+    assert first[1]["items"][0]["duplicate_of"] is None
+
+    second = index.tag_records(day("2025-12-26", MEETING + "会议要求各地区各部门抓好落实。",
+                                   [("经济数据", GDP.replace("今天", "日前")), ("高铁", RAIL)]))
+    assert second[0]["duplicate_of"]["date"] == "2025-12-25"
+    assert second[0]["duplicate_of"]["item_index"] is None
+    assert second[1]["items"][0]["duplicate_of"]["item_index"] == 0
+    assert second[1]["items"][1]["duplicate_of"] is None
+
+    # 重新写入同一天会覆盖原来的记录，且只和更早的日期比较
+    again = index.tag_records(day("2025-12-25", MEETING, [("经济数据", GDP)]))
+    assert again[0]["duplicate_of"] is None
+    assert index.count() == 5
+    index.close()
+
+    # 去掉重复的条目后story_index不连续，同一天重复导出时仍只保留最后一次
+    kept = drop_duplicates(second)
+    assert [record["story_index"] for record in kept] == [1]
+    assert [item["title"] for item in kept[0]["items"]] == ["高铁"]
+    assert kept[0]["body"] == "高铁\n\n" + RAIL
+    path = str(tmp_path / "xwlb.jsonl")
+    append_jsonl(path, kept)
+    append_jsonl(path, kept)
+    assert len(load_records(path)) == 1
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查历史日期链接发现：并行尝试、学到的来源优先、总是失败的来源放到最后，多个进程的学习记录合并保存，以及日期索引查表"""
+
+import contextlib
+import io
+import threading
+import time
+from datetime import datetime
+
+from xwlb_dateindex import DateIndex, parse_data_file, DEFAULT_DATA_URL
+from xwlb_discovery import StrategyCache, discover_date_links, NEGATIVE_AFTER_FAILURES
+
+BASE_URL = "https://tv.cctv.com"
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.encoding = None
+
+
+class FakeClient:
+    """按URL返回预设页面的客户端，每个请求有固定延迟，并记录请求过的URL"""
+
+    def __init__(self, pages, delay=0.05):
+        self.pages = pages
+        self.delay = delay
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None):
+        with self._lock:
+            self.requested.append(url)
+        time.sleep(self.delay)
+        if url in self.pages:
+            return FakeResponse(200, self.pages[url])
+        return FakeResponse(404)
+
+
+def day_page(date_path, count=3):
+    return "".join(f'<a href="/{date_path}/VIDE{i:04d}.shtml">新闻{i}</a>' for i in range(count))
+
+
+def discover(client, day, cache):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return discover_date_links(client, {}, BASE_URL, day, cache)
+
+
+def test_race_and_learned_strategy(tmp_path):
+    day = datetime(2019, 5, 6)
+    pages = {f"{BASE_URL}/2019/05/06/": day_page("2019/05/06")}
+    cache = StrategyCache(str(tmp_path / "discovery.json"))
+
+    client = FakeClient(pages)
+    start = time.perf_counter()
+    links = discover(client, day, cache)
+    elapsed = time.perf_counter() - start
+    assert links == [f"{BASE_URL}/2019/05/06/VIDE{i:04d}.shtml" for i in range(3)]
+    # 五个来源并行请求，总耗时接近一次请求而不是五次
+    assert len(client.requested) == 5
+    assert elapsed < client.delay * 3
+
+    # 同一时期的另一天直接使用学到的来源，只需一次请求；记录保存在磁盘上
+    other = datetime(2019, 5, 20)
+    client = FakeClient({f"{BASE_URL}/2019/05/20/": day_page("2019/05/20")})
+    assert discover(client, other, StrategyCache(str(tmp_path / "discovery.json")))
+    assert client.requested == [f"{BASE_URL}/2019/05/20/"]
+
+
+def test_negative_sources_tried_last():
+    cache = StrategyCache()
+    for _ in range(NEGATIVE_AFTER_FAILURES):
+        cache.record("lm_page", datetime(2020, 1, 1), False)
+    assert cache.is_negative("lm_page")
+
+    day = datetime(2020, 1, 2)
+    client = FakeClient({f"{BASE_URL}/lm/xwlb/day/20200102.shtml": day_page("2020/01/02")})
+    assert discover(client, day, cache)
+    assert f"{BASE_URL}/lm/xwlb/20200102.shtml" not in client.requested
+
+    # 其他来源都失败时仍然会尝试被认为总是失败的来源
+    day = datetime(2020, 1, 3)
+    client = FakeClient({f"{BASE_URL}/lm/xwlb/20200103.shtml": day_page("2020/01/03")})
+    assert discover(client, day, cache)
+    assert client.requested[-1] == f"{BASE_URL}/lm/xwlb/20200103.shtml"
+
+
+def test_processes_merge_learned_sources(tmp_path):
+    path = str(tmp_path / "discovery.json")
+    # 两个回填进程各自打开记录文件，先后保存
+    first, second = StrategyCache(path), StrategyCache(path)
+    first.record("day_page", datetime(2019, 5, 6), True)
+    second.record("date_dir", datetime(2019, 5, 7), True)
+    second.record("lm_page", datetime(2019, 5, 7), False)
+    first.save()
+    second.save()
+    merged = StrategyCache(path)
+    assert merged._eras == {"2019-05": {"day_page": 1, "date_dir": 1}}
+    assert merged._sources == {"day_page": {"successes": 1}, "date_dir": {"successes": 1},
+                               "lm_page": {"failures": 1}}
+    # 再次保存只累加新的计数
+    second.save()
+    assert StrategyCache(path)._eras == merged._eras
+
+
+def test_date_index_lookup_without_list_page(tmp_path):
+    data_js = ('var xwlb_data = [{"date":"20190506","url":"https://tv.cctv.com/lm/xwlb/day/20190506.shtml",'
+               '"vide":"https://tv.cctv.com/2019/05/06/VIDE0abc190506.shtml"},"20190507"];')
+    entries = parse_data_file(data_js)
+    assert entries == {"20190506": [None, "/2019/05/06/VIDE0abc190506.shtml"], "20190507": [None, None]}
+
+    client = FakeClient({DEFAULT_DATA_URL: data_js,
+                         f"{BASE_URL}/lm/xwlb/day/20190507.shtml": day_page("2019/05/07")}, delay=0)
+    index = DateIndex(str(tmp_path / "date_index.json"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        links = index.date_links(client, {}, BASE_URL, datetime(2019, 5, 7))
+    assert links == [f"{BASE_URL}/2019/05/07/VIDE{i:04d}.shtml" for i in range(3)]
+    assert client.requested == [DEFAULT_DATA_URL, f"{BASE_URL}/lm/xwlb/day/20190507.shtml"]
+
+    # 保存的索引可以直接查表，不再请求数据文件
+    reloaded = DateIndex(str(tmp_path / "date_index.json"))
+    assert reloaded.lookup(datetime(2019, 5, 6)) == (f"{BASE_URL}/lm/xwlb/day/20190506.shtml",
+                                                     f"{BASE_URL}/2019/05/06/VIDE0abc190506.shtml")
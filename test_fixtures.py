@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""用fixtures/中保存的页面检查真实的解析代码（替代test_bold_tags.py中复制的逻辑），只解析部分页面的结果与完整解析一致，重新抓取时复用清单，写出的文件导入后与抓取结果一致，以及多线程抓取时做profile不会丢失新闻"""
+
+import contextlib
+import cProfile
+import io
+import os
+import threading
+from datetime import datetime
+from unittest.mock import patch
+
+from bench_suite import BASE_URL, load_fixtures
+from xwlb_cache import ResponseCache
+from xwlb_export import broadcast_records, parse_markdown_archive
+from xwlb_http import HttpClient
+from xwlb_metrics import start_run, stop_run
+from xwlb_html import ContentScanner, content_end, extract_vide_links_from_soup, make_soup
+from xwlb_scraper import extract_vide_links, get_latest_xwlb_text, parse_news_page
+from xwlb_segment import configure_default_segmenter
+
+DATE_KEY, PAGES = load_fixtures()
+
+
+def pages_of(kind):
+    return [(url, html) for page_kind, url, html in PAGES if page_kind == kind]
+
+
+def test_bold_flash_pages_are_structured():
+    for url, html in pages_of("flash_bold"):
+        news = parse_news_page(html, url)
+        assert news["structured_content"]
+        assert news["content"] == "\n\n".join(title + content for title, content in news["structured_content"])
+
+
+def test_plain_flash_pages_are_segmented():
+    for url, html in pages_of("flash_plain"):
+        news = parse_news_page(html, url)
+        assert news["structured_content"] is None
+        assert len(news["content"].split("\n\n")) > 1
+        assert "编辑：" not in news["content"]
+
+
+def test_list_page_links():
+    (url, html), = pages_of("list")
+    links = list(dict.fromkeys(extract_vide_links(html, BASE_URL)))
+    assert links[0] == pages_of("program")[0][0]
+    assert links[1:] == [url for kind, url, _ in PAGES if kind in ("story", "flash_bold", "flash_plain")][:len(links) - 1]
+
+
+def test_partial_parse_matches_full_tree():
+    for kind, url, html in PAGES:
+        assert extract_vide_links(html.encode("utf-8"), BASE_URL) == extract_vide_links_from_soup(html, BASE_URL)
+        if kind in ("story", "flash_bold", "flash_plain"):
+            with patch("xwlb_scraper.make_detail_soup", make_soup):
+                full = parse_news_page(html, url)
+            assert parse_news_page(html, url) == full
+
+
+def test_body_prefix_is_enough():
+    # 流式下载在div#content结束后停止，截取的前缀与完整页面的解析结果相同
+    for url, html in pages_of("story") + pages_of("flash_bold") + pages_of("flash_plain"):
+        data = html.encode("utf-8")
+        end = content_end(data)
+        assert end is not None and content_end(data[:end - 1]) is None
+        assert parse_news_page(data[:end].decode("utf-8"), url) == parse_news_page(html, url)
+        # 逐块增量扫描同一个缓冲区，结果与一次性扫描相同
+        for step in (1, 100, 16 * 1024):
+            scanner, buffer, found = ContentScanner(), bytearray(), None
+            for i in range(0, len(data), step):
+                buffer += data[i:i + step]
+                found = scanner(buffer)
+                if found is not None:
+                    break
+            assert found == end
+
+
+def test_full_day_from_fixtures(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    client = HttpClient(cache=cache, offline=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client)
+    client.close()
+    assert data["date"] == "2025年12月26日"
+    assert len(data["detailed_news"]) == len(pages_of("story")) + 2
+    assert data["content"].count("\n## ") == len(data["detailed_news"])
+
+
+class _ExclusiveProfile(cProfile.Profile):
+    """模拟Python 3.12起的行为：已有一个Profile启用时再启用会抛出ValueError"""
+
+    enabled = 0
+    lock = threading.Lock()
+
+    def enable(self, *args, **kwargs):
+        with self.lock:
+            if _ExclusiveProfile.enabled:
+                raise ValueError("Another profiling tool is already active")
+            _ExclusiveProfile.enabled += 1
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        with self.lock:
+            _ExclusiveProfile.enabled -= 1
+
+
+def test_profile_with_concurrent_workers(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    client = HttpClient(cache=cache, offline=True, pool_size=4)
+    start_run(profile=True)
+    try:
+        with patch("cProfile.Profile", _ExclusiveProfile), contextlib.redirect_stdout(io.StringIO()):
+            data = get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client,
+                                        output_dir=str(tmp_path / "out"))
+    finally:
+        metrics = stop_run()
+        client.close()
+    assert len(data["detailed_news"]) == len(pages_of("story")) + 2
+    assert "parse_news_page" in metrics.write_profile(str(tmp_path / "parse.pstats"))
+
+
+def test_scrape_render_parse_round_trip(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    client = HttpClient(cache=cache, offline=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client,
+                                    output_dir=str(tmp_path / "out"))
+    client.close()
+    scraped = [{**record, "url": None} for record in broadcast_records(DATE_KEY, data["detailed_news"])]
+    with open(data["filename"], encoding="utf-8") as f:
+        imported = parse_markdown_archive(f.read())
+    assert imported == scraped
+    # 两种快讯：有加粗标题的导入为条目，没有的（渲染时推断出"# "标题）导入为正文
+    flashes = [record for record in imported if "联播快讯" in record["title"]]
+    assert sorted(record["items"] is None for record in flashes) == [False, True]
+
+
+def test_rescrape_reuses_manifest(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    contents = []
+    for _ in range(2):
+        client = HttpClient(cache=cache, offline=True)
+        with contextlib.redirect_stdout(io.StringIO()), patch("xwlb_scraper.parse_news_page",
+                                                              wraps=parse_news_page) as parse:
+            data = get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client,
+                                        output_dir=str(tmp_path / "out"))
+        client.close()
+        contents.append(open(data["filename"], encoding="utf-8").read())
+    # 第二次抓取时所有新闻都直接使用清单中的提取结果，输出不变
+    assert parse.call_count == 0
+    assert contents[0] == contents[1]
+
+    # 快讯触发词变化后提取结果可能不同，清单中的记录不再复用
+    configure_default_segmenter(["据报道"])
+    try:
+        client = HttpClient(cache=cache, offline=True)
+        with contextlib.redirect_stdout(io.StringIO()), patch("xwlb_scraper.parse_news_page",
+                                                              wraps=parse_news_page) as parse:
+            get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client,
+                                 output_dir=str(tmp_path / "out"))
+        client.close()
+    finally:
+        configure_default_segmenter()
+    assert parse.call_count == len(pages_of("story")) + 2
+
+
+def test_day_without_stories_is_not_written(tmp_path):
+    # 缓存里只有列表页和完整节目页，单条新闻全部抓取失败：不生成只有开头的文件，回填记为失败
+    cache = ResponseCache(str(tmp_path / "cache"))
+    for kind, url, html in PAGES:
+        if kind in ("list", "program"):
+            cache.put(url, html.encode("utf-8"))
+    client = HttpClient(cache=cache, offline=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client,
+                                    output_dir=str(tmp_path / "out"))
+    client.close()
+    assert data is None
+    assert not [name for name in os.listdir(tmp_path / "out") if name.endswith((".txt", ".part", ".tmp"))]
+
+
+def test_concurrent_scrapes_of_same_day(tmp_path):
+    # 同一天的两个抓取同时写入同一个目录：临时文件互不干扰，两次都成功且最终文件完整
+    cache = ResponseCache(str(tmp_path / "cache"))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    client = HttpClient(cache=cache, offline=True, pool_size=8)
+    results = []
+
+    def scrape():
+        results.append(get_latest_xwlb_text(datetime.strptime(DATE_KEY, "%Y%m%d"), max_workers=4, client=client,
+                                            output_dir=str(tmp_path / "out")))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(5):
+            threads = [threading.Thread(target=scrape) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    client.close()
+    assert len(results) == 10 and all(results)
+    with open(results[0]["filename"], encoding="utf-8") as f:
+        assert f.read().count("\n## ") == len(results[0]["detailed_news"])
+    assert not [name for name in os.listdir(tmp_path / "out") if name.endswith((".part", ".tmp"))]
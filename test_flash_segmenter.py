@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查FlashSegmenter的切分结果与原来的entry_pattern正则完全一致"""
+
+import random
+import re
+
+from xwlb_segment import FlashSegmenter, LEGACY_ENTRY_PATTERN
+
+LEGACY_RE = re.compile(LEGACY_ENTRY_PATTERN, re.DOTALL)
+
+# 随机拼接用的片段：触发词、触发词的一部分、数字和日期形式、句末标点、普通文字和换行
+FRAGMENTS = [
+    "北京", "京", "上海", "国", "国家", "国际", "内蒙古", "蒙古", "联合国", "今天", "近日",
+    "2025年12月26日", "2025年1月", "12025年1月1日", "2025年123月1日", "21条", "1", "条", "年", "月", "日",
+    "记者了解到", "，", "。", "！", "？", "。。", "！？", "\n", " ", "伊朗", "以色列", "黎巴嫩",
+]
+
+
+def flash_corpus(path="xwlb_20251226.txt"):
+    """从保存的文字版中取出联播快讯的条目正文，按快讯备选分支的方式拼接成一段"""
+    corpus = []
+    items = []
+    in_flash = False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("### "):
+                if items:
+                    corpus.append("\n\n".join(items))
+                items = []
+                in_flash = "联播快讯" in line
+            elif in_flash and line and not line.startswith("#"):
+                items.append(line)
+    if items:
+        corpus.append("\n\n".join(items))
+    return corpus
+
+
+def test_matches_regex_on_stored_broadcast():
+    corpus = flash_corpus()
+    assert corpus
+    segmenter = FlashSegmenter()
+    for text in corpus:
+        assert segmenter.split(text) == LEGACY_RE.findall(text)
+
+
+def test_matches_regex_on_random_text():
+    rng = random.Random(20251226)
+    segmenter = FlashSegmenter()
+    for _ in range(20000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 16)))
+        assert segmenter.split(text) == LEGACY_RE.findall(text), repr(text)
+
+
+def test_extra_trigger_words():
+    text = "雄安新区发布新规。北京今天降温。"
+    assert FlashSegmenter().split(text) == ["北京今天降温。"]
+    assert FlashSegmenter(extra_words=["雄安"]).split(text) == ["雄安新区发布新规。", "北京今天降温。"]
+
+
+if __name__ == "__main__":
+    test_matches_regex_on_stored_broadcast()
+    test_matches_regex_on_random_text()
+    test_extra_trigger_words()
+    print("切分结果与正则一致")
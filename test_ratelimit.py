@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查礼貌调度：令牌桶限制速率，正常响应时加速，429减半并遵守Retry-After，HttpClient重试时同样等待，
+共用SharedThrottle的其他调度器（回填的其他进程）同样减速和等待，等待在途名额的时间不算作延迟"""
+
+import multiprocessing
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from xwlb_http import HttpClient
+from xwlb_ratelimit import PolitenessScheduler, SharedThrottle, parse_retry_after, SHARED_POLL_INTERVAL
+
+URL = "http://example.test/page"
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-5") == 0.0
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
+
+
+def test_bucket_aimd_and_retry_after():
+    scheduler = PolitenessScheduler(rate=10, burst=1, max_concurrency=4)
+    start = time.monotonic()
+    for _ in range(5):
+        scheduler.release(scheduler.acquire(URL), 200)
+    assert time.monotonic() - start >= 0.3
+    healthy = scheduler.host_stats("example.test")
+    assert healthy["rate"] > 10 and healthy["limit"] >= 2
+
+    scheduler.release(scheduler.acquire(URL), 429, retry_after=0.3)
+    throttled = scheduler.host_stats("example.test")
+    assert throttled["rate"] < healthy["rate"] / 1.9 and throttled["throttled"] == 1
+    start = time.monotonic()
+    scheduler.release(scheduler.acquire(URL), 200)
+    assert time.monotonic() - start >= 0.25
+
+
+def test_shared_throttle_slows_other_schedulers():
+    with multiprocessing.Manager() as manager:
+        throttle = SharedThrottle(manager)
+        first = PolitenessScheduler(rate=10, burst=1, shared=throttle)
+        second = PolitenessScheduler(rate=10, burst=1, shared=throttle)
+        for _ in range(3):
+            second.release(second.acquire(URL), 200)
+        before = second.host_stats("example.test")["rate"]
+
+        first.release(first.acquire(URL), 429, retry_after=0.3)
+        start = time.monotonic()
+        # 其他调度器最多SHARED_POLL_INTERVAL秒后才会读取共享记录
+        time.sleep(SHARED_POLL_INTERVAL)
+        second.release(second.acquire(URL), 200)
+        assert time.monotonic() - start >= 0.25
+        assert second.host_stats("example.test")["rate"] < before / 1.9
+        # 已经同步过的减速不会重复应用
+        rate = second.host_stats("example.test")["rate"]
+        second.release(second.acquire(URL), 200)
+        assert second.host_stats("example.test")["rate"] > rate
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    calls = []
+
+    def do_GET(self):
+        self.calls.append(time.monotonic())
+        if len(self.calls) == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.4")
+            body = b""
+        else:
+            self.send_response(200)
+            body = b"ok"
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_client_waits_for_retry_after():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = HttpClient(rate_limit=10, backoff_base=0.01)
+    try:
+        response = client.get(f"http://127.0.0.1:{server.server_port}/")
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    assert response.status_code == 200 and response.content == b"ok"
+    first, second = _ThrottlingHandler.calls
+    assert second - first >= 0.3
+    assert client.scheduler.host_stats(f"127.0.0.1:{server.server_port}")["throttled"] == 1
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_inflight_wait_is_not_latency():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    inflight = threading.Semaphore(1)
+    client = HttpClient(rate_limit=10, inflight=inflight)
+    try:
+        client.get(url)
+        # 另一个进程占用唯一的在途名额0.5秒，这段等待不是服务器的延迟
+        inflight.acquire()
+        threading.Timer(0.5, inflight.release).start()
+        assert client.get(url).status_code == 200
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    assert client.scheduler.host_stats(f"127.0.0.1:{server.server_port}")["throttled"] == 0
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查二元组全文索引的检索结果与逐条子串匹配一致，以及两种标题层级的Markdown文字版都能完整解析回记录"""
+
+import os
+import random
+
+from test_flash_segmenter import flash_corpus
+from xwlb_export import iter_markdown_archives, parse_markdown_archive, read_markdown_archive
+from xwlb_markdown import render_document
+from xwlb_search import SearchIndex
+
+
+def sample_records():
+    """把保存的文字版中的快讯正文当作多天的新闻"""
+    records = []
+    for i, body in enumerate(flash_corpus() * 3):
+        records.append({"date": f"2025-12-{10 + i:02d}", "story_index": 0, "title": f"第{i}条新闻",
+                        "url": None, "body": body})
+    return records
+
+
+def test_search_matches_substring(tmp_path):
+    records = sample_records()
+    index = SearchIndex(str(tmp_path / "index.sqlite3"))
+    index.add_records(records)
+    rng = random.Random(20251226)
+    for _ in range(300):
+        body = rng.choice(records)["body"]
+        pos = rng.randrange(len(body))
+        query = body[pos:pos + rng.randint(1, 6)]
+        if not query.strip() or not all("一" <= char <= "鿿" for char in query):
+            continue
+        expected = sorted(r["date"] for r in records if query in r["body"])
+        found = sorted(r["date"] for r in index.search(query, limit=100))
+        assert found == expected, query
+    index.close()
+
+
+def test_reimport_replaces_day(tmp_path):
+    records = sample_records()[:2]
+    index = SearchIndex(str(tmp_path / "index.sqlite3"))
+    index.add_records(records)
+    index.add_records([dict(records[0], body="今天全国大部地区晴。")])
+    assert index.count() == 2
+    assert [r["date"] for r in index.search("大部地区")] == [records[0]["date"]]
+    assert index.search(records[0]["body"][:8], end=records[0]["date"]) == []
+    index.close()
+
+
+def test_markdown_round_trip():
+    news = [
+        {"title": "[视频]西延高铁开通", "url": None, "content": "今天，西延高铁开通。\n\n沿线群众乘车出行。"},
+        {"title": "国内联播快讯", "url": None, "content": "首条快讯内容一。\n\n次条快讯内容二。",
+         "structured_content": [("首条快讯", "内容一。"), ("次条快讯", "内容二。")]},
+    ]
+    records = parse_markdown_archive(render_document("2025年12月26日", news))
+    assert [r["title"] for r in records] == ["西延高铁开通", "国内联播快讯"]
+    assert records[0]["body"] == news[0]["content"]
+    assert records[1]["body"] == "首条快讯内容一。\n\n次条快讯内容二。"
+    assert records[1]["items"] == [{"title": "首条快讯", "content": "内容一。"},
+                                   {"title": "次条快讯", "content": "内容二。"}]
+    assert {r["date"] for r in records} == {"2025-12-26"}
+
+
+def test_legacy_layout_and_parallel_import(tmp_path):
+    legacy = os.path.join(os.path.dirname(os.path.abspath(__file__)), "xwlb_20251226.txt")
+    records = read_markdown_archive(legacy)
+    assert len(records) == 11 and {r["date"] for r in records} == {"2025-12-26"}
+    assert [len(r["items"] or []) for r in records if "快讯" in r["title"]] == [10, 2]
+
+    # 同样的新闻用现在的格式渲染后解析出相同的记录
+    news = [{"title": r["title"], "url": None, "content": r["body"],
+             "structured_content": [(item["title"], item["content"]) for item in r["items"]] if r["items"] else None}
+            for r in records]
+    current = tmp_path / "2025年12月26日新闻联播文字版.txt"
+    current.write_text(render_document("2025年12月26日", news), encoding="utf-8")
+    assert read_markdown_archive(str(current)) == records
+
+    paths = [legacy, str(current)] * 4
+    assert list(iter_markdown_archives(paths, jobs=2, chunksize=1)) == [(path, records) for path in paths]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查服务模式：并发请求同一天（包括同时到达的/latest）只抓取一次，之后从内存返回，重启后从输出目录读取到同样的记录，
+LRU按字节数淘汰"""
+
+import contextlib
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_suite import load_fixtures
+from xwlb_cache import ResponseCache
+from xwlb_http import HttpClient
+from xwlb_serve import Broadcast, BroadcastStore, make_server
+
+DATE_KEY, PAGES = load_fixtures()
+
+
+@contextlib.contextmanager
+def serving(store):
+    server = make_server(store, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def fetch(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_coalesced_scrape_then_memory_and_disk(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    client = HttpClient(cache=cache, offline=True)
+    store = BroadcastStore(client, output_dir=str(tmp_path / "out"))
+    with contextlib.redirect_stdout(io.StringIO()), serving(store) as base:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(fetch, [f"{base}/broadcast/{DATE_KEY}"] * 8))
+        status, data = fetch(f"{base}/broadcast/2025-12-26.json")
+        assert fetch(f"{base}/broadcast/2025-13-40")[0] == 400
+    client.close()
+
+    assert {status for status, _ in results} == {200} and len({body for _, body in results}) == 1
+    assert store.stats["scrapes"] == 1 and store.stats["misses"] == 1
+    assert store.stats["coalesced"] + store.stats["hits"] == 8
+    records = json.loads(data)["records"]
+    assert status == 200 and records[0]["date"] == "2025-12-26"
+
+    # 新的进程（客户端没有任何缓存页面）直接读取输出目录中的文件，不再抓取
+    restarted = BroadcastStore(HttpClient(cache=ResponseCache(str(tmp_path / "empty")), offline=True),
+                               output_dir=str(tmp_path / "out"))
+    assert restarted.get("2025-12-26").markdown == results[0][1]
+    assert restarted.stats["disk_loads"] == 1 and restarted.stats["scrapes"] == 0
+    # 抓取得到的和从文件读取的是同样的JSON
+    assert json.loads(restarted.get("2025-12-26").json)["records"] == records
+
+
+def test_latest_coalesces_with_same_date(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    for _, url, html in PAGES:
+        cache.put(url, html.encode("utf-8"))
+    client = HttpClient(cache=cache, offline=True)
+    store = BroadcastStore(client, output_dir=str(tmp_path / "out"))
+    with contextlib.redirect_stdout(io.StringIO()), serving(store) as base:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(fetch, [f"{base}/latest", f"{base}/broadcast/{DATE_KEY}"] * 4))
+    client.close()
+    assert {status for status, _ in results} == {200} and len({body for _, body in results}) == 1
+    assert store.stats["scrapes"] == 1
+
+
+def test_lru_evicts_by_bytes():
+    store = BroadcastStore(None, max_bytes=2000)
+    for day in ("2020-01-01", "2020-01-02", "2020-01-03"):
+        store._insert(Broadcast(day, "文" * 300, []))
+    store._lookup("2020-01-02")
+    store._insert(Broadcast("2020-01-04", "文" * 300, []))
+    assert list(store._entries) == ["2020-01-02", "2020-01-04"]
+    assert store.format_stats()["bytes"] <= 2000
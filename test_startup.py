@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查命令行的快速路径：--skip-existing/--verify命中已有输出时直接退出，不导入requests和bs4；
+只有开头、没有详细新闻的文件不算已有输出"""
+
+import os
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+
+from xwlb_markdown import render_header
+from xwlb_scraper import find_existing_output
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE = os.path.join(HERE, "xwlb_20251226.txt")
+# 运行命令行后报告requests/bs4是否被导入
+PROBE = ("import runpy, sys\n"
+         "sys.argv = ['xwlb_scraper.py'] + sys.argv[1:]\n"
+         "try:\n"
+         "    runpy.run_path(%r, run_name='__main__')\n"
+         "finally:\n"
+         "    print('HEAVY', sorted(m for m in ('requests', 'bs4') if m in sys.modules))\n"
+         % os.path.join(HERE, "xwlb_scraper.py"))
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, "-c", PROBE] + list(args), capture_output=True, text=True, cwd=HERE)
+
+
+def test_existing_output_short_circuit(tmp_path):
+    shutil.copy(SAMPLE, tmp_path / "2025年12月26日新闻联播文字版.txt")
+    for flag in ("--skip-existing", "--verify"):
+        completed = run_cli("--date", "20251226", "--output-dir", str(tmp_path), flag)
+        assert completed.returncode == 0
+        assert "已有输出" in completed.stdout and "HEAVY []" in completed.stdout
+
+    completed = run_cli("--date", "20251225", "--output-dir", str(tmp_path), "--verify")
+    assert completed.returncode == 1 and "HEAVY []" in completed.stdout
+
+
+def test_header_only_file_is_not_existing_output(tmp_path):
+    day = datetime(2025, 12, 26)
+    path = tmp_path / "2025年12月26日新闻联播文字版.txt"
+    path.write_text(render_header("2025年12月26日"), encoding="utf-8")
+    assert find_existing_output(day, str(tmp_path)) is None
+    shutil.copy(SAMPLE, path)
+    assert find_existing_output(day, str(tmp_path)) == str(path)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""检查监视模式：列表页没有变化时只收到304，变化时只抓取新出现的新闻，链接稳定后重写当天的文件；
+重写时等待当天输出的文件锁，一条新闻都没抓到时播出时段以外用长间隔"""
+
+import contextlib
+import io
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from xwlb_markdown import output_lock
+
+from xwlb_watch import BroadcastWatcher, LIST_URL
+
+BASE_URL = "https://tv.cctv.com"
+PROGRAM_URL = f"{BASE_URL}/2025/12/26/VIDE0program.shtml"
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+        self.encoding = None
+
+
+class FakeClient:
+    """列表页按ETag做条件请求，其余页面直接返回，并记录请求过的URL"""
+
+    def __init__(self):
+        self.stories = []
+        self.requested = []
+
+    def list_page(self):
+        links = [PROGRAM_URL] + [story_url(i) for i in self.stories]
+        return "".join(f'<a href="{link}">链接</a>' for link in links)
+
+    def get(self, url, headers=None, revalidate=False):
+        self.requested.append(url)
+        if url == LIST_URL:
+            etag = f'"{len(self.stories)}"'
+            if (headers or {}).get("If-None-Match") == etag:
+                return FakeResponse(304)
+            return FakeResponse(200, self.list_page(), {"ETag": etag})
+        i = int(url.rsplit("VIDE", 1)[1].split(".")[0])
+        return FakeResponse(200, f'<html><head><title>[视频]第{i}条新闻</title></head><body><div id="content">'
+                                 f'<p>这是第{i}条新闻的正文内容，用来检查增量抓取。</p></div></body></html>')
+
+
+def story_url(i):
+    return f"{BASE_URL}/2025/12/26/VIDE{i:04d}.shtml"
+
+
+def poll(watcher, times=1):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(times):
+            watcher.poll_once()
+
+
+def test_incremental_fetch_and_rewrite(tmp_path):
+    client = FakeClient()
+    client.stories = [0, 1]
+    watcher = BroadcastWatcher(client, output_dir=str(tmp_path), settle_polls=2)
+    output = tmp_path / "2025年12月26日新闻联播文字版.txt"
+
+    poll(watcher)
+    assert client.requested == [LIST_URL, story_url(0), story_url(1)]
+    assert not output.exists()
+
+    # 列表页没有变化时只有条件请求，稳定两次后写出文件
+    client.requested = []
+    poll(watcher, 2)
+    assert client.requested == [LIST_URL, LIST_URL]
+    assert watcher.stats["not_modified"] == 2
+    assert output.read_text(encoding="utf-8").count("\n## ") == 2
+    assert watcher.complete
+
+    # 新发布一条新闻时只抓取这一条，稳定后重写文件
+    client.stories.append(2)
+    client.requested = []
+    poll(watcher, 3)
+    assert client.requested == [LIST_URL, story_url(2), LIST_URL, LIST_URL]
+    assert "第2条新闻" in output.read_text(encoding="utf-8")
+
+    # 重启后从状态文件恢复，不会重新抓取
+    client.requested = []
+    restarted = BroadcastWatcher(client, output_dir=str(tmp_path), settle_polls=2)
+    poll(restarted, 2)
+    assert client.requested == [LIST_URL, LIST_URL]
+    assert restarted.complete and restarted.stats["writes"] == 0
+
+
+def test_poll_schedule():
+    watcher = BroadcastWatcher(FakeClient(), output_dir="unused", poll_interval=60, idle_interval=1800)
+    watcher.date_num, watcher.written, watcher.stable = "20251226", [], watcher.settle_polls
+    assert watcher.complete
+    # 12月27日19:10（北京时间）等待当天的新节目：短间隔
+    assert watcher.next_delay(datetime(2025, 12, 27, 11, 10, tzinfo=timezone.utc)) == 60
+    # 12月27日18:40：长间隔，但不超过播出时段开始的18:55
+    assert watcher.next_delay(datetime(2025, 12, 27, 10, 40, tzinfo=timezone.utc)) == 15 * 60
+    # 12月27日上午：长间隔
+    assert watcher.next_delay(datetime(2025, 12, 27, 2, 0, tzinfo=timezone.utc)) == 1800
+
+    # 列表页中只有完整节目，一条新闻都没有抓到：播出时段外不再按短间隔轮询
+    empty = BroadcastWatcher(FakeClient(), output_dir="unused", poll_interval=60, idle_interval=1800)
+    empty.date_num, empty.stable = "20251227", empty.settle_polls
+    assert not empty.complete
+    assert empty.next_delay(datetime(2025, 12, 27, 11, 10, tzinfo=timezone.utc)) == 60
+    assert empty.next_delay(datetime(2025, 12, 27, 2, 0, tzinfo=timezone.utc)) == 1800
+
+
+def test_rewrite_waits_for_output_lock(tmp_path):
+    client = FakeClient()
+    client.stories = [0]
+    watcher = BroadcastWatcher(client, output_dir=str(tmp_path), settle_polls=1)
+    poll(watcher, 2)
+    output = tmp_path / "2025年12月26日新闻联播文字版.txt"
+    # 另一个写入者（例如同一天的--date抓取）持有锁时，监视模式等它结束后再重写
+    client.stories = [0, 1]
+    with output_lock(str(output)):
+        writer = threading.Thread(target=poll, args=(watcher, 2))
+        writer.start()
+        time.sleep(0.3)
+        assert "第1条新闻" not in output.read_text(encoding="utf-8")
+    writer.join()
+    assert "第1条新闻" in output.read_text(encoding="utf-8")
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""可导入的流式接口：按顺序逐条产出一天的新闻，每条新闻一提取出来就可以使用
+
+    from xwlb_api import iter_broadcast, write_markdown
+    for story in iter_broadcast("20251226"):
+        print(story.index, story.headline)
+
+    async for story in aiter_broadcast("20251226"):
+        ...
+
+新闻用带__slots__的Story和FlashItem表示（没有每个对象的__dict__），同时保存多天的新闻时内存更小。
+Markdown文字版是这个流的一个消费者：write_markdown边接收边写出，输出与命令行生成的文件一致。
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from xwlb_export import normalize_date
+from xwlb_http import HttpClient
+from xwlb_markdown import MarkdownStreamWriter, clean_news_title, output_filename_for
+from xwlb_scraper import (get_news_content, iter_news_contents, resolve_broadcast, DEFAULT_MAX_WORKERS, HEADERS,
+                          MAX_STORIES)
+
+
+class FlashItem:
+    """联播快讯中的一个条目"""
+
+    __slots__ = ("title", "content")
+
+    def __init__(self, title, content):
+        self.title = title
+        self.content = content
+
+    def __repr__(self):
+        return f"FlashItem({self.title!r})"
+
+
+class Story:
+    """一条新闻：index为当天成功提取的新闻中的序号，date为YYYY-MM-DD，
+    items为联播快讯的结构化条目（FlashItem的元组），没有时为None"""
+
+    __slots__ = ("index", "date", "title", "url", "content", "items")
+
+    def __init__(self, index, date, title, url, content, items=None):
+        self.index = index
+        self.date = date
+        self.title = title
+        self.url = url
+        self.content = content
+        self.items = items
+
+    @classmethod
+    def from_news(cls, index, date, news):
+        """从get_news_content返回的字典创建"""
+        items = None
+        if news.get("structured_content"):
+            items = tuple(FlashItem(title, content) for title, content in news["structured_content"])
+        return cls(index, date, news["title"], news.get("url"), news["content"], items)
+
+    @property
+    def headline(self):
+        """去掉[视频]等前缀后的标题，与文字版大纲中的标题一致"""
+        return clean_news_title(self.title)
+
+    def to_news(self):
+        """转换回get_news_content的字典格式（供xwlb_markdown、xwlb_export使用）"""
+        structured = [(item.title, item.content) for item in self.items] if self.items else None
+        return {"title": self.title, "url": self.url, "content": self.content, "structured_content": structured}
+
+    def __repr__(self):
+        return f"Story({self.date} #{self.index} {self.headline!r})"
+
+
+def _parse_date(date):
+    """接受datetime、YYYYMMDD或YYYY-MM-DD，为空时表示最新一天"""
+    if date is None or hasattr(date, "strftime"):
+        return date
+    normalized = normalize_date(str(date))
+    if normalized is None:
+        raise ValueError(f"无法识别的日期: {date}")
+    return datetime.strptime(normalized, "%Y-%m-%d")
+
+
+def _resolve(client, target_date, limit):
+    """找到当天的单条新闻链接，返回(日期YYYY-MM-DD, 链接列表)；找不到时返回(None, [])"""
+    resolved = resolve_broadcast(client, target_date)
+    if resolved is None:
+        return None, []
+    _, links, day = resolved
+    return (day.strftime("%Y-%m-%d") if day else None), links[:limit]
+
+
+def iter_broadcast(date=None, client=None, max_workers=DEFAULT_MAX_WORKERS, limit=MAX_STORIES):
+    """按顺序逐条产出指定日期（为空时为最新一天）的Story，提取失败或没有内容的新闻会被跳过
+
+    各条新闻并发抓取，但每条新闻在它之前的新闻都产出后立即产出，不等整天抓完。
+    client为空时创建一个连接池大小与max_workers一致的客户端，结束时关闭。
+    """
+    target_date = _parse_date(date)
+    owns_client = client is None
+    if owns_client:
+        client = HttpClient(pool_size=max_workers)
+    try:
+        day, links = _resolve(client, target_date, limit)
+        index = 0
+        for news in iter_news_contents(links, HEADERS, max_workers=max_workers, client=client):
+            if news and news["content"]:
+                yield Story.from_news(index, day, news)
+                index += 1
+    finally:
+        if owns_client:
+            client.close()
+
+
+def _close_when_done(client, futures):
+    """已经开始的抓取还在使用客户端的连接池：等它们都结束后（在最后结束的线程中）再关闭客户端
+
+    不在事件循环中等待，提前结束迭代的任务被取消时客户端同样会被关闭。
+    """
+    pending = [future for future in futures if not future.done()]
+    if not pending:
+        client.close()
+        return
+    lock = threading.Lock()
+    remaining = [len(pending)]
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            client.close()
+
+    for future in pending:
+        future.add_done_callback(done)
+
+
+async def aiter_broadcast(date=None, client=None, max_workers=DEFAULT_MAX_WORKERS, limit=MAX_STORIES):
+    """iter_broadcast的异步版本：抓取在线程池中进行，不阻塞事件循环，按顺序逐条产出Story
+
+    提前结束迭代（break或任务被取消）时，还没开始的抓取会被取消；client由本函数创建时，
+    等已经开始的抓取结束后再关闭它。
+    """
+    target_date = _parse_date(date)
+    owns_client = client is None
+    if owns_client:
+        client = HttpClient(pool_size=max_workers)
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = []
+    try:
+        futures.append(executor.submit(_resolve, client, target_date, limit))
+        day, links = await asyncio.wrap_future(futures[0])
+        futures.extend(executor.submit(get_news_content, link, HEADERS, client) for link in links)
+        index = 0
+        for future in futures[1:]:
+            news = await asyncio.wrap_future(future)
+            if news and news["content"]:
+                yield Story.from_news(index, day, news)
+                index += 1
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+        if owns_client:
+            _close_when_done(client, futures)
+
+
+def write_markdown(stories, output_dir=".", date=None):
+    """消费Story流，边接收边写出文字版，返回最终文件路径；没有任何新闻时不生成文件，返回None
+
+    date为空时使用第一条新闻的日期。
+    """
+    writer = None
+    try:
+        for story in stories:
+            if writer is None:
+                day = datetime.strptime(normalize_date(date or story.date), "%Y-%m-%d")
+                date_str = day.strftime("%Y年%m月%d日")
+                writer = MarkdownStreamWriter(os.path.join(output_dir, output_filename_for(date_str))).open(date_str)
+            writer.write_news(story.to_news())
+        return writer.finish() if writer is not None else None
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""单文件归档：每天的文字版作为一个独立压缩的帧追加到同一个文件，配一个紧凑的日期索引
+
+多年的每日文件意味着成千上万个小文件，目录扫描很慢。归档文件只追加，每帧是
+    帧头（FRAME_HEADER：魔数、压缩方式、日期、原始长度、压缩后长度、原始内容的CRC32） + 压缩后的Markdown
+压缩方式为zstd（安装了zstandard时）或gzip，每帧可以单独解压。旁边的<归档>.idx是定长的
+(日期, 偏移, 长度)条目（每天16字节），打开时读入内存；读取某一天时通过mmap只解压它自己的帧。
+同一天再次写入时追加新帧，索引中后出现的条目生效；内容没变时不追加。被中断的追加留下的帧
+在打开时通过扫描帧头补进内存中的索引，不完整的尾部在下一次追加时（持有文件锁）截掉并补全索引文件；
+只读取的进程以只读方式打开，从不修改归档。多个回填进程可以同时追加（用文件锁串行化）。
+
+用法：
+    python3 xwlb_archive.py pack archive/ latest_xwlb.txt --remove   把已有的文字版文件打包进归档
+    python3 xwlb_archive.py export 20251226 --output-dir out         把一天导出为原来的Markdown文件
+    python3 xwlb_archive.py list                                      列出归档中的日期
+    python3 xwlb_archive.py stats                                     统计大小并计时随机读取
+"""
+
+import argparse
+import contextlib
+import fcntl
+import glob
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from xwlb_export import document_date, normalize_date
+from xwlb_manifest import manifest_path_for
+from xwlb_markdown import output_filename_for
+
+# 默认的归档文件，保存在当前目录
+DEFAULT_ARCHIVE_PATH = "xwlb.archive"
+INDEX_SUFFIX = ".idx"
+FRAME_MAGIC = b"XWF1"
+# 魔数、压缩方式、3字节填充、日期(YYYYMMDD整数)、原始长度、压缩后长度、原始内容的CRC32
+FRAME_HEADER = struct.Struct("<4sB3xIIII")
+# 索引条目：日期、帧头的偏移、压缩后长度
+INDEX_ENTRY = struct.Struct("<IQI")
+
+CODEC_GZIP = 0
+CODEC_ZSTD = 1
+CODEC_NAMES = {CODEC_GZIP: "gzip", CODEC_ZSTD: "zstd"}
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 19
+
+
+class ArchiveError(ValueError):
+    """归档文件或帧损坏"""
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def default_codec():
+    """安装了zstandard时使用zstd，否则使用gzip"""
+    return CODEC_ZSTD if _zstd() is not None else CODEC_GZIP
+
+
+def _compress(codec, data):
+    if codec == CODEC_ZSTD:
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(codec, data, size):
+    if codec == CODEC_ZSTD:
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("读取zstd压缩的帧需要zstandard，请先安装：pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+    if codec == CODEC_GZIP:
+        return zlib.decompress(data, 31)
+    raise ArchiveError(f"未知的压缩方式: {codec}")
+
+
+def _date_key(date):
+    """YYYY-MM-DD、YYYYMMDD、YYYY年MM月DD日或datetime转换为索引中的整数YYYYMMDD"""
+    normalized = normalize_date(date)
+    if normalized is None:
+        raise ValueError(f"无法识别的日期: {date}")
+    return int(normalized.replace("-", ""))
+
+
+def _key_date(key):
+    key = str(key)
+    return f"{key[:4]}-{key[4:6]}-{key[6:]}"
+
+
+class BroadcastArchive:
+    """一个归档文件，线程安全；读取通过mmap，只解压请求的那一帧
+
+    readonly为True时只读打开（归档文件必须存在），不创建、不修改归档和索引；
+    被中断的追加留下的不完整尾部只在追加时（持有排他锁）修复，读取时直接忽略。
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH, codec=None, readonly=False):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.codec = default_codec() if codec is None else codec
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        if readonly:
+            self._file = open(path, "rb")
+            try:
+                self._index_file = open(self.index_path, "rb")
+            except FileNotFoundError:
+                # 没有索引时扫描帧头
+                self._index_file = None
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a+b")
+            self._index_file = open(self.index_path, "a+b")
+        self._entries = {}
+        self._indexed_end = 0
+        self._index_size = 0
+        # 上次读入索引时归档文件的大小，以及当时归档和索引是否都没有需要修复的尾部
+        self._size = 0
+        self._clean = True
+        self._mmap = None
+        with self._locked(fcntl.LOCK_SH):
+            self._load_index()
+
+    @contextlib.contextmanager
+    def _locked(self, operation=fcntl.LOCK_EX):
+        """跨进程的文件锁：追加帧和索引条目时持有排他锁，读取索引时持有共享锁"""
+        fcntl.flock(self._file.fileno(), operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _load_index(self, repair=False):
+        """读入索引，并补上索引之后（其他进程追加或被中断的追加）留下的帧
+
+        repair为True时（调用方持有排他锁）截掉索引和归档中不完整的尾部，并把扫描到的帧写入索引。
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        data = b""
+        if self._index_file is not None:
+            self._index_file.seek(0)
+            data = self._index_file.read()
+        count = len(data) // INDEX_ENTRY.size
+        self._entries = {}
+        self._indexed_end = 0
+        valid = 0
+        for key, offset, length in INDEX_ENTRY.iter_unpack(data[:count * INDEX_ENTRY.size]):
+            end = offset + FRAME_HEADER.size + length
+            if end > size:
+                # 索引指向被截断的帧，从这里开始重新扫描
+                break
+            self._entries[key] = (offset, length)
+            self._indexed_end = max(self._indexed_end, end)
+            valid += 1
+        self._index_size = valid * INDEX_ENTRY.size
+        if repair and self._index_size != len(data):
+            self._index_file.truncate(self._index_size)
+        missing = self._scan(size)
+        self._clean = self._index_size == len(data) and not missing and self._indexed_end == size
+        self._size = size
+        if repair:
+            if self._indexed_end < size:
+                self._file.truncate(self._indexed_end)
+                self._size = self._indexed_end
+            if missing:
+                self._index_file.seek(0, os.SEEK_END)
+                self._index_file.write(b"".join(missing))
+                self._index_file.flush()
+                self._index_size += len(missing) * INDEX_ENTRY.size
+            self._clean = True
+
+    def _scan(self, size):
+        """从已索引的末尾开始扫描帧头，把完整的帧补进内存中的索引，返回索引文件中缺少的条目
+
+        停在不完整的尾部（正在进行或被中断的追加）；遇到不是帧头的数据时抛出ArchiveError，不跳过也不截掉。
+        """
+        offset = self._indexed_end
+        missing = []
+        self._file.seek(offset)
+        while offset + FRAME_HEADER.size <= size:
+            header = self._file.read(FRAME_HEADER.size)
+            magic, _, key, _, length, _ = FRAME_HEADER.unpack(header)
+            if magic != FRAME_MAGIC:
+                raise ArchiveError(f"{self.path}偏移{offset}处不是归档帧")
+            if offset + FRAME_HEADER.size + length > size:
+                break
+            self._entries[key] = (offset, length)
+            missing.append(INDEX_ENTRY.pack(key, offset, length))
+            offset += FRAME_HEADER.size + length
+            self._file.seek(offset)
+        self._indexed_end = offset
+        return missing
+
+    def _refresh(self):
+        """其他进程追加了新帧（或修复了尾部）时重新加载索引"""
+        if os.fstat(self._file.fileno()).st_size != self._size:
+            with self._locked(fcntl.LOCK_SH):
+                self._load_index()
+
+    def _view(self, end):
+        """返回覆盖到end的mmap"""
+        if self._mmap is None or len(self._mmap) < end:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _read_frame(self, offset, length):
+        view = self._view(offset + FRAME_HEADER.size + length)
+        magic, codec, _, size, _, crc = FRAME_HEADER.unpack_from(view, offset)
+        if magic != FRAME_MAGIC:
+            raise ArchiveError(f"偏移{offset}处不是归档帧")
+        start = offset + FRAME_HEADER.size
+        data = _decompress(codec, view[start:start + length], size)
+        if zlib.crc32(data) != crc:
+            raise ArchiveError(f"偏移{offset}处的帧校验失败")
+        return data
+
+    def get(self, date):
+        """返回某一天的Markdown文本，归档中没有时返回None"""
+        key = _date_key(date)
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return self._read_frame(*entry).decode("utf-8")
+
+    def append(self, date, text):
+        """追加一天的Markdown文本，返回是否写入（与归档中当天的内容相同时不追加）"""
+        if self.readonly:
+            raise ArchiveError(f"{self.path}以只读方式打开，不能追加")
+        key = _date_key(date)
+        data = text.encode("utf-8")
+        crc = zlib.crc32(data)
+        compressed = _compress(self.codec, data)
+        with self._lock, self._locked():
+            if (not self._clean or os.fstat(self._file.fileno()).st_size != self._size
+                    or os.fstat(self._index_file.fileno()).st_size != self._index_size):
+                self._load_index(repair=True)
+            entry = self._entries.get(key)
+            if entry is not None:
+                _, _, _, size, _, old_crc = FRAME_HEADER.unpack_from(self._view(entry[0] + FRAME_HEADER.size),
+                                                                     entry[0])
+                if size == len(data) and old_crc == crc and self._read_frame(*entry) == data:
+                    return False
+            offset = self._indexed_end
+            self._file.seek(offset)
+            self._file.write(FRAME_HEADER.pack(FRAME_MAGIC, self.codec, key, len(data), len(compressed), crc))
+            self._file.write(compressed)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            # 先写帧再写索引：索引条目没写上时下次打开会扫描帧头补上
+            self._index_file.seek(0, os.SEEK_END)
+            self._index_file.write(INDEX_ENTRY.pack(key, offset, len(compressed)))
+            self._index_file.flush()
+            self._index_size += INDEX_ENTRY.size
+            self._entries[key] = (offset, len(compressed))
+            self._indexed_end = self._size = offset + FRAME_HEADER.size + len(compressed)
+        return True
+
+    def dates(self):
+        """归档中的日期（YYYY-MM-DD），按日期排列"""
+        with self._lock:
+            self._refresh()
+            return [_key_date(key) for key in sorted(self._entries)]
+
+    def __contains__(self, date):
+        with self._lock:
+            self._refresh()
+            return _date_key(date) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def format_stats(self):
+        with self._lock:
+            self._refresh()
+            live = sum(FRAME_HEADER.size + length for _, length in self._entries.values())
+            total = self._indexed_end
+        return (f"{len(self._entries)} 天，文件 {total} 字节（其中被覆盖的旧帧 {total - live} 字节），"
+                f"索引 {len(self._entries) * INDEX_ENTRY.size} 字节，压缩方式 {CODEC_NAMES[self.codec]}")
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._file.close()
+            if self._index_file is not None:
+                self._index_file.close()
+
+
+def archive_file(archive_path, date, path, remove=False):
+    """把一个已写出的文字版文件追加到归档，remove为True时随后删除该文件，返回是否写入"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    archive = BroadcastArchive(archive_path)
+    try:
+        written = archive.append(date, text)
+    finally:
+        archive.close()
+    if remove:
+        remove_output(path)
+    return written
+
+
+def remove_output(path):
+    """删除已归档的文字版文件，以及与它放在一起的抓取清单"""
+    os.remove(path)
+    manifest = manifest_path_for(path)
+    if os.path.exists(manifest):
+        os.remove(manifest)
+
+
+def file_date(path, text):
+    """文字版文件的日期：优先从文件名读取，其次从文件开头的标题行读取，都没有时返回None"""
+    return normalize_date(os.path.basename(path)) or document_date(text)
+
+
+def pack(archive, paths, remove=False):
+    """把文字版文件打包进归档，remove为True时删除已打包的文件，返回(打包的天数, 跳过的文件数)"""
+    added = 0
+    skipped = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        date = file_date(path, text)
+        if date is None:
+            print(f"跳过无法识别日期的文件: {path}")
+            skipped += 1
+            continue
+        if archive.append(date, text):
+            added += 1
+        if remove:
+            remove_output(path)
+    return added, skipped
+
+
+def export_day(archive, date, output_dir="."):
+    """把归档中的一天导出为原来的Markdown文件，返回文件路径；归档中没有该日期时返回None"""
+    text = archive.get(date)
+    if text is None:
+        return None
+    date_str = datetime.strptime(normalize_date(date), "%Y-%m-%d").strftime("%Y年%m月%d日")
+    path = os.path.join(output_dir, output_filename_for(date_str))
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="新闻联播文字版的单文件归档")
+    parser.add_argument("--archive", help=f"归档文件，默认{DEFAULT_ARCHIVE_PATH}", default=DEFAULT_ARCHIVE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    packer = subparsers.add_parser("pack", help="把文字版文件（或目录中的全部文字版）打包进归档")
+    packer.add_argument("paths", nargs="+")
+    packer.add_argument("--remove", help="打包后删除原文件", action="store_true")
+    exporter = subparsers.add_parser("export", help="把一天导出为Markdown文件")
+    exporter.add_argument("date", help="日期（YYYYMMDD）")
+    exporter.add_argument("--output-dir", help="输出目录，默认为当前目录", default=".")
+    subparsers.add_parser("list", help="列出归档中的日期")
+    subparsers.add_parser("stats", help="统计大小并计时随机读取")
+    args = parser.parse_args()
+
+    try:
+        archive = BroadcastArchive(args.archive, readonly=args.command != "pack")
+    except (OSError, ArchiveError) as e:
+        parser.error(str(e))
+    try:
+        if args.command == "pack":
+            paths = []
+            for path in args.paths:
+                if os.path.isdir(path):
+                    paths.extend(sorted(glob.glob(os.path.join(path, "*新闻联播文字版.txt"))))
+                else:
+                    paths.append(path)
+            start_time = time.time()
+            added, skipped = pack(archive, paths, args.remove)
+            print(f"已打包 {added} 天（{len(paths)} 个文件，跳过 {skipped} 个），用时 {time.time() - start_time:.1f} 秒")
+            print(archive.format_stats())
+        elif args.command == "export":
+            path = export_day(archive, args.date, args.output_dir)
+            if path is None:
+                parser.error(f"归档中没有{args.date}")
+            print(f"已导出: {path}")
+        elif args.command == "list":
+            for date in archive.dates():
+                print(date)
+        else:
+            dates = archive.dates()
+            sample = [random.choice(dates) for _ in range(1000)] if dates else []
+            start_time = time.perf_counter()
+            for date in sample:
+                archive.get(date)
+            elapsed = (time.perf_counter() - start_time) * 1000
+            print(archive.format_stats())
+            if sample:
+                print(f"随机读取 {len(sample)} 次，平均 {elapsed / len(sample):.3f} 毫秒")
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    finally:
+        archive.close()
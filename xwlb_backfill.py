@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""按日期范围批量回填新闻联播文字版：多进程并行、限制在途请求数、支持断点续跑"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from xwlb_archive import BroadcastArchive, archive_file
+from xwlb_cache import ResponseCache
+from xwlb_dedup import dedup_records
+from xwlb_dateindex import DateIndex, configure_date_index, DEFAULT_DATA_URL, INDEX_FILENAME
+from xwlb_discovery import configure_strategy_cache, STRATEGY_FILENAME
+from xwlb_export import append_jsonl, broadcast_records
+from xwlb_html import set_parser_backend, get_parser_backend
+from xwlb_http import HttpClient
+from xwlb_ratelimit import SharedThrottle
+from xwlb_search import SearchIndex
+from xwlb_segment import get_default_segmenter, configure_default_segmenter
+from xwlb_scraper import find_existing_output, get_latest_xwlb_text, save_to_file, DEFAULT_MAX_WORKERS
+
+# 默认并行处理的日期数（进程数）
+DEFAULT_JOBS = 4
+# 默认所有进程合计的最大在途请求数
+DEFAULT_MAX_INFLIGHT = 16
+# 进度日志文件名，保存在输出目录下
+JOURNAL_FILENAME = ".xwlb_backfill.journal"
+
+# 子进程内共享的HTTP客户端和抓取参数，由_init_worker初始化
+_worker_client = None
+_worker_options = {}
+
+
+def date_range(start, end):
+    """生成从start到end（包含两端）的所有日期"""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def read_dates_file(path):
+    """从文件中读取日期列表，每行一个YYYYMMDD格式的日期，忽略空行和#开头的注释"""
+    dates = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                dates.append(datetime.strptime(line, "%Y%m%d"))
+    return dates
+
+
+def load_journal(journal_path):
+    """读取进度日志，返回已完成的日期集合（YYYYMMDD格式）"""
+    done = set()
+    if not os.path.exists(journal_path):
+        return done
+    with open(journal_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 被中断的进程可能留下写了一半的行
+                continue
+            if entry.get("status") == "done":
+                done.add(entry["date"])
+            else:
+                done.discard(entry.get("date"))
+    return done
+
+
+def _append_journal(journal, date_key, status, filename=None):
+    entry = {"date": date_key, "status": status, "file": filename, "time": datetime.now().isoformat(timespec="seconds")}
+    journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    # 每条记录立即落盘，被杀掉的任务重启后可以从这里继续
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def _init_worker(inflight, max_workers, client_options, cache_options, output_dir, parser_backend, flash_words,
+                 export_path=None, index_path=None, date_index=None, dedup_path=None, skip_duplicates=False,
+                 archive_path=None, throttle=None):
+    """子进程初始化：创建本进程共享的HTTP客户端，所有进程共用同一个在途请求信号量、减速记录和缓存目录"""
+    global _worker_client, _worker_options
+    set_parser_backend(parser_backend)
+    configure_default_segmenter(flash_words)
+    cache = ResponseCache(**cache_options) if cache_options is not None else None
+    if cache_options is not None:
+        configure_strategy_cache(os.path.join(cache_options["cache_dir"], STRATEGY_FILENAME))
+    if date_index is not None:
+        # 日期索引已由主进程刷新过，子进程只查表，不再请求数据文件
+        configure_date_index(None, date_index[0], auto_refresh=False, dates=date_index[1])
+    _worker_client = HttpClient(pool_size=max_workers, inflight=inflight, cache=cache, shared_throttle=throttle,
+                                **client_options)
+    _worker_options = {"max_workers": max_workers, "output_dir": output_dir, "export_path": export_path,
+                       "index_path": index_path, "dedup_path": dedup_path, "skip_duplicates": skip_duplicates,
+                       "archive_path": archive_path}
+
+
+def _scrape_day(date_key):
+    """在子进程中抓取并保存一天的新闻，返回(日期, 文件路径或None)"""
+    target_date = datetime.strptime(date_key, "%Y%m%d")
+    data = get_latest_xwlb_text(target_date, max_workers=_worker_options["max_workers"], client=_worker_client,
+                                output_dir=_worker_options["output_dir"])
+    if not data:
+        return date_key, None
+    filename = save_to_file(data, output_dir=_worker_options["output_dir"])
+    if filename and (_worker_options["export_path"] or _worker_options["index_path"]):
+        records = broadcast_records(target_date, data["detailed_news"])
+        if _worker_options["export_path"]:
+            exported = records
+            if _worker_options["dedup_path"]:
+                # 只能找到已经处理过的更早日期；各天并行处理，需要严格按日期标记时事后用xwlb_dedup.py tag
+                exported = dedup_records(_worker_options["dedup_path"], records, _worker_options["skip_duplicates"])
+            append_jsonl(_worker_options["export_path"], exported)
+        if _worker_options["index_path"]:
+            # 每天一个事务写入索引，多个进程通过SQLite的文件锁依次写入
+            index = SearchIndex(_worker_options["index_path"])
+            index.add_records(records)
+            index.close()
+    if filename and _worker_options["archive_path"]:
+        # 多个进程通过归档文件的文件锁依次追加
+        archive_file(_worker_options["archive_path"], target_date, filename, remove=True)
+    return date_key, filename
+
+
+def _prepare_date_index(pending, client_options, cache_options, date_index_url):
+    """在主进程中加载日期索引，有待抓取的日期不在索引中时刷新一次，返回传给子进程的(数据文件地址, 索引内容)"""
+    cache = ResponseCache(**cache_options) if cache_options is not None else None
+    path = os.path.join(cache_options["cache_dir"], INDEX_FILENAME) if cache_options is not None else None
+    date_index = DateIndex(path, date_index_url)
+    missing = [date_key for date_key in pending if date_index.lookup(datetime.strptime(date_key, "%Y%m%d")) is None]
+    if missing:
+        client = HttpClient(cache=cache, **(client_options or {}))
+        date_index.lookup_or_refresh(client, datetime.strptime(missing[0], "%Y%m%d"))
+        client.close()
+    if cache is not None:
+        cache.close()
+    found = sum(1 for date_key in pending if date_index.lookup(datetime.strptime(date_key, "%Y%m%d")))
+    print(f"日期索引共 {len(date_index)} 天，覆盖待抓取日期中的 {found} 天")
+    return date_index_url, date_index.snapshot()
+
+
+def run_backfill(dates, output_dir=".", jobs=DEFAULT_JOBS, max_workers=DEFAULT_MAX_WORKERS,
+                 max_inflight=DEFAULT_MAX_INFLIGHT, client_options=None, cache_options=None, journal_path=None,
+                 export_path=None, index_path=None, date_index_url=DEFAULT_DATA_URL, dedup_path=None,
+                 skip_duplicates=False, archive_path=None):
+    """并行回填多个日期的新闻，跳过日志中已完成或已有完整输出文件的日期
+
+    client_options: 传给每个子进程HttpClient的参数（超时、重试、offline等）；rate_limit和max_rate是所有进程合计的速率，
+                    按进程数平分给每个子进程。各进程的调度器共用一个SharedThrottle：任何一个进程遇到403/429/5xx
+                    或Retry-After而减速时，其他进程也同样减速并等待
+    cache_options: 传给每个子进程ResponseCache的参数，为None时不使用缓存
+    export_path: 指定时把每天的新闻作为结构化记录追加到该JSONL文件
+    index_path: 指定时把每天的新闻写入该全文检索索引
+    dedup_path: 指定时用该近似重复索引给导出的记录加上duplicate_of；skip_duplicates为True时不导出近似重复的条目
+    archive_path: 指定时把每天的文字版追加到该单文件归档并删除每天的文件，已在归档中的日期也会跳过
+    date_index_url: 日期索引的数据文件地址；开始前只刷新一次日期索引，子进程直接查表，不再逐日尝试各种来源
+
+    返回统计字典：done/failed/skipped
+    """
+    output_dir = output_dir or "."
+    os.makedirs(output_dir, exist_ok=True)
+    journal_path = journal_path or os.path.join(output_dir, JOURNAL_FILENAME)
+    finished = load_journal(journal_path)
+    archived = set()
+    if archive_path and os.path.exists(archive_path):
+        archive = BroadcastArchive(archive_path, readonly=True)
+        archived = {date.replace("-", "") for date in archive.dates()}
+        archive.close()
+
+    pending = []
+    skipped = 0
+    for day in sorted(set(dates)):
+        date_key = day.strftime("%Y%m%d")
+        # 输出目录中只有开头、没有详细新闻的文件不算已完成
+        if date_key in finished or date_key in archived or find_existing_output(day, output_dir):
+            skipped += 1
+            continue
+        pending.append(date_key)
+
+    print(f"回填共 {len(pending) + skipped} 天，跳过已完成的 {skipped} 天，待抓取 {len(pending)} 天")
+    stats = {"done": 0, "failed": 0, "skipped": skipped}
+    if not pending:
+        return stats
+
+    date_index = _prepare_date_index(pending, client_options, cache_options, date_index_url)
+
+    processes = max(1, min(jobs, len(pending)))
+    worker_client_options = dict(client_options or {})
+    for key in ("rate_limit", "max_rate"):
+        if worker_client_options.get(key):
+            worker_client_options[key] /= processes
+
+    start_time = time.time()
+    with multiprocessing.Manager() as manager, open(journal_path, "a", encoding="utf-8") as journal:
+        inflight = manager.BoundedSemaphore(max(1, max_inflight))
+        throttle = SharedThrottle(manager) if worker_client_options.get("rate_limit") else None
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(inflight, max_workers, worker_client_options, cache_options,
+                                           output_dir, get_parser_backend(),
+                                           get_default_segmenter().extra_words, export_path, index_path,
+                                           date_index, dedup_path, skip_duplicates, archive_path,
+                                           throttle)) as executor:
+            futures = {executor.submit(_scrape_day, date_key): date_key for date_key in pending}
+            for future in as_completed(futures):
+                date_key = futures[future]
+                try:
+                    _, filename = future.result()
+                except Exception as e:
+                    print(f"回填{date_key}时出错: {e}")
+                    filename = None
+                if filename:
+                    stats["done"] += 1
+                    _append_journal(journal, date_key, "done", filename)
+                else:
+                    stats["failed"] += 1
+                    _append_journal(journal, date_key, "failed")
+                print(f"[回填进度] {stats['done'] + stats['failed']}/{len(pending)}，"
+                      f"成功 {stats['done']}，失败 {stats['failed']}，已用时 {time.time() - start_time:.1f} 秒")
+
+    return stats
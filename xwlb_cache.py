@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""HTTP响应的磁盘缓存：按URL保存正文和校验信息（ETag/Last-Modified），按大小做LRU淘汰"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "xwlb_scraper")
+# 默认缓存上限（字节）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# 新闻列表页/lm/xwlb/的有效期（秒），过期后用条件请求重新验证
+DEFAULT_LIST_TTL = 300
+# 不含日期（或日期为今天及以后）的其他页面的有效期（秒）
+DEFAULT_TTL = 3600
+
+# 带日期的页面在该日（北京时间）结束后再过这么久（秒）才视为不再变化
+SETTLE_MARGIN = 12 * 3600
+
+LIST_PAGE_PATH = "/lm/xwlb/"
+BEIJING = timezone(timedelta(hours=8))
+
+# URL中的日期：目录形式 /YYYY/MM/DD/ 或连续的 YYYYMMDD
+_DIR_DATE_RE = re.compile(r"/(\d{4})/(\d{2})/(\d{2})/")
+_NUM_DATE_RE = re.compile(r"(?<!\d)(\d{4})(\d{2})(\d{2})(?!\d)")
+
+
+def url_date(url):
+    """从URL中提取日期，找不到时返回None"""
+    for pattern in (_DIR_DATE_RE, _NUM_DATE_RE):
+        match = pattern.search(url)
+        if match:
+            try:
+                return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            except ValueError:
+                continue
+    return None
+
+
+def settled_at(day):
+    """日期为day的页面不再变化的时间戳：该日北京时间结束后再加SETTLE_MARGIN"""
+    end = datetime.combine(day + timedelta(days=1), dtime(0), tzinfo=BEIJING)
+    return end.timestamp() + SETTLE_MARGIN
+
+
+class CacheEntry:
+    """一条缓存记录"""
+
+    __slots__ = ("url", "body", "etag", "last_modified", "content_type", "fetched_at", "partial")
+
+    def __init__(self, url, body, etag, last_modified, content_type, fetched_at, partial=False):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+        self.fetched_at = fetched_at
+        # 为True时body只是提前结束的流式下载收到的页面前缀
+        self.partial = partial
+
+    def validators(self):
+        """生成条件请求头"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """基于SQLite的持久化响应缓存，线程安全，多个进程可以共用同一个缓存目录"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 list_ttl=DEFAULT_LIST_TTL, default_ttl=DEFAULT_TTL):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "responses.sqlite3")
+        self.max_bytes = max_bytes
+        self.list_ttl = list_ttl
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " body BLOB NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " content_type TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " partial INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        # 总大小保存在单行的cache_meta表中，由触发器随写入和删除更新，淘汰时不必每次对全表求和；
+        # 多个进程共用缓存目录，所以不能只在内存中计数
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+            if "partial" not in columns:
+                # 旧版本的缓存没有partial列，其中的记录都是完整页面
+                self._conn.execute("ALTER TABLE responses ADD COLUMN partial INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cache_meta ("
+                               " id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO cache_meta (id, total_bytes)"
+                               " SELECT 0, COALESCE(SUM(size), 0) FROM responses")
+            self._conn.execute("CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN"
+                               " UPDATE cache_meta SET total_bytes = total_bytes + NEW.size WHERE id = 0; END")
+            self._conn.execute("CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN"
+                               " UPDATE cache_meta SET total_bytes = total_bytes - OLD.size WHERE id = 0; END")
+            self._conn.execute("CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN"
+                               " UPDATE cache_meta SET total_bytes = total_bytes - OLD.size + NEW.size WHERE id = 0; END")
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def ttl_for(self, url, fetched_at):
+        """返回在fetched_at获取的URL的有效期（秒），None表示永不过期"""
+        if url.split("?", 1)[0].endswith(LIST_PAGE_PATH):
+            return self.list_ttl
+        day = url_date(url)
+        if day is not None and fetched_at >= settled_at(day):
+            # 往日的列表页和详情页在当天结束一段时间后才获取的，不会再变化；
+            # 当天或刚结束时获取的可能还缺内容，按默认有效期重新验证
+            return None
+        return self.default_ttl
+
+    def is_fresh(self, entry):
+        ttl = self.ttl_for(entry.url, entry.fetched_at)
+        return ttl is None or time.time() - entry.fetched_at < ttl
+
+    def get(self, url):
+        """读取缓存记录并更新其访问时间，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, content_type, fetched_at, partial FROM responses WHERE url = ?",
+                (url,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+        return CacheEntry(url, row[0], row[1], row[2], row[3], row[4], bool(row[5]))
+
+    def put(self, url, body, etag=None, last_modified=None, content_type=None, partial=False):
+        """写入或替换一条缓存记录，超过大小上限时按最近最少使用淘汰；partial表示body只是页面的前缀"""
+        now = time.time()
+        with self._lock:
+            # 用UPSERT而不是INSERT OR REPLACE：REPLACE删除旧记录时不会触发删除触发器，总大小会算错
+            self._conn.execute(
+                "INSERT INTO responses (url, body, etag, last_modified, content_type, fetched_at, last_access, size,"
+                " partial) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (url) DO UPDATE SET body = excluded.body, etag = excluded.etag,"
+                " last_modified = excluded.last_modified, content_type = excluded.content_type,"
+                " fetched_at = excluded.fetched_at, last_access = excluded.last_access, size = excluded.size,"
+                " partial = excluded.partial",
+                (url, sqlite3.Binary(body), etag, last_modified, content_type, now, now, len(body), int(partial)))
+            self._evict()
+
+    def refresh(self, url, etag=None, last_modified=None):
+        """服务器返回304时更新记录的获取时间（以及新的校验信息）"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ?, last_access = ?,"
+                " etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (now, now, etag, last_modified, url))
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes()
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT total_bytes FROM cache_meta WHERE id = 0").fetchone()[0]
+
+    def _evict(self):
+        """淘汰最近最少使用的记录，直到总大小不超过上限（调用方需持有锁）"""
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        # 按访问时间索引从最旧的记录开始逐行读取，够了就停止
+        rows = self._conn.execute("SELECT url, size FROM responses ORDER BY last_access")
+        stale = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((url,))
+            total -= size
+        rows.close()
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
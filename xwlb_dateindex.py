@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""日期索引：从网站的xwlb_data.js中解析出每一天的日期列表页和完整节目（VIDE0）链接，保存在本地，
+指定日期时直接查表得到当天的列表页，不需要访问最新列表页，也不需要尝试各种来源
+
+索引文件是一个JSON字典：日期(YYYYMMDD) -> [日期列表页路径, 完整节目路径]，
+路径省略域名，日期列表页符合默认格式时记为null。刷新时只合并新出现的日期，
+数据文件本身通过HTTP缓存做条件请求，没有变化时不重新解析。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from xwlb_html import extract_vide_links
+
+BASE_URL = "https://tv.cctv.com"
+# 网站的日期数据文件
+DEFAULT_DATA_URL = f"{BASE_URL}/lm/xwlb/data/xwlb_data.js"
+# 日期列表页的默认格式（从xwlb_data.js中发现）
+DAY_PAGE_TEMPLATE = "/lm/xwlb/day/{date_num}.shtml"
+# 默认的索引文件名，保存在HTTP缓存目录下
+INDEX_FILENAME = "date_index.json"
+# 查不到日期时，距上次刷新超过这么多秒才会重新获取数据文件
+MIN_REFRESH_INTERVAL = 3600
+
+_DAY_URL_RE = re.compile(r"(?:https?://tv\.cctv\.com)?/lm/xwlb/day/(\d{8})\.shtml")
+_PROGRAM_URL_RE = re.compile(r"(?:https?://tv\.cctv\.com)?/(\d{4})/(\d{2})/(\d{2})/VIDE0[0-9A-Za-z]+\.shtml")
+_DATE_RE = re.compile(r"(?<!\d)((?:19|20)\d{6})(?!\d)")
+
+
+def _valid_date(date_num):
+    try:
+        datetime.strptime(date_num, "%Y%m%d")
+    except ValueError:
+        return False
+    return True
+
+
+def _relative(url):
+    return url[len(BASE_URL):] if url.startswith(BASE_URL) else url
+
+
+def parse_data_file(text):
+    """从xwlb_data.js的内容中解析出{日期: [日期列表页路径或None, 完整节目路径或None]}
+
+    不依赖数据文件的具体结构（JS数组、对象或JSON），只识别其中的日期列表页链接、
+    VIDE0完整节目链接和独立出现的YYYYMMDD日期。
+    """
+    entries = {}
+    for match in _DAY_URL_RE.finditer(text):
+        date_num = match.group(1)
+        if _valid_date(date_num):
+            path = _relative(match.group(0))
+            entries.setdefault(date_num, [None, None])[0] = (
+                None if path == DAY_PAGE_TEMPLATE.format(date_num=date_num) else path)
+    for match in _PROGRAM_URL_RE.finditer(text):
+        date_num = "".join(match.groups())
+        if _valid_date(date_num):
+            entries.setdefault(date_num, [None, None])[1] = _relative(match.group(0))
+    for match in _DATE_RE.finditer(text):
+        date_num = match.group(1)
+        if _valid_date(date_num):
+            entries.setdefault(date_num, [None, None])
+    return entries
+
+
+class DateIndex:
+    """日期到日期列表页/完整节目链接的本地索引，path为None时只保存在内存中"""
+
+    def __init__(self, path=None, data_url=DEFAULT_DATA_URL, auto_refresh=True, dates=None):
+        """dates: 直接使用的索引内容（snapshot()的结果），用于把已刷新的索引传给回填子进程"""
+        self.path = path
+        self.data_url = data_url
+        self.auto_refresh = auto_refresh
+        self.updated = 0.0
+        self._dates = dict(dates) if dates is not None else {}
+        self._lock = threading.Lock()
+        if dates is None and path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._dates = data.get("dates", {})
+                self.updated = data.get("updated", 0.0)
+            except (OSError, ValueError):
+                # 损坏的索引直接重新获取
+                pass
+
+    def __len__(self):
+        return len(self._dates)
+
+    def snapshot(self):
+        """返回索引内容的副本"""
+        with self._lock:
+            return {date_num: list(entry) for date_num, entry in self._dates.items()}
+
+    def lookup(self, target_date):
+        """返回(日期列表页URL, 完整节目URL或None)，索引中没有该日期时返回None"""
+        date_num = target_date.strftime("%Y%m%d")
+        entry = self._dates.get(date_num)
+        if entry is None:
+            return None
+        day_path = entry[0] or DAY_PAGE_TEMPLATE.format(date_num=date_num)
+        return BASE_URL + day_path, (BASE_URL + entry[1]) if entry[1] else None
+
+    def refresh(self, client, headers=None):
+        """获取并解析数据文件，把新出现的日期合并到索引中，返回新增的日期数"""
+        response = client.get(self.data_url, headers=headers)
+        if response.status_code != 200:
+            raise LookupError(f"获取日期数据文件失败 (状态码: {response.status_code})")
+        response.encoding = "utf-8"
+        entries = parse_data_file(response.text)
+        added = 0
+        with self._lock:
+            for date_num, (day_path, program_path) in entries.items():
+                entry = self._dates.get(date_num)
+                if entry is None:
+                    self._dates[date_num] = [day_path, program_path]
+                    added += 1
+                elif program_path and not entry[1]:
+                    entry[1] = program_path
+            self.updated = time.time()
+        self.save()
+        return added
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"source": self.data_url, "updated": self.updated,
+                               "dates": dict(sorted(self._dates.items()))},
+                              ensure_ascii=False, separators=(",", ":"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def lookup_or_refresh(self, client, target_date, headers=None):
+        """查表；查不到且允许自动刷新、距上次刷新已超过MIN_REFRESH_INTERVAL时，先刷新再查一次"""
+        found = self.lookup(target_date)
+        if found is not None or not self.auto_refresh or time.time() - self.updated < MIN_REFRESH_INTERVAL:
+            return found
+        try:
+            added = self.refresh(client, headers)
+            print(f"日期索引已刷新，新增 {added} 天，共 {len(self)} 天")
+        except Exception as e:
+            print(f"刷新日期索引失败: {e}")
+            # 失败后同样等待一个刷新间隔，避免每个日期都重新请求
+            self.updated = time.time()
+            return None
+        return self.lookup(target_date)
+
+    def date_links(self, client, headers, base_url, target_date):
+        """用索引找到指定日期的全部VIDE链接（完整节目在最前面），索引中没有或列表页不可用时返回空列表"""
+        found = self.lookup_or_refresh(client, target_date, headers)
+        if found is None:
+            return []
+        day_url, program_url = found
+        date_path = target_date.strftime("%Y/%m/%d")
+        try:
+            response = client.get(day_url, headers=headers)
+            if response.status_code != 200:
+                print(f"日期列表页访问失败 (状态码: {response.status_code}): {day_url}")
+                return []
+            response.encoding = "utf-8"
+            links = [link for link in extract_vide_links(response.content, base_url) if date_path in link]
+        except Exception as e:
+            print(f"访问日期列表页{day_url}时出错: {e}")
+            return []
+        if not links:
+            return []
+        return list(dict.fromkeys(([program_url] if program_url else []) + links))
+
+
+_default_index = DateIndex()
+_default_lock = threading.Lock()
+
+
+def get_date_index():
+    """返回进程内共享的日期索引"""
+    with _default_lock:
+        return _default_index
+
+
+def configure_date_index(path=None, data_url=DEFAULT_DATA_URL, auto_refresh=True, dates=None):
+    """使用指定文件保存日期索引（None表示只保存在内存中）"""
+    global _default_index
+    with _default_lock:
+        _default_index = DateIndex(path, data_url, auto_refresh, dates)
+        return _default_index
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""跨天的近似重复检测：联播快讯条目和后续报道经常在相邻几天几乎原样重复出现
+
+每条普通新闻和每个联播快讯条目按三字组（去掉标点和空白后）计算MinHash签名（32个16位最小哈希值），
+保存在SQLite中。签名分成8段、每段4个值，每段的值作为LSH分桶的键单独建索引：查找时只取出至少有一段
+完全相同的候选，再用签名估计Jaccard相似度，索引增长到多年的条目时每次查找仍在毫秒以内。
+相似度为s的两个单元成为候选的概率是1-(1-s^4)^8，s=0.8时约为98%。
+
+导出时每条记录（联播快讯则是每个条目）增加duplicate_of字段，指向更早日期中最相似的一次出现：
+    {"date": ..., "story_index": ..., "item_index": ..., "title": ..., "similarity": ...}
+没有近似重复时为None。item_index为None表示整条新闻。
+
+用法：
+    python3 xwlb_dedup.py tag xwlb.jsonl xwlb_dedup.jsonl --skip-duplicates   按日期顺序标记已有的导出
+    python3 xwlb_dedup.py stats                                                 统计单元数并计时查找
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import time
+
+from xwlb_export import append_jsonl, load_records
+
+# 默认的签名索引文件，保存在当前目录
+DEFAULT_DEDUP_PATH = "xwlb_dedup.sqlite3"
+# 签名使用的字组长度
+SHINGLE_SIZE = 3
+# 签名长度，以及LSH的分段数和每段的值数（NUM_PERM = BANDS * ROWS）
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# 估计的Jaccard相似度不低于该值时认为是近似重复
+DEFAULT_THRESHOLD = 0.7
+# 去掉标点后少于这么多字的文本不计算签名（太短的文本相似度不可靠）
+MIN_CHARS = 20
+
+_TEXT_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]+|[0-9A-Za-z]+")
+# 每个字组只算一次blake2b，64字节的摘要拆成32个16位的值，相当于32个独立的哈希函数
+_DIGEST = struct.Struct(f"<{NUM_PERM}H")
+
+
+def normalize_text(text):
+    """只保留汉字、字母和数字，英文转为小写"""
+    return "".join(_TEXT_RE.findall(text or "")).lower()
+
+
+def minhash(text):
+    """返回文本的MinHash签名（NUM_PERM个整数的元组），文本太短时返回None"""
+    text = normalize_text(text)
+    if len(text) < MIN_CHARS:
+        return None
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = [_DIGEST.unpack(hashlib.blake2b(shingle.encode("utf-8"), digest_size=64).digest())
+              for shingle in shingles]
+    return tuple(map(min, zip(*hashes)))
+
+
+def similarity(a, b):
+    """用两个签名估计Jaccard相似度"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _band_keys(signature):
+    """每段ROWS个16位值拼成一个64位以内的整数作为分桶的键"""
+    keys = []
+    for band in range(BANDS):
+        key = 0
+        for value in signature[band * ROWS:(band + 1) * ROWS]:
+            key = key << 16 | value
+        # SQLite的INTEGER是有符号64位
+        keys.append(key - (1 << 64) if key >= 1 << 63 else key)
+    return keys
+
+
+def _units(record):
+    """一条记录中参与去重的单元：联播快讯的每个条目，或者整条新闻；返回[(item_index, 标题, 文本, 条目字典)]"""
+    if record.get("items"):
+        return [(index, item["title"], item["title"] + item["content"], item)
+                for index, item in enumerate(record["items"])]
+    return [(None, record["title"], record["title"] + record["body"], record)]
+
+
+class DuplicateIndex:
+    """近似重复索引：units表保存每个单元的签名，bands表保存LSH分桶的键，(band, key)上建索引"""
+
+    def __init__(self, path=DEFAULT_DEDUP_PATH, threshold=DEFAULT_THRESHOLD):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            " id INTEGER PRIMARY KEY,"
+            " date TEXT NOT NULL,"
+            " story_index INTEGER NOT NULL,"
+            " item_index INTEGER,"
+            " title TEXT NOT NULL,"
+            " signature BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS units_date ON units (date)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band INTEGER NOT NULL,"
+            " key INTEGER NOT NULL,"
+            " unit_id INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (band, key)")
+        self._nearest_sql = (
+            "SELECT DISTINCT u.date, u.story_index, u.item_index, u.title, u.signature FROM bands b"
+            " JOIN units u ON u.id = b.unit_id WHERE u.date < ? AND ("
+            + " OR ".join("(b.band = ? AND b.key = ?)" for _ in range(BANDS)) + ")")
+
+    def nearest(self, signature, before_date):
+        """返回before_date之前与签名最相似的一次出现（相似度相同时取日期较近的），没有近似重复时返回None"""
+        start = time.perf_counter()
+        params = [before_date]
+        for band, key in enumerate(_band_keys(signature)):
+            params.extend((band, key))
+        best = None
+        for date, story_index, item_index, title, other in self._conn.execute(self._nearest_sql, params):
+            score = similarity(signature, _DIGEST.unpack(other))
+            if score < self.threshold:
+                continue
+            if best is None or (score, date) > (best["similarity"], best["date"]):
+                best = {"date": date, "story_index": story_index, "item_index": item_index,
+                        "title": title, "similarity": score}
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - start
+        return best
+
+    def _delete_dates(self, dates):
+        """删除指定日期已有的单元（同一天重新写入时覆盖旧内容）"""
+        for date in dates:
+            self._conn.execute("DELETE FROM bands WHERE unit_id IN (SELECT id FROM units WHERE date = ?)", (date,))
+            self._conn.execute("DELETE FROM units WHERE date = ?", (date,))
+
+    def tag_records(self, records):
+        """给记录（xwlb_export的格式）中的每个单元加上duplicate_of，并把它们的签名写入索引
+
+        同一天重新写入时覆盖该天原有的签名；在一个事务中完成，多个回填进程可以同时写入。
+        返回原记录列表（就地修改）。
+        """
+        records = list(records)
+        if not records:
+            return records
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete_dates(dict.fromkeys(record["date"] for record in records))
+            for record in records:
+                for item_index, title, text, target in _units(record):
+                    signature = minhash(text)
+                    target["duplicate_of"] = None
+                    if signature is None:
+                        continue
+                    target["duplicate_of"] = self.nearest(signature, record["date"])
+                    cursor = self._conn.execute(
+                        "INSERT INTO units (date, story_index, item_index, title, signature) VALUES (?, ?, ?, ?, ?)",
+                        (record["date"], record["story_index"], item_index, title, _DIGEST.pack(*signature)))
+                    self._conn.executemany("INSERT INTO bands (band, key, unit_id) VALUES (?, ?, ?)",
+                                           [(band, key, cursor.lastrowid)
+                                            for band, key in enumerate(_band_keys(signature))])
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return records
+
+    def count(self):
+        """返回索引中的单元数"""
+        return self._conn.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+
+    def sample(self, limit=1000):
+        """随机取出最多limit个(日期, 签名)，用于计时查找"""
+        rows = self._conn.execute("SELECT date, signature FROM units ORDER BY RANDOM() LIMIT ?", (limit,))
+        return [(date, _DIGEST.unpack(signature)) for date, signature in rows]
+
+    def format_stats(self):
+        average = self.lookup_seconds / self.lookups * 1000 if self.lookups else 0.0
+        return f"查找 {self.lookups} 次，平均 {average:.3f} 毫秒"
+
+    def close(self):
+        self._conn.close()
+
+
+def drop_duplicates(records):
+    """去掉已标记为近似重复的单元：联播快讯去掉重复的条目（全部重复时去掉整条），其他新闻整条去掉
+
+    去掉了条目的联播快讯用保留下来的条目（标题和内容之间、条目之间空一行）重新生成body。
+    保留原来的story_index，导出中同一天的新闻序号可能不连续。
+    """
+    kept = []
+    for record in records:
+        if record.get("items"):
+            items = [item for item in record["items"] if not item.get("duplicate_of")]
+            if len(items) == len(record["items"]):
+                kept.append(record)
+            elif items:
+                body = "\n\n".join(part for item in items for part in (item["title"], item["content"]) if part)
+                kept.append({**record, "items": items, "body": body})
+        elif not record.get("duplicate_of"):
+            kept.append(record)
+    return kept
+
+
+def dedup_records(path, records, skip_duplicates=False):
+    """用path处的索引标记记录，skip_duplicates为True时去掉近似重复的单元，返回处理后的记录"""
+    index = DuplicateIndex(path)
+    try:
+        records = index.tag_records(records)
+    finally:
+        index.close()
+    return drop_duplicates(records) if skip_duplicates else records
+
+
+def tag_jsonl(index, source, destination, skip_duplicates=False):
+    """按日期顺序标记已导出的JSONL（回填时各天并行处理，顺序不确定，可以事后用这个重新标记）
+
+    返回(输入记录数, 标记为近似重复的单元数, 写出的记录数)
+    """
+    records = load_records(source)
+    days = {}
+    for record in records:
+        days.setdefault(record["date"], []).append(record)
+    duplicates = 0
+    written = 0
+    for date in sorted(days):
+        day = index.tag_records(days[date])
+        duplicates += sum(1 for record in day for *_, target in _units(record) if target.get("duplicate_of"))
+        written += append_jsonl(destination, drop_duplicates(day) if skip_duplicates else day)
+    return len(records), duplicates, written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="新闻联播跨天的近似重复检测")
+    parser.add_argument("--index", help=f"近似重复索引文件，默认{DEFAULT_DEDUP_PATH}", default=DEFAULT_DEDUP_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    tag = subparsers.add_parser("tag", help="按日期顺序标记已导出的JSONL，写入新的JSONL")
+    tag.add_argument("source")
+    tag.add_argument("destination")
+    tag.add_argument("--skip-duplicates", help="不写出近似重复的条目", action="store_true")
+    subparsers.add_parser("stats", help="统计单元数并计时查找")
+    args = parser.parse_args()
+
+    index = DuplicateIndex(args.index)
+    try:
+        if args.command == "tag":
+            if os.path.exists(args.destination):
+                parser.error(f"输出文件已存在: {args.destination}")
+            start_time = time.time()
+            total, duplicates, written = tag_jsonl(index, args.source, args.destination, args.skip_duplicates)
+            print(f"{total} 条记录，{duplicates} 个近似重复单元，写出 {written} 条记录，"
+                  f"用时 {time.time() - start_time:.1f} 秒（{index.format_stats()}）")
+        else:
+            for date, signature in index.sample():
+                index.nearest(signature, date)
+            print(f"{index.count()} 个单元，{index.format_stats()}")
+    except OSError as e:
+        parser.error(str(e))
+    finally:
+        index.close()
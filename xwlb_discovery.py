@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""历史日期的新闻链接发现：并行尝试所有候选来源，采用第一个成功的结果，
+并把每个时期（按月份）用过的成功来源和总是失败的来源记录在磁盘上，之后直接使用学到的来源
+"""
+
+import fcntl
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from xwlb_html import extract_vide_links
+from xwlb_metrics import stage, STAGE_FALLBACK_PROBES
+
+# 候选来源：名称和URL模板，按原来串行尝试的顺序排列
+DISCOVERY_STRATEGIES = (
+    # 正确的历史新闻URL格式，从xwlb_data.js文件中发现
+    ("day_page", "{base_url}/lm/xwlb/day/{date_num}.shtml"),
+    ("data_index", "{base_url}/lm/xwlb/data/index_{date_num}.shtml"),
+    ("data_page", "{base_url}/lm/xwlb/data/{date_num}.shtml"),
+    ("lm_page", "{base_url}/lm/xwlb/{date_num}.shtml"),
+    # 日期目录页
+    ("date_dir", "{base_url}/{date_path}/"),
+)
+
+# 一个来源连续失败这么多次且从未成功过，就认为它总是失败，只在其他来源都失败时才尝试
+NEGATIVE_AFTER_FAILURES = 5
+# 查找学到的来源时，最多参考相差这么多个月的记录
+ERA_SEARCH_MONTHS = 12
+# 默认的学习记录文件名，保存在HTTP缓存目录下
+STRATEGY_FILENAME = "discovery.json"
+
+
+def _era(target_date):
+    return target_date.strftime("%Y-%m")
+
+
+def _month_index(era):
+    year, month = era.split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def _load_counts(path):
+    """读取记录文件，返回(eras, sources)；文件不存在或损坏时返回空记录"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("eras", {}), data.get("sources", {})
+    except (OSError, ValueError):
+        # 损坏的记录文件直接重新学习
+        return {}, {}
+
+
+def _add_counts(target, delta):
+    """把两层字典delta中的计数累加到target中"""
+    for key, counts in delta.items():
+        entry = target.setdefault(key, {})
+        for name, value in counts.items():
+            entry[name] = entry.get(name, 0) + value
+
+
+class StrategyCache:
+    """记录每个时期（YYYY-MM）成功的来源，以及每个来源的失败次数；path为None时只保存在内存中
+
+    多个回填进程共用同一个记录文件：每个进程只记下自己新增的计数，保存时在文件锁下
+    重新读取磁盘上的记录并累加，不会覆盖其他进程在此期间保存的结果。
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._eras, self._sources = _load_counts(path) if path else ({}, {})
+        # 上次保存以来新增的计数
+        self._new_eras = {}
+        self._new_sources = {}
+
+    def preferred(self, target_date):
+        """返回该日期所在时期最可能成功的来源名称：本月的记录优先，否则取最近月份的记录"""
+        month = _month_index(_era(target_date))
+        with self._lock:
+            best = None
+            for era, counts in self._eras.items():
+                distance = abs(_month_index(era) - month)
+                if distance > ERA_SEARCH_MONTHS or not counts:
+                    continue
+                name = max(counts, key=counts.get)
+                key = (distance, -counts[name])
+                if best is None or key < best[0]:
+                    best = (key, name)
+            return best[1] if best else None
+
+    def is_negative(self, name):
+        """来源是否被认为总是失败"""
+        with self._lock:
+            source = self._sources.get(name, {})
+            return not source.get("successes") and source.get("failures", 0) >= NEGATIVE_AFTER_FAILURES
+
+    def record(self, name, target_date, success):
+        key = "successes" if success else "failures"
+        delta_sources = {name: {key: 1}}
+        delta_eras = {_era(target_date): {name: 1}} if success else {}
+        with self._lock:
+            for sources, eras in ((self._sources, self._eras), (self._new_sources, self._new_eras)):
+                _add_counts(sources, delta_sources)
+                _add_counts(eras, delta_eras)
+
+    def save(self):
+        """在文件锁下把新增的计数合并到磁盘上的记录中，原子地替换记录文件"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_path = os.path.join(directory, f".{os.path.basename(self.path)}.lock")
+        with self._lock, open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            eras, sources = _load_counts(self.path)
+            _add_counts(eras, self._new_eras)
+            _add_counts(sources, self._new_sources)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"eras": eras, "sources": sources}, ensure_ascii=False, indent=1))
+            os.replace(tmp_path, self.path)
+            self._eras, self._sources = eras, sources
+            self._new_eras, self._new_sources = {}, {}
+
+
+def _probe(client, headers, url, date_path, base_url):
+    """请求一个候选来源，返回其中属于目标日期的VIDE链接（去重，保持页面顺序）"""
+    with stage(STAGE_FALLBACK_PROBES) as timer:
+        response = client.get(url, headers=headers)
+        if response.status_code != 200:
+            raise LookupError(f"状态码: {response.status_code}")
+        response.encoding = "utf-8"
+        timer.add_bytes(len(response.content))
+        links = [link for link in extract_vide_links(response.content, base_url) if date_path in link]
+        return list(dict.fromkeys(links))
+
+
+def _race(client, headers, candidates, date_path, base_url, cache, target_date):
+    """并行请求多个来源，返回第一个找到链接的(来源名, URL, 链接)，其余请求不再等待"""
+    if not candidates:
+        return None
+    executor = ThreadPoolExecutor(max_workers=len(candidates))
+    try:
+        futures = {executor.submit(_probe, client, headers, url, date_path, base_url): (name, url)
+                   for name, url in candidates}
+        for future in as_completed(futures):
+            name, url = futures[future]
+            try:
+                links = future.result()
+            except LookupError as e:
+                print(f"  {url} 不可用: {e}")
+                links = []
+            except Exception as e:
+                # 网络错误不能说明来源本身不可用，不计入学习记录
+                print(f"  访问{url}时出错: {e}")
+                continue
+            cache.record(name, target_date, bool(links))
+            if links:
+                return name, url, links
+        return None
+    finally:
+        # 已经有结果时不再等待其余请求，尚未开始的请求直接取消
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_cache = StrategyCache()
+_default_lock = threading.Lock()
+
+
+def get_strategy_cache():
+    """返回进程内共享的来源学习记录"""
+    with _default_lock:
+        return _default_cache
+
+
+def configure_strategy_cache(path=None):
+    """使用指定文件保存来源学习记录（None表示只保存在内存中）"""
+    global _default_cache
+    with _default_lock:
+        _default_cache = StrategyCache(path)
+        return _default_cache
+
+
+def discover_date_links(client, headers, base_url, target_date, cache=None):
+    """查找指定日期的新闻链接，返回链接列表（找不到时为空列表）
+
+    先单独尝试该时期学到的来源；失败时并行尝试其余来源，采用第一个成功的结果；
+    被认为总是失败的来源放在最后一轮尝试。
+    """
+    cache = cache or get_strategy_cache()
+    date_path = target_date.strftime("%Y/%m/%d")
+    date_num = target_date.strftime("%Y%m%d")
+    urls = {name: template.format(base_url=base_url, date_num=date_num, date_path=date_path)
+            for name, template in DISCOVERY_STRATEGIES}
+
+    rounds = []
+    preferred = cache.preferred(target_date)
+    if preferred in urls:
+        rounds.append([preferred])
+    remaining = [name for name in urls if name != preferred]
+    rounds.append([name for name in remaining if not cache.is_negative(name)])
+    rounds.append([name for name in remaining if cache.is_negative(name)])
+
+    result = None
+    for names in rounds:
+        if not names:
+            continue
+        print(f"  并行尝试 {len(names)} 个来源: {', '.join(names)}")
+        result = _race(client, headers, [(name, urls[name]) for name in names], date_path, base_url,
+                       cache, target_date)
+        if result:
+            break
+    cache.save()
+
+    if not result:
+        return []
+    name, url, links = result
+    print(f"  从{url}找到 {len(links)} 个{target_date.strftime('%Y年%m月%d日')}的VIDE链接（来源: {name}）")
+    return links
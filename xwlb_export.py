@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""把新闻联播按条导出为结构化记录：追加写入的JSONL，以及可选的Parquet列式文件
+
+每条新闻一条记录：
+    date         日期，YYYY-MM-DD格式（可以直接按字符串比较范围）
+    story_index  当天的第几条新闻，从0开始
+    title        去掉[视频]前缀的标题
+    url          详情页地址
+    body         正文
+    items        联播快讯的结构化条目[{"title": ..., "content": ...}]，其他新闻为None
+    duplicate_of 可选，近似重复检测（xwlb_dedup）找到的更早的一次出现，联播快讯标记在每个条目上
+
+用法：
+    python3 xwlb_export.py to-parquet xwlb.jsonl xwlb.parquet   把多天的JSONL合并为一个Parquet文件
+    python3 xwlb_export.py stats xwlb.jsonl                      统计记录数并计时加载
+    python3 xwlb_export.py import archive/ xwlb.jsonl --jobs 8   把已保存的文字版文件并行解析为记录，追加到JSONL
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+from xwlb_markdown import clean_news_title
+
+_DATE_RE = re.compile(r"(\d{4})\D?(\d{1,2})\D?(\d{1,2})")
+
+
+def normalize_date(value):
+    """把YYYY年MM月DD日、YYYYMMDD、YYYY-MM-DD或datetime统一为YYYY-MM-DD"""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    match = _DATE_RE.search(value or "")
+    if not match:
+        return None
+    year, month, day = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def broadcast_records(date, detailed_news):
+    """把get_latest_xwlb_text返回的detailed_news转换为记录列表"""
+    date = normalize_date(date)
+    records = []
+    for index, news in enumerate(detailed_news):
+        items = None
+        if news.get("structured_content"):
+            items = [{"title": title.strip(), "content": content.strip()}
+                     for title, content in news["structured_content"]]
+        records.append({
+            "date": date,
+            "story_index": index,
+            "title": clean_news_title(news["title"]),
+            "url": news.get("url"),
+            "body": news["content"],
+            "items": items,
+        })
+    return records
+
+
+# 导入文字版时每这么多个文件合并为一次JSONL写入
+IMPORT_BATCH_FILES = 256
+
+_HEADING_RE = re.compile(r"^(#+) (.*)$")
+_ARCHIVE_DATE_RE = re.compile(r"(\d{4})年(\d{2})月(\d{2})日新闻联播文字版")
+# 早期文件的开头："# 《新闻联播》 20251226 19:00"
+_LEGACY_DATE_RE = re.compile(r"《新闻联播》\s*(\d{4})(\d{2})(\d{2})")
+# 大纲和详细内容两个部分的标题：现在的"# 新闻大纲/# 详细新闻"，早期的"## 新闻大纲/## 详细新闻内容"
+_OUTLINE_HEADINGS = ("新闻大纲",)
+_DETAIL_HEADINGS = ("详细新闻", "详细新闻内容")
+
+
+def _fallback_flash_item(heading, text):
+    """还原没有结构化内容的快讯条目：渲染时从条目推断出"# "标题，正文是去掉标题后的部分，
+    标题不是条目开头（截断加"..."、补了"："或默认的"新闻快讯"）时正文是完整的条目"""
+    prefix = heading[:-3] if heading.endswith("...") else heading.rstrip("：")
+    if not text or heading == "新闻快讯" or (prefix and text.startswith(prefix)):
+        return text or heading
+    return heading + text
+
+
+def parse_markdown_lines(lines, date=None):
+    """逐行解析文字版，返回记录列表（没有详情页地址，url为None）；lines可以是打开的文件
+
+    识别两种标题层级：现在的"# 详细新闻"下每个"## "是一条新闻，早期的"## 详细新闻内容"下每个"### "是一条新闻。
+    联播快讯中更深一级的标题是一个条目；现在的格式中快讯没有结构化内容时，每条快讯前推断出的"# "标题
+    不是条目，与抓取时一样把快讯还原为正文（items为None）。
+    date为空时从详细内容之前的"YYYY年MM月DD日新闻联播文字版"或"《新闻联播》 YYYYMMDD"中读取。
+    """
+    stories = []
+    section_level = None
+    in_detail = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if date is None and not in_detail:
+            found = _ARCHIVE_DATE_RE.search(line) or _LEGACY_DATE_RE.search(line)
+            if found:
+                date = "".join(found.groups())
+        if line.startswith("#"):
+            match = _HEADING_RE.match(line)
+            if match:
+                level, heading = len(match.group(1)), match.group(2).strip()
+                if level <= 2 and heading in _OUTLINE_HEADINGS + _DETAIL_HEADINGS:
+                    section_level = level
+                    in_detail = heading in _DETAIL_HEADINGS
+                    continue
+                if in_detail and level == section_level + 1:
+                    stories.append((heading, [], [], []))
+                    continue
+                if in_detail and stories and "联播快讯" in stories[-1][0]:
+                    if level == section_level == 1:
+                        stories[-1][3].append((heading, []))
+                    else:
+                        stories[-1][2].append((heading, []))
+                    continue
+        if not in_detail or not stories:
+            continue
+        _, body_lines, items, fallback = stories[-1]
+        (items[-1][1] if items else fallback[-1][1] if fallback else body_lines).append(line)
+
+    if date is None:
+        return []
+    detailed_news = []
+    for title, body_lines, raw_items, fallback in stories:
+        items = [(item_title, "\n".join(item_lines).strip()) for item_title, item_lines in raw_items]
+        if items:
+            content = "\n\n".join(item_title + body for item_title, body in items)
+        else:
+            parts = ["\n".join(body_lines).strip()]
+            parts.extend(_fallback_flash_item(heading, "\n".join(item_lines).strip())
+                         for heading, item_lines in fallback)
+            content = "\n\n".join(part for part in parts if part)
+        detailed_news.append({"title": title, "url": None, "content": content,
+                              "structured_content": items or None})
+    return broadcast_records(date, detailed_news)
+
+
+def document_date(text):
+    """从文字版大纲之前的标题行（"YYYY年MM月DD日新闻联播文字版"或"《新闻联播》 YYYYMMDD"）读取日期（YYYY-MM-DD），
+    找不到时返回None；不会把配图地址等其他位置的数字当成日期"""
+    for line in text.split("\n"):
+        match = _HEADING_RE.match(line)
+        if match and match.group(2).strip() in _OUTLINE_HEADINGS + _DETAIL_HEADINGS:
+            break
+        found = _ARCHIVE_DATE_RE.search(line) or _LEGACY_DATE_RE.search(line)
+        if found:
+            return normalize_date("".join(found.groups()))
+    return None
+
+
+def parse_markdown_archive(text, date=None):
+    """把一个文字版（xwlb_markdown生成的，或早期"## 详细新闻内容"格式的）解析回记录列表，见parse_markdown_lines"""
+    return parse_markdown_lines(text.split("\n"), date)
+
+
+def read_markdown_archive(path):
+    """逐行读取一个已保存的文字版文件，日期优先从文件名中读取"""
+    match = _ARCHIVE_DATE_RE.search(os.path.basename(path))
+    with open(path, encoding="utf-8") as f:
+        return parse_markdown_lines(f, "".join(match.groups()) if match else None)
+
+
+def iter_markdown_archives(paths, jobs=None, chunksize=16):
+    """并行解析多个文字版文件，按paths的顺序产出(文件路径, 记录列表)，无法识别的文件记录列表为空
+
+    jobs为进程数，默认使用全部CPU；为1时在当前进程中顺序解析。
+    """
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield path, read_markdown_archive(path)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as executor:
+        yield from zip(paths, executor.map(read_markdown_archive, paths, chunksize=chunksize))
+
+
+def archive_paths(paths):
+    """展开目录：目录中所有"*新闻联播文字版.txt"文件，其他路径原样保留"""
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(sorted(glob.glob(os.path.join(path, "*新闻联播文字版.txt"))))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def append_jsonl(path, records):
+    """把一天的记录追加到JSONL文件
+
+    一天的所有行拼成一次O_APPEND写入，多个回填进程同时追加同一个文件时各天的记录不会交错。
+    """
+    if not records:
+        return 0
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return len(records)
+
+
+# append_jsonl写出的每行都以{"date": "YYYY-MM-DD"开头，按日期过滤时不必解析整行
+_LINE_DATE = slice(10, 20)
+
+
+def iter_jsonl(path, start=None, end=None):
+    """逐条读取JSONL记录，跳过被中断的写入留下的不完整行；start/end为YYYY-MM-DD格式的日期范围"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if start or end:
+                date = line[_LINE_DATE]
+                if (start and date < start) or (end and date > end):
+                    continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _latest_per_day(records):
+    """同一天被导出多次时只保留最后一次导出的记录
+
+    一次导出中story_index递增（去掉近似重复后可能不连续），序号不大于前一条时说明是新的一次导出。
+    """
+    days = {}
+    for record in records:
+        day = days.setdefault(record["date"], [])
+        if day and record["story_index"] <= day[-1]["story_index"]:
+            day.clear()
+        day.append(record)
+    return [record for date in sorted(days) for record in days[date]]
+
+
+def _in_range(records, start, end):
+    return [record for record in records
+            if (start is None or record["date"] >= start) and (end is None or record["date"] <= end)]
+
+
+def load_records(path, start=None, end=None):
+    """加载导出的记录（按扩展名识别JSONL或Parquet），可按日期范围过滤，结果按日期和序号排列"""
+    start, end = normalize_date(start) if start else None, normalize_date(end) if end else None
+    if path.endswith(".parquet"):
+        records = read_parquet(path)
+    else:
+        records = _latest_per_day(iter_jsonl(path, start, end))
+    return _in_range(records, start, end)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet导出需要pyarrow，请先安装：pip install pyarrow") from None
+    return pyarrow, pyarrow.parquet
+
+
+def _parquet_schema(pa):
+    duplicate = pa.struct([("date", pa.string()), ("story_index", pa.int32()), ("item_index", pa.int32()),
+                           ("title", pa.string()), ("similarity", pa.float32())])
+    item = pa.struct([("title", pa.string()), ("content", pa.string()), ("duplicate_of", duplicate)])
+    return pa.schema([
+        ("date", pa.string()),
+        ("story_index", pa.int32()),
+        ("title", pa.string()),
+        ("url", pa.string()),
+        ("body", pa.string()),
+        ("items", pa.list_(item)),
+        ("duplicate_of", duplicate),
+    ])
+
+
+def write_parquet(path, records, row_group_size=16384):
+    """把多天的记录按列写入一个Parquet文件（按日期排序，日期列使用字典编码）"""
+    pa, pq = _require_pyarrow()
+    records = sorted(records, key=lambda record: (record["date"], record["story_index"]))
+    table = pa.Table.from_pylist(records, schema=_parquet_schema(pa))
+    pq.write_table(table, path, row_group_size=row_group_size, use_dictionary=["date"], compression="zstd")
+    return len(records)
+
+
+def read_parquet(path):
+    """读取Parquet文件中的记录"""
+    _, pq = _require_pyarrow()
+    return pq.read_table(path).to_pylist()
+
+
+def jsonl_to_parquet(jsonl_path, parquet_path):
+    """把追加写入的JSONL合并为一个Parquet文件，返回写入的记录数"""
+    return write_parquet(parquet_path, load_records(jsonl_path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="新闻联播结构化记录的转换和统计")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("to-parquet", help="把JSONL合并为Parquet文件")
+    convert.add_argument("jsonl")
+    convert.add_argument("parquet")
+    stats = subparsers.add_parser("stats", help="统计记录数并计时加载")
+    stats.add_argument("path")
+    stats.add_argument("--start", help="开始日期（YYYYMMDD）", default=None)
+    stats.add_argument("--end", help="结束日期（YYYYMMDD，包含该日）", default=None)
+    importer = subparsers.add_parser("import", help="把已保存的文字版文件（或目录中的全部文字版）解析为记录，追加到JSONL")
+    importer.add_argument("paths", nargs="+")
+    importer.add_argument("jsonl")
+    importer.add_argument("--jobs", help="并行解析的进程数，默认为CPU数", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "to-parquet":
+            count = jsonl_to_parquet(args.jsonl, args.parquet)
+            print(f"已写入 {count} 条记录到 {args.parquet}")
+        elif args.command == "import":
+            start_time = time.time()
+            paths = archive_paths(args.paths)
+            files = 0
+            count = 0
+            batch = []
+            for path, records in iter_markdown_archives(paths, args.jobs):
+                if not records:
+                    print(f"跳过无法识别的文件: {path}")
+                    continue
+                files += 1
+                batch.extend(records)
+                # 多天合并为一次写入，避免每个文件一次fsync
+                if files % IMPORT_BATCH_FILES == 0:
+                    count += append_jsonl(args.jsonl, batch)
+                    batch = []
+            count += append_jsonl(args.jsonl, batch)
+            print(f"已导入 {files} 个文件，共 {count} 条记录，用时 {time.time() - start_time:.1f} 秒")
+        else:
+            start_time = time.perf_counter()
+            records = load_records(args.path, args.start, args.end)
+            elapsed = (time.perf_counter() - start_time) * 1000
+            days = len({record["date"] for record in records})
+            print(f"{days} 天，{len(records)} 条记录，加载用时 {elapsed:.1f} 毫秒")
+    except (OSError, RuntimeError) as e:
+        parser.error(str(e))
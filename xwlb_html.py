@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""HTML解析后端：安装了lxml时使用lxml构建BeautifulSoup文档树，否则退回到标准库html.parser
+
+详情页只解析<title>和div#content两段：先在原始HTML中找出这两段的范围，只对它们构建文档树；
+列表页的VIDE链接直接用正则从原始内容（str或bytes）中提取，不构建文档树。
+"""
+
+import html as html_lib
+import re
+import threading
+
+
+# 按优先级排列的可选解析后端
+PARSER_BACKENDS = ("lxml", "html.parser")
+AUTO_BACKEND = "auto"
+
+_backend = AUTO_BACKEND
+_resolved_backend = None
+_lock = threading.Lock()
+
+
+def backend_available(name):
+    """检查解析后端是否可用"""
+    if name == "html.parser":
+        return True
+    if name == "lxml":
+        try:
+            import lxml.etree  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    return False
+
+
+def available_backends():
+    """返回当前环境中可用的解析后端列表，按优先级排列"""
+    return [name for name in PARSER_BACKENDS if backend_available(name)]
+
+
+def set_parser_backend(name):
+    """设置解析后端：auto（自动选择最快的可用后端）、lxml或html.parser"""
+    global _backend, _resolved_backend
+    if name != AUTO_BACKEND:
+        if name not in PARSER_BACKENDS:
+            raise ValueError(f"未知的HTML解析后端: {name}，可选: {', '.join((AUTO_BACKEND,) + PARSER_BACKENDS)}")
+        if not backend_available(name):
+            raise ValueError(f"HTML解析后端{name}不可用，请先安装对应的库")
+    with _lock:
+        _backend = name
+        _resolved_backend = None
+
+
+def get_parser_backend():
+    """返回当前实际使用的解析后端名称"""
+    global _resolved_backend
+    with _lock:
+        if _resolved_backend is None:
+            _resolved_backend = available_backends()[0] if _backend == AUTO_BACKEND else _backend
+        return _resolved_backend
+
+
+def make_soup(markup, backend=None):
+    """用指定（默认为当前）的解析后端构建BeautifulSoup文档树"""
+    # bs4在第一次构建文档树时才导入，只用正则快速路径或不解析页面的命令行路径不需要它
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(markup, backend or get_parser_backend())
+
+
+# 注释、脚本和样式中的内容不是文档树的一部分，预扫描时需要跳过
+_SKIP_PATTERN = r"<!--.*?(?:-->|$)|<script\b.*?(?:</script\s*>|$)|<style\b.*?(?:</style\s*>|$)"
+_TITLE_PATTERN = r"<title\b[^>]*>.*?</title\s*>"
+_CONTENT_DIV_PATTERN = r"""<div\b[^>]*?\sid\s*=\s*(?:"content"|'content'|content(?=[\s/>]))[^>]*>"""
+_DIV_TAG_PATTERN = _SKIP_PATTERN + r"|<(/?)div\b[^>]*>"
+_LINK_PATTERN = _SKIP_PATTERN + r"""|<a\s[^>]*?(?<![\w-])href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))"""
+
+
+def _compile(pattern):
+    """同一个正则分别编译str和bytes两个版本，预扫描可以直接处理原始响应内容"""
+    return {str: re.compile(pattern, re.I | re.S), bytes: re.compile(pattern.encode(), re.I | re.S)}
+
+
+_SKIP_RE = _compile(_SKIP_PATTERN)
+_TITLE_RE = _compile(_TITLE_PATTERN)
+_CONTENT_DIV_RE = _compile(_CONTENT_DIV_PATTERN)
+_DIV_TAG_RE = _compile(_DIV_TAG_PATTERN)
+_LINK_RE = _compile(_LINK_PATTERN)
+
+
+def _skipped(html, pos):
+    """pos是否位于注释、脚本或样式之中"""
+    for match in _SKIP_RE[type(html)].finditer(html):
+        if match.start() > pos:
+            return False
+        if pos < match.end():
+            return True
+    return False
+
+
+# 增量扫描用到的标记：注释、脚本和样式的开头，以及div的开闭标签；跳过区域的结束标记按开头分别查找
+# （分组1～3对应_SKIP_END_RES中的同一项，分组4为div标签的/）
+_SCAN_TOKEN_RE = _compile(r"(<!--)|<(script)\b|<(style)\b|<(/?)div\b[^>]*>")
+_SKIP_END_RES = {1: _compile(r"-->"), 2: _compile(r"</script\s*>"), 3: _compile(r"</style\s*>")}
+
+
+class ContentScanner:
+    """增量查找div#content的范围：对同一个不断变长的缓冲区（str、bytes或bytearray）反复调用，
+    每次只从上次完整处理到的位置继续扫描，整个页面只扫描一遍
+
+    调用返回div#content结束标签之后的位置，结束标签还没出现时返回None；找到后start为开始标签的位置。
+    """
+
+    __slots__ = ("pos", "start", "depth", "skip_end")
+
+    def __init__(self):
+        self.pos = 0
+        self.start = None
+        self.depth = 0
+        self.skip_end = None
+
+    def __call__(self, data):
+        kind = str if isinstance(data, str) else bytes
+        size = len(data)
+        while True:
+            if self.skip_end is not None:
+                # 在注释、脚本或样式中，只查找对应的结束标记
+                end = self.skip_end[kind].search(data, self.pos)
+                if end is None:
+                    # 结束标记可能跨越两次调用，从可能的开头处继续
+                    tail = data.rfind("<" if kind is str else b"<", self.pos)
+                    self.pos = max(self.pos, size - 2 if tail < 0 else tail)
+                    return None
+                self.pos = end.end()
+                self.skip_end = None
+                continue
+            token = _SCAN_TOKEN_RE[kind].search(data, self.pos)
+            if token is None or (token.lastindex in (2, 3) and token.end() == size):
+                # 没有完整的标记；缓冲区末尾可能是一个还没收全的标签，下次从它的开头继续
+                tail = data.rfind("<" if kind is str else b"<", self.pos)
+                self.pos = size if tail < 0 else tail
+                return None
+            self.pos = token.end()
+            if token.lastindex != 4:
+                self.skip_end = _SKIP_END_RES[token.lastindex]
+            elif self.start is None:
+                if not token.group(4) and _CONTENT_DIV_RE[kind].fullmatch(data, token.start(), token.end()):
+                    self.start = token.start()
+                    self.depth = 1
+            elif token.group(4):
+                # 按div的开闭标签计算嵌套深度，找到对应的结束标签
+                self.depth -= 1
+                if self.depth == 0:
+                    return token.end()
+            elif not token.group(0).endswith("/>" if kind is str else b"/>"):
+                self.depth += 1
+
+
+def content_span(html):
+    """返回div#content在html（str或bytes）中的(开始, 结束)位置，找不到或结束标签还没出现时返回None"""
+    scanner = ContentScanner()
+    end = scanner(html)
+    return (scanner.start, end) if end is not None else None
+
+
+def content_end(data):
+    """返回div#content结束标签之后的位置；一次性扫描，流式下载时用ContentScanner逐块增量扫描"""
+    return ContentScanner()(data)
+
+
+def content_fragment(html):
+    """从详情页HTML中只截取<title>和div#content，拼成一个小文档；找不到或标签不配对时返回None
+
+    截取结果与完整解析时soup.title和soup.find("div", id="content")得到的内容相同，
+    但不需要为导航、脚本、推荐和页脚等部分构建节点。
+    """
+    span = content_span(html)
+    if span is None:
+        return None
+    title = ""
+    for title_match in _TITLE_RE[str].finditer(html):
+        if not _skipped(html, title_match.start()):
+            title = title_match.group(0)
+            break
+    return f"<html><head>{title}</head><body>{html[span[0]:span[1]]}</body></html>"
+
+
+def make_detail_soup(html):
+    """为详情页构建只包含<title>和div#content的文档树，截取失败时解析整个页面"""
+    return make_soup(content_fragment(html) or html)
+
+
+def extract_vide_links(html, base_url):
+    """按页面顺序提取所有新闻视频（VIDE）链接，返回补全后的完整URL列表（未去重）
+
+    html可以是str或原始bytes（UTF-8），直接用正则扫描<a href>，跳过注释和脚本中的内容
+    """
+    is_bytes = isinstance(html, bytes)
+    links = []
+    for match in _LINK_RE[bytes if is_bytes else str].finditer(html):
+        href = match.group(1) or match.group(2) or match.group(3)
+        if href is None:
+            continue
+        if is_bytes:
+            href = href.decode("utf-8", "replace")
+        if "&" in href:
+            href = html_lib.unescape(href)
+        if "shtml" in href and "VIDE" in href:
+            links.append(href if href.startswith("http") else f"{base_url}{href}")
+    return links
+
+
+def extract_vide_links_from_soup(html, base_url):
+    """与extract_vide_links相同，但构建完整的文档树（用于对照检查）"""
+    soup = make_soup(html)
+    links = []
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if "shtml" in href and "VIDE" in href:
+            links.append(href if href.startswith("http") else f"{base_url}{href}")
+    return links
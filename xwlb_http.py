@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""新闻联播抓取器共用的HTTP会话层：连接池、超时、重试和压缩协商
+
+requests在创建第一个HttpClient时才导入，只用到常量或最终不发请求的命令行路径（--help、已有输出的日期）不需要它。
+"""
+
+import random
+import threading
+import time
+
+from xwlb_metrics import get_run_metrics
+from xwlb_ratelimit import PolitenessScheduler, parse_retry_after
+
+# 默认连接超时和读取超时（秒）
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 20
+# 默认最大重试次数（不含第一次请求）
+DEFAULT_MAX_RETRIES = 3
+# 指数退避的基数和上限（秒）
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+# 默认连接池大小，与抓取线程数保持一致
+DEFAULT_POOL_SIZE = 8
+
+# 需要重试的状态码：服务器错误和限流（带Retry-After时至少等待指定的时间）
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# 流式下载时每次读取的字节数
+STREAM_CHUNK_SIZE = 16 * 1024
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+class OfflineCacheMiss(ConnectionError):
+    """离线模式下请求的URL不在缓存中"""
+
+
+def _accept_encoding():
+    """根据已安装的解码库生成Accept-Encoding，只有安装了brotli时才协商br"""
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+        encodings.append("br")
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append("br")
+        except ImportError:
+            pass
+    return ", ".join(encodings)
+
+
+class HttpClient:
+    """带连接池、超时和抖动指数退避重试的HTTP客户端，并统计连接复用和传输字节数"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX, headers=None,
+                 inflight=None, cache=None, offline=False, early_stop=False, rate_limit=None, max_rate=None,
+                 shared_throttle=None):
+        """inflight: 可选的信号量（需支持acquire/release），用于限制多个客户端或进程同时在途的请求数
+        cache: 可选的xwlb_cache.ResponseCache，启用后对200响应做持久化缓存和条件请求重新验证
+        offline: 只从缓存读取，不访问网络（需要同时提供cache）
+        early_stop: 详情页流式下载，正文结束后即关闭连接（由get_news_content读取，见get的stop_when）
+        rate_limit: 每个主机的初始请求速率（次/秒），启用xwlb_ratelimit的礼貌调度（按响应自动调整速率和并发数，
+                    并发上限为pool_size）；为None或0时不限速
+        max_rate: 礼貌调度的速率上限（次/秒），默认为xwlb_ratelimit.DEFAULT_MAX_RATE
+        shared_throttle: 可选的xwlb_ratelimit.SharedThrottle，与其他进程的客户端同步减速和Retry-After
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.inflight = inflight
+        self.cache = cache
+        self.offline = offline
+        self.early_stop = early_stop
+        self.scheduler = None
+        if rate_limit:
+            scheduler_options = {"max_rate": max_rate} if max_rate else {}
+            self.scheduler = PolitenessScheduler(rate_limit, max_concurrency=pool_size, shared=shared_throttle,
+                                                 **scheduler_options)
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.headers["Accept-Encoding"] = _accept_encoding()
+        if headers:
+            self.session.headers.update(headers)
+
+        # 重试由本类自己实现（带抖动的指数退避），适配器本身不重试
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size), max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._pools = {}  # 见过的urllib3连接池，用于统计新建连接数
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "bytes_wire": 0,
+            "bytes_decoded": 0,
+            "cache_hits": 0,
+            "cache_revalidated": 0,
+            "early_stops": 0,
+        }
+
+    def get(self, url, headers=None, revalidate=False, stop_when=None, **kwargs):
+        """发送GET请求，遇到5xx或连接被重置时按抖动指数退避重试，返回requests.Response
+
+        启用缓存时，未过期的记录直接返回；过期的记录带If-None-Match/If-Modified-Since重新验证。
+        revalidate为True时即使记录未过期也向服务器重新验证（监视模式轮询列表页时使用）。
+        stop_when: 流式下载200响应；每个响应先调用stop_when()创建一个扫描函数（例如xwlb_html.ContentScanner），
+                   每读到一块就用已收到的全部内容调用一次，返回位置时只保留data[:位置]并关闭连接
+                   （response.truncated为True），一直返回None时完整下载。扫描函数可以记住上次扫描到的位置，
+                   只处理新到的部分；重试时会重新创建
+        """
+        metrics = get_run_metrics()
+        if metrics is None:
+            return self._get(url, headers, kwargs, revalidate, stop_when)
+        start = time.perf_counter()
+        try:
+            response = self._get(url, headers, kwargs, revalidate, stop_when)
+        except Exception as e:
+            metrics.record_url(url, time.perf_counter() - start, 0, None, error=type(e).__name__)
+            raise
+        metrics.record_url(url, time.perf_counter() - start, len(response.content), response.status_code,
+                           from_cache=getattr(response, "from_cache", False))
+        return response
+
+    def _get(self, url, headers, kwargs, revalidate=False, stop_when=None):
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None and entry.partial and stop_when is None:
+                # 提前结束时缓存的只是页面的前缀，需要完整页面的请求不能使用，也不能用它的校验信息
+                entry = None
+            if entry is not None and (self.offline or (not revalidate and self.cache.is_fresh(entry))):
+                with self._lock:
+                    self._stats["cache_hits"] += 1
+                return self._cached_response(entry)
+        if self.offline:
+            raise OfflineCacheMiss(f"离线模式下缓存中没有该页面: {url}")
+        if entry is not None:
+            headers = {**(headers or {}), **entry.validators()}
+
+        response = self._get_with_retries(url, headers, kwargs, stop_when)
+
+        # 提前结束的响应只缓存已收到的部分并标记为partial，只有同样提前结束的请求会使用
+        if self.cache is not None:
+            if response.status_code == 304 and entry is not None:
+                self.cache.refresh(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                with self._lock:
+                    self._stats["cache_revalidated"] += 1
+                return self._cached_response(entry)
+            if response.status_code == 200:
+                self.cache.put(url, response.content, response.headers.get("ETag"),
+                               response.headers.get("Last-Modified"), response.headers.get("Content-Type"),
+                               partial=getattr(response, "truncated", False))
+        return response
+
+    def _cached_response(self, entry):
+        """用缓存记录构造一个requests.Response"""
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.models.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = entry.url
+        response._content = entry.body
+        response.headers = CaseInsensitiveDict()
+        if entry.content_type:
+            response.headers["Content-Type"] = entry.content_type
+        if entry.etag:
+            response.headers["ETag"] = entry.etag
+        if entry.last_modified:
+            response.headers["Last-Modified"] = entry.last_modified
+        response.from_cache = True
+        response.truncated = entry.partial
+        return response
+
+    def _get_with_retries(self, url, headers, kwargs, stop_when=None):
+        import requests
+
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = self._send(url, headers, kwargs, stop_when)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._record_error(url)
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                self._record_response(url, response)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                response.close()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            attempt += 1
+            with self._lock:
+                self._stats["retries"] += 1
+            delay = self._backoff(attempt)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            time.sleep(delay)
+
+    def _send(self, url, headers, kwargs, stop_when=None):
+        if self.inflight is None:
+            return self._send_scheduled(url, headers, kwargs, stop_when)
+        # 先占用在途名额再向调度器取令牌：调度器从取得令牌时开始计算延迟，
+        # 等待其他进程释放名额的时间不能算进去，否则会被误判为服务器变慢
+        self.inflight.acquire()
+        try:
+            response = self._send_scheduled(url, headers, kwargs, stop_when)
+            # 在释放名额前读完响应体，保证在途请求数的限制覆盖整个下载过程
+            response.content
+            return response
+        finally:
+            self.inflight.release()
+
+    def _send_scheduled(self, url, headers, kwargs, stop_when=None):
+        if self.scheduler is None:
+            return self._request(url, headers, kwargs, stop_when)
+        # 礼貌调度：等待该主机的令牌和并发名额，用响应状态和延迟调整后续的速率
+        ticket = self.scheduler.acquire(url)
+        try:
+            response = self._request(url, headers, kwargs, stop_when)
+            response.content
+        except Exception:
+            self.scheduler.release(ticket, error=True)
+            raise
+        self.scheduler.release(ticket, response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+    def _request(self, url, headers, kwargs, stop_when):
+        if stop_when is None:
+            return self.session.get(url, headers=headers, **kwargs)
+        response = self.session.get(url, headers=headers, stream=True, **kwargs)
+        response.truncated = False
+        if response.status_code != 200:
+            return response
+        # 分块读取到同一个缓冲区，调用方需要的部分一到齐就丢弃剩余内容并关闭连接
+        scan = stop_when()
+        data = bytearray()
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            data += chunk
+            end = scan(data)
+            if end is not None:
+                del data[end:]
+                response.truncated = True
+                break
+        response._content = bytes(data)
+        response._content_consumed = True
+        if response.truncated:
+            with self._lock:
+                self._stats["early_stops"] += 1
+            response.close()
+        return response
+
+    def _backoff(self, attempt):
+        """全抖动指数退避：在[0, min(上限, 基数*2^attempt))之间随机取值"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record_error(self, url):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["errors"] += 1
+
+    def _record_response(self, url, response):
+        # 读取响应体，使raw.tell()反映实际从连接上读取的（压缩后）字节数
+        decoded = len(response.content)
+        try:
+            wire = response.raw.tell()
+        except Exception:
+            wire = decoded
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["bytes_wire"] += wire or decoded
+            self._stats["bytes_decoded"] += decoded
+            # 记录响应所用的urllib3连接池，连接池自身统计了新建连接数和请求数
+            pool = getattr(response.raw, "_pool", None)
+            if pool is not None:
+                self._pools[id(pool)] = pool
+
+    def stats(self):
+        """返回本客户端的统计：请求数、新建连接数、复用连接数、重试次数和传输字节数"""
+        with self._lock:
+            stats = dict(self._stats)
+            pools = list(self._pools.values())
+        new_connections = sum(getattr(pool, "num_connections", 0) for pool in pools)
+        pool_requests = sum(getattr(pool, "num_requests", 0) for pool in pools)
+        stats["new_connections"] = new_connections
+        stats["reused_connections"] = max(0, pool_requests - new_connections)
+        return stats
+
+    def format_stats(self):
+        """生成一行可读的统计信息"""
+        stats = self.stats()
+        return (f"请求 {stats['requests']} 次（重试 {stats['retries']} 次，失败 {stats['errors']} 次，"
+                f"缓存命中 {stats['cache_hits']} 次，重新验证 {stats['cache_revalidated']} 次，"
+                f"提前结束 {stats['early_stops']} 次），"
+                f"新建连接 {stats['new_connections']} 个，复用连接 {stats['reused_connections']} 次，"
+                f"传输 {stats['bytes_wire']} 字节（解压后 {stats['bytes_decoded']} 字节）"
+                + (f"；限速 {self.scheduler.format_stats()}" if self.scheduler is not None else ""))
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """返回进程内共享的默认HTTP客户端，首次调用时创建"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def configure_default_client(**kwargs):
+    """用给定参数替换默认HTTP客户端（参数同HttpClient），返回新的客户端"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = HttpClient(**kwargs)
+        return _default_client
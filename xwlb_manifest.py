@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""每天的抓取清单：与当天的输出文件放在一起，记录每条新闻的URL、验证信息（ETag/Last-Modified）、
+原始HTML的哈希、提取出的文本的哈希和提取结果
+
+重新抓取同一天时，HTML没有变化（304或哈希相同）的新闻直接使用清单中的提取结果，
+不再解析和清理；只有输入变化的新闻才重新解析。解析或清理逻辑变化时需要增大MANIFEST_VERSION，
+旧版本的清单会被忽略；HTML解析后端或快讯切分的触发词不同时（--parser、--flash-vocab），
+提取结果也可能不同，这些设置记录在清单的fingerprint中，与本次不一致时同样忽略整个清单。
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+# 清单格式及提取逻辑的版本
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def manifest_path_for(output_path):
+    """返回输出文件对应的清单文件路径"""
+    return os.path.splitext(output_path)[0] + MANIFEST_SUFFIX
+
+
+def extraction_fingerprint(parser_backend, trigger_words):
+    """返回提取设置（解析后端和快讯切分的触发词）的摘要"""
+    return content_hash(json.dumps([parser_backend, list(trigger_words)], ensure_ascii=False))
+
+
+def content_hash(data):
+    """返回bytes或str的sha256十六进制摘要"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class StoryManifest:
+    """一天的新闻清单，线程安全；path为None时只保存在内存中
+
+    fingerprint: 本次的extraction_fingerprint，与清单中记录的不一致时不复用任何记录
+    """
+
+    def __init__(self, path=None, fingerprint=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._stories = {}
+        self._program = None
+        self.reused = 0
+        self.parsed = 0
+        self.changed = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION and data.get("fingerprint") == fingerprint:
+                    self._stories = data.get("stories", {})
+                    self._program = data.get("program")
+            except (OSError, ValueError):
+                # 损坏的清单直接重新解析
+                pass
+
+    def __len__(self):
+        return len(self._stories)
+
+    def validators(self, url):
+        """返回该新闻上次抓取时的条件请求头，没有记录时返回空字典"""
+        entry = self._stories.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def cached_record(self, url, html_hash=None):
+        """HTML哈希与记录一致（html_hash为None表示服务器返回了304）时返回上次的提取结果，否则返回None"""
+        entry = self._stories.get(url)
+        if not entry or "record" not in entry:
+            return None
+        if html_hash is not None and entry.get("html_sha256") != html_hash:
+            return None
+        with self._lock:
+            self.reused += 1
+        return entry["record"]
+
+    def update(self, url, response, html_hash, record):
+        """记录一条重新解析的新闻"""
+        text_hash = content_hash(record["content"]) if record and record.get("content") else None
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "html_sha256": html_hash,
+            "text_sha256": text_hash,
+        }
+        if record is not None:
+            entry["record"] = record
+        with self._lock:
+            previous = self._stories.get(url)
+            self.parsed += 1
+            # HTML变了但提取出的文本没变（页面模板、推荐链接等变化）不算内容更新
+            if previous and previous.get("text_sha256") != text_hash:
+                self.changed += 1
+            self._stories[url] = entry
+
+    def program_title(self, html_hash):
+        """完整节目页的HTML没有变化时返回上次解析出的标题，否则返回None"""
+        program = self._program
+        if program and program.get("html_sha256") == html_hash:
+            return program.get("title")
+        return None
+
+    def set_program(self, html_hash, title):
+        self._program = {"html_sha256": html_hash, "title": title}
+
+    def prune(self, urls):
+        """只保留当前链接列表中的新闻"""
+        keep = set(urls)
+        with self._lock:
+            self._stories = {url: entry for url, entry in self._stories.items() if url in keep}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"version": MANIFEST_VERSION, "fingerprint": self.fingerprint, "program": self._program,
+                               "stories": self._stories}, ensure_ascii=False, separators=(",", ":"))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def format_stats(self):
+        return f"复用 {self.reused} 条，重新解析 {self.parsed} 条（其中文本有变化 {self.changed} 条）"
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""新闻联播文字版的Markdown渲染，以及边抓取边写出的流式写入器"""
+
+import contextlib
+import fcntl
+import os
+import re
+import shutil
+import threading
+
+from xwlb_metrics import stage, STAGE_WRITE
+
+# 文档开头的配图
+HEADER_IMAGE = "![](https://files.mdnice.com/user/158914/f297f420-0530-4a26-8d81-0644824ee6e0.jpg)"
+DETAIL_HEADING = "# 详细新闻\n\n"
+
+_VIDEO_PREFIX_RE = re.compile(r"^\[视频\]")
+_FLASH_DATE_RE = re.compile(r"(今天|昨日|近日|[0-9]{4}年[0-9]{1,2}月[0-9]{1,2}日)")
+
+
+def clean_news_title(title):
+    """清理标题，去除[视频]前缀"""
+    return _VIDEO_PREFIX_RE.sub("", title).strip()
+
+
+def output_filename_for(date_str):
+    """根据YYYY年MM月DD日格式的日期返回输出文件名，没有日期时使用默认文件名"""
+    return f"{date_str}新闻联播文字版.txt" if date_str else "新闻联播文字版.txt"
+
+
+def output_lock_path(path):
+    """一天输出文件的排他锁文件：同目录下的.<文件名>.lock"""
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.lock")
+
+
+@contextlib.contextmanager
+def output_lock(path):
+    """持有一天输出文件的排他锁，与MarkdownStreamWriter使用同一个锁文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_lock_path(path), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def render_header(date_str):
+    """生成文档开头：配图和用户要求的标题格式（YYYY年MM月DD日新闻联播文字版｜｜｜｜）"""
+    clean_main_title = f"{date_str}新闻联播文字版｜｜｜｜" if date_str else "新闻联播文字版｜｜｜｜"
+    return f"{HEADER_IMAGE}\n\n{clean_main_title}\n\n"
+
+
+def render_outline_content(outline_items):
+    """把大纲标题列表渲染为Markdown列表"""
+    return "\n".join([f"- {title}" for title in outline_items])
+
+
+def render_outline(outline_items):
+    """生成新闻大纲部分，没有条目时返回空字符串"""
+    if not outline_items:
+        return ""
+    return "# 新闻大纲\n" + render_outline_content(outline_items) + "\n\n"
+
+
+def _flash_item_title(item):
+    """没有结构化内容时，从一条快讯中推断标题"""
+    title_part = ""
+
+    # 尝试查找合适的标题
+    if len(item) > 50:
+        # 情况1：查找第一个标点符号（。、：）前的内容作为标题
+        for punc in ["。", "、", "：", "，"]:
+            if punc in item[:100]:
+                title_part = item.split(punc, 1)[0].strip() + punc
+                break
+
+    # 如果没有找到合适的标点符号
+    if not title_part:
+        # 情况2：查找日期前的内容
+        date_match = _FLASH_DATE_RE.search(item)
+        if date_match:
+            title_part = item[:date_match.start()].strip()
+            if title_part:
+                # 确保标题以标点符号结尾
+                if not title_part.endswith(("。", "、", "：", "，")):
+                    title_part += "："
+        else:
+            # 情况3：使用前70个字符作为标题
+            title_part = item[:70].strip()
+            if len(item) > 70:
+                title_part += "..."
+
+    # 确保标题不为空
+    return title_part or "新闻快讯"
+
+
+def render_news_section(news):
+    """渲染一条新闻的详细内容部分"""
+    parts = []
+    clean_title = clean_news_title(news["title"])
+
+    # 使用Markdown二级标题
+    parts.append(f"## {clean_title}\n")
+
+    # 特殊处理联播快讯
+    if "联播快讯" in clean_title:
+        # 优先使用结构化内容
+        if news.get("structured_content"):
+            for title_part, content_part in news["structured_content"]:
+                title_part = title_part.strip()
+                content_part = content_part.strip()
+
+                if not title_part and not content_part:
+                    continue
+
+                # 确保标题不为空
+                if not title_part:
+                    title_part = "新闻快讯"
+
+                # 使用Markdown三级标题
+                parts.append(f"### {title_part}\n")
+
+                # 输出内容部分
+                if content_part:
+                    parts.append(f"{content_part}\n\n")
+        else:
+            # 没有结构化内容时，使用传统的分割方法
+            for item in news["content"].split("\n\n"):
+                item = item.strip()
+                if not item:
+                    continue
+
+                title_part = _flash_item_title(item)
+                parts.append(f"# {title_part}\n")
+
+                # 只输出item中除标题外的内容部分
+                if title_part in item:
+                    # 去掉标题部分，只保留正文
+                    content_part = item.replace(title_part, "", 1).strip()
+                    if content_part:
+                        parts.append(f"{content_part}\n\n")
+                else:
+                    # 如果标题不在item中，输出完整内容
+                    parts.append(f"{item}\n\n")
+    else:
+        # 普通新闻，直接添加内容
+        parts.append(f"{news['content']}\n\n")
+    return "".join(parts)
+
+
+def render_document(date_str, detailed_news):
+    """在内存中渲染完整文档，与MarkdownStreamWriter写出的文件内容完全一致"""
+    parts = [render_header(date_str)]
+    parts.append(render_outline([clean_news_title(news["title"]) for news in detailed_news]))
+    if detailed_news:
+        parts.append(DETAIL_HEADING)
+        parts.extend(render_news_section(news) for news in detailed_news)
+    return "".join(parts)
+
+
+class MarkdownStreamWriter:
+    """流式写出一天的文字版
+
+    抓取过程中，开头和每条新闻按顺序写入同目录下的<文件名>.<进程号>.<线程号>.part，下游可以随时看到进度；
+    大纲只在内存中记录标题。结束时把开头、大纲和.part中的新闻内容拼成临时文件，
+    再原子地重命名为最终文件，因此最终文件要么不存在，要么是完整的。
+
+    从open到finish或abort一直持有当天输出的排他文件锁（同目录下的.<文件名>.lock），
+    同一天的多个写入（多个线程或进程）依次进行，不会互相覆盖或删除对方的临时文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        suffix = f"{os.getpid()}.{threading.get_ident()}"
+        self.part_path = f"{path}.{suffix}.part"
+        self.tmp_path = f"{path}.{suffix}.tmp"
+        self.lock_path = output_lock_path(path)
+        self.outline_items = []
+        self.chars = 0
+        self._header = ""
+        self._file = None
+        self._lock_file = None
+        self._body_offset = 0
+
+    def open(self, date_str):
+        """等待当天输出的文件锁，写入文档开头（配图和标题）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(self.lock_path, "a")
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        self._header = render_header(date_str)
+        self._file = open(self.part_path, "w", encoding="utf-8")
+        self._write(self._header)
+        self._body_offset = self._file.tell()
+        return self
+
+    def _unlock(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _write(self, text):
+        with stage(STAGE_WRITE) as timer:
+            self._file.write(text)
+            self._file.flush()
+            timer.add_bytes(len(text.encode("utf-8")))
+        self.chars += len(text)
+
+    def write_news(self, news):
+        """写入一条新闻的详细内容，并记录它的大纲标题"""
+        if not self.outline_items:
+            self._write(DETAIL_HEADING)
+        self.outline_items.append(clean_news_title(news["title"]))
+        self._write(render_news_section(news))
+
+    def finish(self):
+        """补上大纲，原子地生成最终文件，返回最终文件路径"""
+        self._file.close()
+
+        outline = render_outline(self.outline_items)
+        self.chars += len(outline)
+        with stage(STAGE_WRITE) as timer:
+            with open(self.tmp_path, "w", encoding="utf-8") as out:
+                out.write(self._header)
+                out.write(outline)
+                out.flush()
+                with open(self.part_path, "rb") as part:
+                    part.seek(self._body_offset)
+                    shutil.copyfileobj(part, out.buffer)
+                out.flush()
+                os.fsync(out.fileno())
+                timer.add_bytes(out.buffer.tell())
+            os.replace(self.tmp_path, self.path)
+            os.remove(self.part_path)
+        self._unlock()
+        return self.path
+
+    def abort(self):
+        """放弃写入，删除未完成的文件"""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        for path in (self.part_path, self.tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._unlock()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""抓取过程的分阶段计时和统计：每个阶段的耗时、字节数和次数，每个URL的请求记录，
+可选对解析阶段做cProfile（多线程抓取时只抽取其中不重叠的部分），结果输出为JSON摘要和Prometheus textfile collector格式
+
+没有调用start_run时所有计时都是空操作，库代码可以无条件地使用stage()。
+"""
+
+import cProfile
+import io
+import json
+import os
+import threading
+import time
+
+# 阶段名称
+STAGE_LIST_PAGE = "list_page"
+STAGE_FALLBACK_PROBES = "fallback_probes"
+STAGE_DETAIL_FETCH = "detail_fetch"
+STAGE_PARSE = "parse"
+STAGE_CLEANUP = "cleanup"
+STAGE_WRITE = "write"
+STAGES = (STAGE_LIST_PAGE, STAGE_FALLBACK_PROBES, STAGE_DETAIL_FETCH, STAGE_PARSE, STAGE_CLEANUP, STAGE_WRITE)
+
+_active = None
+_local = threading.local()
+# 同一时刻只有一个线程的解析阶段做profile：Python 3.12起进程内只能启用一个cProfile，
+# 再启用第二个会抛出ValueError
+_profile_lock = threading.Lock()
+
+
+class _NullStage:
+    """没有进行中的统计时使用的空上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_bytes(self, count):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """一次阶段计时：退出时把耗时累加到RunMetrics，并维护当前线程的阶段栈"""
+
+    __slots__ = ("metrics", "name", "bytes", "start", "profile")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.bytes = 0
+        self.profile = None
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        # 只在最外层的解析阶段启用profile；其他线程正在做profile时跳过这一次，不等待
+        if (self.name == STAGE_PARSE and self.metrics.profiling and STAGE_PARSE not in stack
+                and _profile_lock.acquire(blocking=False)):
+            profile = self.metrics._thread_profile()
+            try:
+                profile.enable()
+                self.profile = profile
+            except ValueError:
+                # 进程中已经有别的profiler（例如在cProfile下运行整个程序）
+                _profile_lock.release()
+        stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile = None
+            _profile_lock.release()
+        _local.stack.pop()
+        self.metrics._add_stage(self.name, elapsed, self.bytes)
+        return False
+
+    def add_bytes(self, count):
+        self.bytes += count
+
+
+class RunMetrics:
+    """一次抓取运行的统计，线程安全"""
+
+    def __init__(self, profile=False):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.finished = None
+        self.profiling = profile
+        self._lock = threading.Lock()
+        self.stages = {name: {"count": 0, "seconds": 0.0, "bytes": 0} for name in STAGES}
+        self.urls = []
+        self.counters = {}
+        self._profiles = []
+
+    def _add_stage(self, name, seconds, byte_count):
+        with self._lock:
+            stats = self.stages.setdefault(name, {"count": 0, "seconds": 0.0, "bytes": 0})
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["bytes"] += byte_count
+
+    def _thread_profile(self):
+        # cProfile只记录启用它的线程，每个抓取线程使用自己的Profile，结束时合并
+        profile = getattr(_local, "profile", None)
+        if profile is None or getattr(_local, "profile_owner", None) is not self:
+            profile = _local.profile = cProfile.Profile()
+            _local.profile_owner = self
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def record_url(self, url, seconds, byte_count, status, from_cache=False, error=None):
+        """记录一次HTTP请求，归属于当前线程正在进行的阶段"""
+        stack = getattr(_local, "stack", None)
+        entry = {"url": url, "stage": stack[-1] if stack else None, "seconds": round(seconds, 6),
+                 "bytes": byte_count, "status": status, "from_cache": from_cache}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.urls.append(entry)
+
+    def incr(self, name, value=1):
+        """累加一个计数器（新闻条数等）"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter() - self._start
+        return self
+
+    def summary(self, http_stats=None, success=None):
+        """生成JSON摘要；阶段耗时是各线程累加的时间，parse包含其中的cleanup"""
+        wall = self.finished if self.finished is not None else time.perf_counter() - self._start
+        with self._lock:
+            stages = {name: {"count": s["count"], "seconds": round(s["seconds"], 6), "bytes": s["bytes"]}
+                      for name, s in self.stages.items()}
+            return {
+                "started": self.started,
+                "wall_seconds": round(wall, 6),
+                "success": success,
+                "stages": stages,
+                "counters": dict(self.counters),
+                "http": http_stats,
+                "urls": list(self.urls),
+            }
+
+    def write_json(self, path, http_stats=None, success=None):
+        _atomic_write(path, json.dumps(self.summary(http_stats, success), ensure_ascii=False, indent=1))
+
+    def prometheus_text(self, http_stats=None, success=None):
+        """生成Prometheus文本格式，供node exporter的textfile collector读取"""
+        summary = self.summary(http_stats, success)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        stages = summary["stages"]
+        metric("xwlb_stage_seconds", "gauge", "Time spent in each scrape stage, summed over threads.",
+               [({"stage": name}, s["seconds"]) for name, s in stages.items()])
+        metric("xwlb_stage_calls", "gauge", "Number of times each scrape stage ran.",
+               [({"stage": name}, s["count"]) for name, s in stages.items()])
+        metric("xwlb_stage_bytes", "gauge", "Bytes handled by each scrape stage.",
+               [({"stage": name}, s["bytes"]) for name, s in stages.items()])
+        metric("xwlb_run_duration_seconds", "gauge", "Wall time of the last scrape run.",
+               [({}, summary["wall_seconds"])])
+        metric("xwlb_run_timestamp_seconds", "gauge", "Unix time the last scrape run started.",
+               [({}, round(summary["started"], 3))])
+        if success is not None:
+            metric("xwlb_run_success", "gauge", "Whether the last scrape run succeeded.", [({}, int(bool(success)))])
+        for name, value in sorted(summary["counters"].items()):
+            metric(f"xwlb_{name}", "gauge", f"Counter {name} of the last scrape run.", [({}, value)])
+        for name, value in sorted((http_stats or {}).items()):
+            metric(f"xwlb_http_{name}", "gauge", f"HTTP client statistic {name} of the last scrape run.", [({}, value)])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, http_stats=None, success=None):
+        # textfile collector可能随时读取，必须整体替换
+        _atomic_write(path, self.prometheus_text(http_stats, success))
+
+    def write_profile(self, path, top=25):
+        """合并各线程的解析阶段profile，写入pstats文件，返回按累计时间排序的前top行文本"""
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return ""
+        import pstats
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+    def format_stages(self):
+        """生成一行中文阶段耗时摘要"""
+        parts = [f"{name} {s['seconds']:.2f}秒/{s['count']}次" for name, s in self.stages.items() if s["count"]]
+        return "，".join(parts)
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def start_run(profile=False):
+    """开始一次统计，之后的stage()和record_url()都记录到返回的RunMetrics中"""
+    global _active
+    _active = RunMetrics(profile=profile)
+    return _active
+
+
+def stop_run():
+    """结束当前统计并返回它"""
+    global _active
+    metrics, _active = _active, None
+    return metrics.finish() if metrics is not None else None
+
+
+def get_run_metrics():
+    """返回当前进行中的统计，没有时返回None"""
+    return _active
+
+
+def stage(name):
+    """阶段计时的上下文管理器；没有进行中的统计时为空操作"""
+    metrics = _active
+    if metrics is None:
+        return _NULL_STAGE
+    return _Stage(metrics, name)
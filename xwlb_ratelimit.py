@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""按主机的礼貌调度：令牌桶限制请求速率，AIMD调整速率和并发数，并遵守Retry-After
+
+每个主机各有一个令牌桶和一个并发上限。响应正常且延迟没有明显升高时，速率和并发数线性增加
+（每秒大约增加RATE_STEP个请求/秒，每个延迟周期大约增加一个并发）；遇到403/429/5xx、连接错误
+或延迟升高到基线的LATENCY_FACTOR倍以上时，速率和并发数减半，同一主机每COOLDOWN秒最多减半一次，
+避免同一批请求的多个失败连续减半。响应带Retry-After时，该主机在指定时间内不再发出新请求。
+
+多个进程（例如回填的子进程）各有自己的调度器时，可以共用一个SharedThrottle：任何一个进程减速或收到
+Retry-After，其他进程最多SHARED_POLL_INTERVAL秒后同样减速并等待，而不是继续按自己的节奏加速。
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+# 默认的初始速率、上下限（每个主机每秒的请求数）和令牌桶容量
+DEFAULT_RATE = 4.0
+DEFAULT_MAX_RATE = 20.0
+MIN_RATE = 0.2
+DEFAULT_BURST = 4
+# 每个主机的初始并发数和下限；上限由调用方指定（通常等于连接池大小）
+INITIAL_CONCURRENCY = 2
+MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 8
+# 速率的加性增量（请求/秒，按每秒的正常响应摊分）和乘性减量
+RATE_STEP = 1.0
+DECREASE_FACTOR = 0.5
+# 延迟超过基线的这么多倍（再加上LATENCY_SLACK秒）认为服务器开始拥塞；
+# 加上固定的余量是为了避免延迟只有几毫秒时，正常的抖动也被当成拥塞
+LATENCY_FACTOR = 2.5
+LATENCY_SLACK = 0.05
+# 两次减半之间的最短间隔（秒）
+COOLDOWN = 2.0
+# 每个主机最多每隔这么久（秒）读取一次SharedThrottle；每次读取都是一次跨进程调用，不在锁内进行
+SHARED_POLL_INTERVAL = 0.1
+# 遵守的Retry-After上限（秒），避免异常的响应头让抓取停止太久
+MAX_RETRY_AFTER = 300.0
+
+# 表示被限流或服务器过载的状态码
+THROTTLE_STATUS_CODES = {403, 429, 500, 502, 503, 504}
+# 延迟的指数加权平均系数
+_EWMA_ALPHA = 0.2
+
+
+def parse_retry_after(value, now=None):
+    """把Retry-After（秒数或HTTP日期）转换为需要等待的秒数，无法识别时返回None"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - (now if now is not None else time.time())
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    return min(max(0.0, seconds), MAX_RETRY_AFTER)
+
+
+class SharedThrottle:
+    """多个进程共用的按主机减速记录，保存在multiprocessing.Manager中，可以作为进程初始化参数传递
+
+    每个主机记录(减速序号, 减速后的速率, 禁止请求直到的时间戳)；时间戳用time.time()，各进程的单调时钟不可比较。
+    """
+
+    def __init__(self, manager):
+        self._state = manager.dict()
+        self._lock = manager.Lock()
+
+    def publish(self, host, rate=None, blocked_until=0.0):
+        """记录一次减速（rate为减速后的速率）或只记录Retry-After（rate为None），返回当前的减速序号"""
+        with self._lock:
+            seq, shared_rate, blocked = self._state.get(host, (0, None, 0.0))
+            if rate is not None:
+                seq, shared_rate = seq + 1, rate
+            self._state[host] = (seq, shared_rate, max(blocked, blocked_until))
+            return seq
+
+    def get(self, host):
+        """返回该主机最近一次减速的(序号, 速率, 禁止请求直到的时间戳)，没有减速过时返回None"""
+        return self._state.get(host)
+
+
+class _HostState:
+    """一个主机的令牌桶、并发上限和延迟统计"""
+
+    __slots__ = ("rate", "tokens", "refilled", "limit", "inflight", "blocked_until", "latency", "baseline",
+                 "last_cut", "requests", "throttled", "shared_seq")
+
+    def __init__(self, rate, burst, limit, now):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.refilled = now
+        self.limit = float(limit)
+        self.inflight = 0
+        self.blocked_until = 0.0
+        self.latency = None
+        self.baseline = None
+        self.last_cut = float("-inf")
+        self.requests = 0
+        self.throttled = 0
+        self.shared_seq = 0
+
+
+class PolitenessScheduler:
+    """所有主机共用的调度器，线程安全：发请求前调用acquire(url)，收到响应或出错后调用release
+
+    shared: 可选的SharedThrottle，与其他进程的调度器同步减速和Retry-After
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, max_rate=DEFAULT_MAX_RATE, burst=DEFAULT_BURST,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, clock=time.monotonic, shared=None):
+        self.initial_rate = min(rate, max_rate)
+        self.max_rate = max_rate
+        self.burst = burst
+        self.max_concurrency = max(MIN_CONCURRENCY, max_concurrency)
+        self.clock = clock
+        self.shared = shared
+        self._cond = threading.Condition()
+        self._hosts = {}
+        # 每个主机下一次读取SharedThrottle的时间
+        self._shared_due = {}
+
+    def _state(self, host, now):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial_rate, self.burst,
+                                                   min(INITIAL_CONCURRENCY, self.max_concurrency), now)
+        return state
+
+    def acquire(self, url):
+        """等待该主机的令牌和并发名额，返回交给release的凭据"""
+        host = urlsplit(url).netloc
+        while True:
+            shared = self._poll_shared(host)
+            with self._cond:
+                now = self.clock()
+                state = self._state(host, now)
+                if shared is not None:
+                    self._apply_shared(state, shared, now)
+                state.tokens = min(self.burst, state.tokens + (now - state.refilled) * state.rate)
+                state.refilled = now
+                if state.blocked_until > now:
+                    wait = state.blocked_until - now
+                elif state.inflight >= int(state.limit):
+                    # 等待其他请求完成时的通知
+                    wait = None
+                elif state.tokens < 1:
+                    wait = (1 - state.tokens) / state.rate
+                else:
+                    state.tokens -= 1
+                    state.inflight += 1
+                    state.requests += 1
+                    return host, now
+                if self.shared is not None:
+                    # 等待期间其他进程可能又减速或收到Retry-After，按读取间隔醒来重新检查
+                    wait = SHARED_POLL_INTERVAL if wait is None else min(wait, SHARED_POLL_INTERVAL)
+                self._cond.wait(wait)
+
+    def _poll_shared(self, host):
+        """距上次读取超过SHARED_POLL_INTERVAL时读取该主机的共享减速记录，否则返回None（不持有锁）"""
+        if self.shared is None:
+            return None
+        now = self.clock()
+        if now < self._shared_due.get(host, float("-inf")):
+            return None
+        self._shared_due[host] = now + SHARED_POLL_INTERVAL
+        return self.shared.get(host)
+
+    def _apply_shared(self, state, shared, now):
+        """其他进程减速后，本进程也按同样的速率、减半的并发数和Retry-After减速（调用方需持有锁）"""
+        seq, rate, blocked_until = shared
+        state.blocked_until = max(state.blocked_until, now + blocked_until - time.time())
+        if seq > state.shared_seq:
+            state.shared_seq = seq
+            state.rate = max(MIN_RATE, min(state.rate, rate))
+            state.limit = max(MIN_CONCURRENCY, state.limit * DECREASE_FACTOR)
+            state.tokens = min(state.tokens, 1.0)
+            state.last_cut = now
+
+    def release(self, ticket, status=None, retry_after=None, error=False):
+        """记录一次请求的结果并调整该主机的速率和并发数；error为True表示连接错误或超时"""
+        host, start = ticket
+        with self._cond:
+            now = self.clock()
+            state = self._hosts[host]
+            state.inflight -= 1
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+
+            latency = now - start
+            slow = False
+            if not error:
+                state.latency = latency if state.latency is None else \
+                    state.latency + _EWMA_ALPHA * (latency - state.latency)
+                if state.baseline is None or state.latency < state.baseline:
+                    state.baseline = state.latency
+                else:
+                    # 基线缓慢跟随平均延迟，网络条件长期变化后不会一直判为拥塞
+                    state.baseline += 0.01 * (state.latency - state.baseline)
+                slow = state.latency > state.baseline * LATENCY_FACTOR + LATENCY_SLACK
+
+            if error or slow or status in THROTTLE_STATUS_CODES or retry_after:
+                cut = now - state.last_cut >= COOLDOWN
+                if cut:
+                    state.last_cut = now
+                    state.rate = max(MIN_RATE, state.rate * DECREASE_FACTOR)
+                    state.limit = max(MIN_CONCURRENCY, state.limit * DECREASE_FACTOR)
+                    state.tokens = min(state.tokens, 1.0)
+                    state.throttled += 1
+                if self.shared is not None and (cut or retry_after):
+                    state.shared_seq = self.shared.publish(host, state.rate if cut else None,
+                                                           time.time() + max(0.0, state.blocked_until - now))
+            else:
+                state.rate = min(self.max_rate, state.rate + RATE_STEP / state.rate)
+                state.limit = min(self.max_concurrency, state.limit + 1 / state.limit)
+            self._cond.notify_all()
+
+    def host_stats(self, host):
+        """返回一个主机当前的速率、并发上限、请求数和减速次数"""
+        with self._cond:
+            state = self._hosts.get(host)
+            if state is None:
+                return None
+            return {"rate": state.rate, "limit": int(state.limit), "requests": state.requests,
+                    "throttled": state.throttled}
+
+    def format_stats(self):
+        with self._cond:
+            hosts = list(self._hosts)
+        parts = []
+        for host in hosts:
+            stats = self.host_stats(host)
+            parts.append(f"{host}: 速率 {stats['rate']:.1f}/秒，并发 {stats['limit']}，"
+                         f"请求 {stats['requests']} 次，减速 {stats['throttled']} 次")
+        return "；".join(parts)
@@ -1,210 +1,173 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
-from bs4 import BeautifulSoup
+import os
 import re
+import sys
 import argparse
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from xwlb_http import HttpClient, get_default_client, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_MAX_RETRIES
+from xwlb_cache import ResponseCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, DEFAULT_LIST_TTL
+from xwlb_text import clean_text, clean_title, collapse_spaces
+from xwlb_segment import get_default_segmenter, configure_default_segmenter, load_trigger_words
+from xwlb_markdown import (MarkdownStreamWriter, clean_news_title, output_filename_for, render_document,
+                           render_outline_content)
+from xwlb_html import (make_soup, make_detail_soup, ContentScanner, extract_vide_links, get_parser_backend,
+                       set_parser_backend, AUTO_BACKEND, PARSER_BACKENDS)
+from xwlb_metrics import (stage, start_run, stop_run, get_run_metrics, STAGE_LIST_PAGE, STAGE_DETAIL_FETCH,
+                          STAGE_PARSE, STAGE_WRITE)
+from xwlb_discovery import discover_date_links, configure_strategy_cache, STRATEGY_FILENAME
+from xwlb_dateindex import get_date_index, configure_date_index, DEFAULT_DATA_URL, INDEX_FILENAME
+from xwlb_manifest import StoryManifest, content_hash, extraction_fingerprint, manifest_path_for
+from xwlb_ratelimit import DEFAULT_RATE, DEFAULT_MAX_RATE
 
-def get_news_content(url, headers):
-    """从单个新闻页面提取详细内容"""
+# 并发抓取单条新闻详情页的默认线程数
+DEFAULT_MAX_WORKERS = 8
+# 每天最多处理的单条新闻数
+MAX_STORIES = 20
+
+BASE_URL = "https://tv.cctv.com"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+_DATE_PATH_RE = re.compile(r"(\d{4})/(\d{2})/(\d{2})")
+# 文字版中详细新闻部分的标题：现在的"# 详细新闻"和早期的"## 详细新闻内容"
+_DETAIL_SECTION_RE = re.compile(r"^#{1,2} 详细新闻(?:内容)?[ \t]*$", re.M)
+
+def get_news_content(url, headers, client=None, manifest=None):
+    """从单个新闻页面提取详细内容，client为空时使用共享的默认HTTP客户端
+    
+    manifest: 当天的StoryManifest，页面没有变化（304或HTML哈希相同）时直接返回上次的提取结果
+    """
+    if client is None:
+        client = get_default_client()
     try:
-        response = requests.get(url, headers=headers)
-        response.encoding = "utf-8"
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # 首先尝试从div id="content"中提取内容，这是详细新闻的主要容器
-        content_div = soup.find("div", id="content")
-        if content_div:
-            # 获取标题
-            title = soup.title.get_text(strip=True) if soup.title else "新闻"
+        # 客户端启用了early_stop时流式下载，div#content结束后不再读取页面的其余部分
+        fetch_options = {"stop_when": ContentScanner} if getattr(client, "early_stop", False) else {}
+        with stage(STAGE_DETAIL_FETCH) as timer:
+            request_headers = {**headers, **manifest.validators(url)} if manifest is not None else headers
+            response = client.get(url, headers=request_headers, **fetch_options)
+            if manifest is not None and response.status_code == 304:
+                cached = manifest.cached_record(url)
+                if cached is not None:
+                    return cached
+                response = client.get(url, headers=headers, **fetch_options)
+            response.encoding = "utf-8"
+            timer.add_bytes(len(response.content))
+        if manifest is None:
+            with stage(STAGE_PARSE):
+                return parse_news_page(response.text, url)
+        html_hash = content_hash(response.content)
+        cached = manifest.cached_record(url, html_hash)
+        if cached is not None:
+            return cached
+        with stage(STAGE_PARSE):
+            news = parse_news_page(response.text, url)
+        manifest.update(url, response, html_hash, news)
+        return news
+    except Exception as e:
+        print(f"提取单个新闻内容时出错 ({url}): {e}")
+        return None
+
+def parse_news_page(html, url):
+    """从新闻详情页的HTML中提取标题和详细内容，联播快讯会额外拆分出结构化条目"""
+    # 只为<title>和div#content构建文档树，页面中没有div#content时才解析整个页面
+    soup = make_detail_soup(html)
+    
+    # 首先尝试从div id="content"中提取内容，这是详细新闻的主要容器
+    content_div = soup.find("div", id="content")
+    if content_div:
+        # 获取标题
+        title = soup.title.get_text(strip=True) if soup.title else "新闻"
+        
+        # 特殊处理联播快讯，将内容拆分为单独的新闻条目
+        if "联播快讯" in title:
+            news_items = []
             
-            # 特殊处理联播快讯，将内容拆分为单独的新闻条目
-            if "联播快讯" in title:
-                news_items = []
-                
-                # 首先尝试使用HTML加粗标签来分割新闻条目
-                structured_items = []  # 存储结构化的新闻条目 (标题, 内容)
+            # 首先尝试使用HTML加粗标签来分割新闻条目
+            structured_items = []  # 存储结构化的新闻条目 (标题, 内容)
+            
+            # 查找所有包含加粗标签的元素
+            for p in content_div.find_all(["p", "div"]):
+                # 查找当前段落中的所有加粗标签
+                bold_tags = p.find_all(["strong", "b"])
                 
-                # 查找所有包含加粗标签的元素
-                for p in content_div.find_all(["p", "div"]):
-                    # 查找当前段落中的所有加粗标签
-                    bold_tags = p.find_all(["strong", "b"])
-                    
-                    if bold_tags:
-                        # 如果当前段落有加粗标签
-                        for bold_tag in bold_tags:
-                            try:
-                                # 提取加粗文本作为新闻标题
-                                news_title = bold_tag.get_text(strip=True)
-                                if not news_title:
-                                    continue
-                                
-                                # 提取标题后面的内容作为新闻正文
-                                news_content = ""
-                                paragraph_content = []
-                                
-                                # 先处理当前节点的所有后续兄弟节点
-                                current_node = bold_tag.next_sibling
-                                while current_node:
-                                    try:
-                                        if hasattr(current_node, "strip"):
-                                            # 文本节点
-                                            text = current_node.strip()
-                                            if text:
-                                                paragraph_content.append(text)
-                                        elif hasattr(current_node, "get_text"):
-                                            # 元素节点
-                                            text = current_node.get_text(strip=True)
-                                            if text:
-                                                paragraph_content.append(text)
-                                        
-                                        # 安全获取下一个兄弟节点
-                                        current_node = getattr(current_node, "next_sibling", None)
-                                    except Exception as e:
-                                        print(f"处理节点时出错: {e}")
-                                        break
-                                
-                                # 将段落内容用换行符连接
-                                if paragraph_content:
-                                    news_content = "\n\n".join(paragraph_content)
-                                
-                                # 去除标题和内容中的重复部分
-                                if news_title in news_content:
-                                    news_content = news_content.replace(news_title, "", 1).strip()
-                                
-                                # 如果当前段落没有内容，查找下一个段落
-                                if not news_content:
-                                    next_p = p.find_next_sibling(["p", "div"])
-                                    if next_p:
-                                        next_content = next_p.get_text(strip=True)
-                                        # 同样去除重复的标题
-                                        if news_title in next_content:
-                                            next_content = next_content.replace(news_title, "", 1).strip()
-                                        news_content = next_content
-                                
-                                # 过滤掉无效标题
-                                invalid_titles = ['央视网消息', '新闻联播', '(新闻联播)', '央视网消息（新闻联播）']
-                                if any(invalid in news_title for invalid in invalid_titles):
-                                    continue
-                                
-                                # 添加到结构化条目
-                                structured_items.append((news_title, news_content))
-                            except Exception as e:
-                                print(f"处理加粗标签时出错: {e}")
+                if bold_tags:
+                    # 如果当前段落有加粗标签
+                    for bold_tag in bold_tags:
+                        try:
+                            # 提取加粗文本作为新闻标题
+                            news_title = bold_tag.get_text(strip=True)
+                            if not news_title:
                                 continue
-                
-                # 如果使用加粗标签成功提取到新闻条目
-                news_items = []
-                has_structured_content = False  # 标记是否有结构化内容
-                
-                if structured_items and len(structured_items) > 1:
-                    # 从结构化条目创建纯文本条目用于返回
-                    news_items = [title + content for title, content in structured_items]
-                    has_structured_content = True
-                else:
-                    # 使用传统的文本处理方法作为备选
-                    # 首先提取所有段落内容
-                    # 只处理最外层的p元素，避免父元素和子元素的文本都被提取导致重复
-                    paragraphs = content_div.find_all("p")
-                    text_content = []
-                    
-                    for p in paragraphs:
-                        text = p.get_text(strip=True)
-                        if text and len(text) > 10:  # 跳过太短的文本
-                            # 去除重复的标题行
-                            if "央视网消息（新闻联播）" in text and text_content and "央视网消息（新闻联播）" in text_content[0]:
+                            
+                            # 提取标题后面的内容作为新闻正文
+                            news_content = ""
+                            paragraph_content = []
+                            
+                            # 先处理当前节点的所有后续兄弟节点
+                            current_node = bold_tag.next_sibling
+                            while current_node:
+                                try:
+                                    if hasattr(current_node, "strip"):
+                                        # 文本节点
+                                        text = current_node.strip()
+                                        if text:
+                                            paragraph_content.append(text)
+                                    elif hasattr(current_node, "get_text"):
+                                        # 元素节点
+                                        text = current_node.get_text(strip=True)
+                                        if text:
+                                            paragraph_content.append(text)
+                                    
+                                    # 安全获取下一个兄弟节点
+                                    current_node = getattr(current_node, "next_sibling", None)
+                                except Exception as e:
+                                    print(f"处理节点时出错: {e}")
+                                    break
+                            
+                            # 将段落内容用换行符连接
+                            if paragraph_content:
+                                news_content = "\n\n".join(paragraph_content)
+                            
+                            # 去除标题和内容中的重复部分
+                            if news_title in news_content:
+                                news_content = news_content.replace(news_title, "", 1).strip()
+                            
+                            # 如果当前段落没有内容，查找下一个段落
+                            if not news_content:
+                                next_p = p.find_next_sibling(["p", "div"])
+                                if next_p:
+                                    next_content = next_p.get_text(strip=True)
+                                    # 同样去除重复的标题
+                                    if news_title in next_content:
+                                        next_content = next_content.replace(news_title, "", 1).strip()
+                                    news_content = next_content
+                            
+                            # 过滤掉无效标题
+                            invalid_titles = ['央视网消息', '新闻联播', '(新闻联播)', '央视网消息（新闻联播）']
+                            if any(invalid in news_title for invalid in invalid_titles):
                                 continue
-                            text_content.append(text)
-                    
-                    if text_content:
-                        # 组合内容，保持段落结构，段落之间空一行
-                        content = "\n\n".join([p.strip() for p in text_content if p.strip()])
-                        # 标准化换行符，保留段落之间的空行（将三个或更多换行符替换为两个）
-                        content = re.sub(r"[\r\n]{3,}" , "\n\n", content)
-                        # 去掉编辑信息和责任编辑信息
-                        content = re.sub(r"编辑：.*?责任编辑：.*?", "", content)
-                        content = re.sub(r"刘亮", "", content)
-                        content = re.sub(r"编辑：.*?", "", content)
-                        content = re.sub(r"责任编辑：.*?", "", content)
-                        # 去掉重复内容
-                        content = re.sub(r"(.+?)\n\1\n", "\1\n", content)
-                        # 移除所有位置的"央视网消息（新闻联播）："
-                        content = re.sub(r"央视网消息（新闻联播）：", "", content)
-                        
-                        # 使用更精确的文本模式匹配来分割新闻条目
-                        # 基于常见的新闻条目开头模式：数字+条、日期、地点/机构等
-                        # 使用正向前瞻确保只匹配完整的条目开头
-                        # 保留换行符，只清理多余空格
-                        content = re.sub(r"[ \t]+", " ", content).strip()  # 清理多余空格和制表符，保留换行符
-                        
-                        # 定义新闻条目开头的模式
-                        # 使用非捕获组来定义开头模式，然后匹配到下一个开头模式之前的内容
-                        entry_pattern = r"((?:[0-9]+条|今天|昨日|近日|[0-9]{4}年[0-9]{1,2}月[0-9]{1,2}日|国家|上海|北京|广东|海南|福建|山东|江苏|浙江|河北|河南|湖北|湖南|四川|陕西|甘肃|青海|新疆|西藏|内蒙古|辽宁|吉林|黑龙江|天津|重庆|广西|宁夏|山西|安徽|江西|贵州|云南|香港|澳门|台湾|美国|英国|法国|德国|日本|韩国|俄罗斯|联合国|国际|黎巴嫩|以色列|伊朗)[^。！？]*[。！？]+(?:[^。！？]*[。！？]+)*?)(?=(?:[0-9]+条|今天|昨日|近日|[0-9]{4}年[0-9]{1,2}月[0-9]{1,2}日|国家|上海|北京|广东|海南|福建|山东|江苏|浙江|河北|河南|湖北|湖南|四川|陕西|甘肃|青海|新疆|西藏|内蒙古|辽宁|吉林|黑龙江|天津|重庆|广西|宁夏|山西|安徽|江西|贵州|云南|香港|澳门|台湾|美国|英国|法国|德国|日本|韩国|俄罗斯|联合国|国际|黎巴嫩|以色列|伊朗)[^。！？]*[。！？]|$)"
-                        
-                        # 查找所有匹配的完整条目
-                        news_items = re.findall(entry_pattern, content, re.DOTALL)
-                
-                # 清理空条目
-                news_items = [item.strip() for item in news_items if item.strip()]
-                
-                # 去重处理
-                seen_items = set()
-                unique_news_items = []
-                for item in news_items:
-                    if item not in seen_items:
-                        seen_items.add(item)
-                        unique_news_items.append(item)
-                news_items = unique_news_items
-                
-                # 重新组合内容，每条快讯之间用空行分隔
-                content = "\n\n".join(news_items)
-                
-                # 去掉编辑信息和责任编辑信息
-                content = re.sub(r"编辑：.*?责任编辑：.*?", "", content)
-                content = re.sub(r"刘亮", "", content)
-                content = re.sub(r"编辑：.*?", "", content)
-                content = re.sub(r"责任编辑：.*?", "", content)
-                # 去掉重复内容
-                content = re.sub(r"(.+?)\n\1\n", "\1\n", content)
-                # 去掉多余的空行
-                content = re.sub(r"\n\n+", "\n\n", content).strip()
-                
-                # 对结构化内容中的编辑信息和多余文本进行清理
-                if has_structured_content and structured_items:
-                    cleaned_structured_items = []
-                    seen_titles = set()
-                    for item_title, item_content in structured_items:
-                        # 清理标题
-                        item_title = item_title.strip()
-                        item_title = re.sub(r"央视网消息（新闻联播）：", "", item_title)
-                        
-                        # 清理内容
-                        item_content = item_content.strip()
-                        item_content = re.sub(r"编辑：.*?责任编辑：.*?", "", item_content)
-                        item_content = re.sub(r"刘亮", "", item_content)
-                        item_content = re.sub(r"编辑：.*?", "", item_content)
-                        item_content = re.sub(r"责任编辑：.*?", "", item_content)
-                        item_content = re.sub(r"央视网消息（新闻联播）：", "", item_content)
-                        
-                        # 只保留非空且不重复的条目
-                        if item_title and item_content and item_title not in seen_titles:
-                            seen_titles.add(item_title)
-                            cleaned_structured_items.append((item_title, item_content))
-                    structured_items = cleaned_structured_items
-                    has_structured_content = len(structured_items) > 0
-                
-                # 返回结果时包含结构化内容
-                return {
-                    "title": title,
-                    "url": url,
-                    "content": content,
-                    "structured_content": structured_items if has_structured_content else None
-                }
+                            
+                            # 添加到结构化条目
+                            structured_items.append((news_title, news_content))
+                        except Exception as e:
+                            print(f"处理加粗标签时出错: {e}")
+                            continue
+            
+            # 如果使用加粗标签成功提取到新闻条目
+            news_items = []
+            has_structured_content = False  # 标记是否有结构化内容
+            
+            if structured_items and len(structured_items) > 1:
+                # 从结构化条目创建纯文本条目用于返回
+                news_items = [title + content for title, content in structured_items]
+                has_structured_content = True
             else:
-                # 提取所有段落内容（非联播快讯的普通新闻）
+                # 使用传统的文本处理方法作为备选
+                # 首先提取所有段落内容
                 # 只处理最外层的p元素，避免父元素和子元素的文本都被提取导致重复
                 paragraphs = content_div.find_all("p")
                 text_content = []
@@ -220,440 +183,349 @@ def get_news_content(url, headers):
                 if text_content:
                     # 组合内容，保持段落结构，段落之间空一行
                     content = "\n\n".join([p.strip() for p in text_content if p.strip()])
-                    # 标准化换行符，保留段落之间的空行（将三个或更多换行符替换为两个）
-                    content = re.sub(r"[\r\n]{3,}" , "\n\n", content)
-                    # 去掉编辑信息和责任编辑信息
-                    content = re.sub(r"编辑：.*?责任编辑：.*?", "", content)
-                    content = re.sub(r"刘亮", "", content)
-                    content = re.sub(r"编辑：.*?", "", content)
-                    content = re.sub(r"责任编辑：.*?", "", content)
-                    # 去掉重复内容
-                    content = re.sub(r"(.+?)\n\1\n", "\n", content)
-                    # 去掉多余的空行
-                    content = re.sub(r"\n\n+", "\n\n", content).strip()
-                
-                # 去掉多余的空行
-                content = re.sub(r"\n\n+", "\n\n", content).strip()
-                # 移除所有位置的"央视网消息（新闻联播）："
-                content = re.sub(r"央视网消息（新闻联播）：", "", content)
-                return {
-                    "title": soup.title.get_text(strip=True) if soup.title else "新闻",
-                    "url": url,
-                    "content": content
-                }
-        
-        # 如果没找到，尝试其他方法
-        content = ""
-        
-        # 尝试查找常见的正文容器
-        possible_containers = [
-            soup.find("div", class_="cnt_bd"),
-            soup.find("div", class_="content"),
-            soup.find("article"),
-            soup.find("div", class_="text_area"),
-            soup.find("div", class_="article_body"),
-            soup.find("div", class_="content_area"),
-        ]
-        
-        for container in possible_containers:
-            if container:
-                # 只处理最外层的p元素，避免父元素和子元素的文本都被提取导致重复
-                paragraphs = container.find_all("p")
-                if paragraphs:
-                    # 提取每个段落的文本并保持段落结构，段落之间空一行
-                    paragraph_texts = [p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)]
-                    content = "\n\n".join(paragraph_texts)
-                    break
-        
-        # 标准化换行符，保留段落之间的空行（将三个或更多换行符替换为两个）
-        content = re.sub(r"[\r\n]{3,}" , "\n\n", content)
-        # 移除所有位置的"央视网消息（新闻联播）："
-        content = re.sub(r"央视网消息（新闻联播）：", "", content)
-        
-        return {
-            "title": soup.title.get_text(strip=True) if soup.title else "新闻",
-            "url": url,
-            "content": content
-        }
-        
-    except Exception as e:
-        print(f"提取单个新闻内容时出错 ({url}): {e}")
-        return None
+                    # 去掉编辑信息、"央视网消息（新闻联播）："和重复内容，规范空行
+                    content = clean_text(content)
+                    
+                    # 使用更精确的文本模式匹配来分割新闻条目
+                    # 基于常见的新闻条目开头模式：数字+条、日期、地点/机构等
+                    # 使用正向前瞻确保只匹配完整的条目开头
+                    # 保留换行符，只清理多余空格
+                    content = collapse_spaces(content)  # 清理多余空格和制表符，保留换行符
+                    
+                    # 按条目开头的触发词（数字+条、日期、地点/机构等）切分，每个条目至少包含一个完整的句子
+                    # 切分器一次线性扫描完成，结果与原来的entry_pattern正则一致
+                    news_items = get_default_segmenter().split(content)
+            
+            # 清理空条目
+            news_items = [item.strip() for item in news_items if item.strip()]
+            
+            # 去重处理
+            seen_items = set()
+            unique_news_items = []
+            for item in news_items:
+                if item not in seen_items:
+                    seen_items.add(item)
+                    unique_news_items.append(item)
+            news_items = unique_news_items
+            
+            # 重新组合内容，每条快讯之间用空行分隔
+            content = "\n\n".join(news_items)
+            
+            # 去掉编辑信息、重复内容和多余的空行
+            content = clean_text(content)
+            
+            # 对结构化内容中的编辑信息和多余文本进行清理
+            if has_structured_content and structured_items:
+                cleaned_structured_items = []
+                seen_titles = set()
+                for item_title, item_content in structured_items:
+                    # 清理标题和内容
+                    item_title = clean_title(item_title)
+                    item_content = clean_text(item_content)
+                    
+                    # 只保留非空且不重复的条目
+                    if item_title and item_content and item_title not in seen_titles:
+                        seen_titles.add(item_title)
+                        cleaned_structured_items.append((item_title, item_content))
+                structured_items = cleaned_structured_items
+                has_structured_content = len(structured_items) > 0
+            
+            # 返回结果时包含结构化内容
+            return {
+                "title": title,
+                "url": url,
+                "content": content,
+                "structured_content": structured_items if has_structured_content else None
+            }
+        else:
+            # 提取所有段落内容（非联播快讯的普通新闻）
+            # 只处理最外层的p元素，避免父元素和子元素的文本都被提取导致重复
+            paragraphs = content_div.find_all("p")
+            text_content = []
+            
+            for p in paragraphs:
+                text = p.get_text(strip=True)
+                if text and len(text) > 10:  # 跳过太短的文本
+                    # 去除重复的标题行
+                    if "央视网消息（新闻联播）" in text and text_content and "央视网消息（新闻联播）" in text_content[0]:
+                        continue
+                    text_content.append(text)
+            
+            # 组合内容，保持段落结构，段落之间空一行
+            content = "\n\n".join([p.strip() for p in text_content if p.strip()])
+            # 去掉编辑信息、"央视网消息（新闻联播）："和重复内容，规范空行
+            content = clean_text(content)
+            return {
+                "title": soup.title.get_text(strip=True) if soup.title else "新闻",
+                "url": url,
+                "content": content
+            }
+    
+    # 如果没找到，尝试其他方法
+    content = ""
+    
+    # 尝试查找常见的正文容器
+    possible_containers = [
+        soup.find("div", class_="cnt_bd"),
+        soup.find("div", class_="content"),
+        soup.find("article"),
+        soup.find("div", class_="text_area"),
+        soup.find("div", class_="article_body"),
+        soup.find("div", class_="content_area"),
+    ]
+    
+    for container in possible_containers:
+        if container:
+            # 只处理最外层的p元素，避免父元素和子元素的文本都被提取导致重复
+            paragraphs = container.find_all("p")
+            if paragraphs:
+                # 提取每个段落的文本并保持段落结构，段落之间空一行
+                paragraph_texts = [p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)]
+                content = "\n\n".join(paragraph_texts)
+                break
+    
+    # 去掉编辑信息、"央视网消息（新闻联播）："和重复内容，规范空行
+    content = clean_text(content)
+    
+    return {
+        "title": soup.title.get_text(strip=True) if soup.title else "新闻",
+        "url": url,
+        "content": content
+    }
 
-def get_latest_xwlb_text(target_date=None):
-    """抓取指定日期或最新一天的新闻联播文字版，包括每条新闻的详细内容"""
-    base_url = "https://tv.cctv.com"
+def iter_news_contents(news_urls, headers, max_workers=DEFAULT_MAX_WORKERS, client=None, manifest=None):
+    """并发抓取多条新闻的详细内容，按news_urls的顺序逐条产出结果（失败的条目为None）
+    
+    前面的新闻一抓完就会产出，不必等待所有新闻完成；manifest见get_news_content
+    """
+    total = len(news_urls)
+    for i, news_url in enumerate(news_urls):
+        print(f"  正在抓取第 {i+1}/{total} 条: {news_url}")
+    
+    # 只有一个工作线程时直接顺序抓取，避免创建线程池
+    if max_workers <= 1 or total <= 1:
+        for news_url in news_urls:
+            yield get_news_content(news_url, headers, client, manifest)
+        return
+    
+    # executor.map按提交顺序返回结果，保证大纲和详细内容的顺序与链接顺序一致
+    with ThreadPoolExecutor(max_workers=min(max_workers, total)) as executor:
+        yield from executor.map(lambda news_url: get_news_content(news_url, headers, client, manifest), news_urls)
+
+def select_program_link(vide_links):
+    """返回完整节目的链接：完整新闻通常以VIDE0开头，没有时使用第一个链接"""
+    for link in vide_links:
+        if "VIDE0" in link:
+            return link
+    return vide_links[0]
+
+def find_vide_links(client, headers, base_url, target_date=None):
+    """找到指定日期（为空时为最新一天）的全部VIDE链接，完整节目通常在最前面；找不到时返回None
+    
+    指定日期时依次尝试日期索引、最新列表页和其他历史来源
+    """
     list_url = f"{base_url}/lm/xwlb/"
+    vide_links = []
+    seen = set()
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    # 0. 指定日期时先查日期索引：命中时直接请求当天的日期列表页，不访问最新列表页，也不尝试其他来源
+    if target_date:
+        with stage(STAGE_LIST_PAGE):
+            vide_links = get_date_index().date_links(client, headers, base_url, target_date)
+        if vide_links:
+            print(f"从日期索引找到 {len(vide_links)} 个{target_date.strftime('%Y年%m月%d日')}的VIDE链接")
     
-    try:
+    if not vide_links:
         # 1. 获取新闻列表页
         print("正在请求新闻列表页...")
-        response = requests.get(list_url, headers=headers)
-        response.encoding = "utf-8"
+        with stage(STAGE_LIST_PAGE) as timer:
+            response = client.get(list_url, headers=headers)
+            response.encoding = "utf-8"
+            timer.add_bytes(len(response.content))
         
         # 2. 解析页面，找到最新的新闻链接
-        soup = BeautifulSoup(response.text, "html.parser")
-        
         # 查找所有包含日期的VIDE链接，这些是新闻视频链接
-        all_links = soup.find_all("a", href=True)
-        
         # 收集所有VIDE链接，去重
-        vide_links = []
-        seen = set()
-        
-        for link in all_links:
-            href = link["href"]
-            if "shtml" in href and "VIDE" in href:
-                full_href = href if href.startswith("http") else f"{base_url}{href}"
-                if full_href not in seen:
-                    seen.add(full_href)
-                    vide_links.append(full_href)
+        for full_href in extract_vide_links(response.content, base_url):
+            if full_href not in seen:
+                seen.add(full_href)
+                vide_links.append(full_href)
+    
+    if not vide_links:
+        print("\n未找到最新新闻链接")
+        return None
+    
+    print(f"找到 {len(vide_links)} 个VIDE链接")
+    
+    # 根据目标日期过滤链接（如果提供了目标日期）
+    filtered_links = []
+    if target_date:
+        target_date_str = target_date.strftime("%Y/%m/%d")
+        target_date_url = f"{base_url}/{target_date_str}/"
         
-        if not vide_links:
-            print("\n未找到最新新闻链接")
+        # 1. 先尝试在当前列表页中查找指定日期的链接
+        for link in vide_links:
+            if target_date_str in link:
+                filtered_links.append(link)
+        
+        # 2. 如果当前列表页中没有找到，并行尝试历史新闻列表页和日期目录等来源
+        if not filtered_links:
+            print(f"当前列表页中未找到{target_date.strftime('%Y年%m月%d日')}的新闻链接，尝试其他方式获取...")
+            filtered_links = discover_date_links(client, headers, base_url, target_date)
+        
+        if not filtered_links:
+            print(f"未找到{target_date.strftime('%Y年%m月%d日')}的新闻链接")
+            print(f"提示：")
+            print(f"1. 当前列表页只包含{vide_links[0][20:30]}左右的最新新闻")
+            print(f"2. CCTV网站可能不提供通过直接URL访问历史新闻的功能")
+            print(f"3. 网站可能有防爬机制，限制自动化访问历史新闻")
+            print(f"4. 您可以尝试：")
+            print(f"   - 手动访问CCTV新闻联播页面寻找历史新闻")
+            print(f"   - 使用当前日期或最近日期的新闻")
+            print(f"   - 检查网络连接或尝试使用不同的网络环境")
             return None
         
-        print(f"找到 {len(vide_links)} 个VIDE链接")
-        
-        # 根据目标日期过滤链接（如果提供了目标日期）
-        filtered_links = []
-        if target_date:
-            target_date_str = target_date.strftime("%Y/%m/%d")
-            target_date_url = f"{base_url}/{target_date_str}/"
-            
-            # 1. 先尝试在当前列表页中查找指定日期的链接
-            for link in vide_links:
-                if target_date_str in link:
-                    filtered_links.append(link)
-            
-            # 2. 如果当前列表页中没有找到，尝试多种方式获取历史新闻
-            if not filtered_links:
-                print(f"当前列表页中未找到{target_date.strftime('%Y年%m月%d日')}的新闻链接，尝试其他方式获取...")
-                
-                # 尝试1: 直接构建日期对应的完整新闻链接
-                print("尝试直接构建日期对应的新闻链接...")
-                target_date_num = target_date.strftime("%Y%m%d")
-                
-                # 基于观察到的URL格式模式，构建可能的完整新闻链接
-                # 完整新闻通常以VIDE0开头
-                possible_news_urls = [
-                    # 尝试多种可能的完整新闻链接格式
-                    f"{base_url}/{target_date_str}/VIDE0{target_date_num[-4:]}{target_date_num}*.shtml",
-                    f"{base_url}/{target_date_str}/VIDE0{target_date_num}*.shtml",
-                    f"{base_url}/{target_date_str}/VIDEA{target_date_num[-4:]}{target_date_num}*.shtml",
-                    f"{base_url}/{target_date_str}/VIDEA{target_date_num}*.shtml"
-                ]
-                
-                # 尝试2: 尝试不同的历史新闻列表页URL格式
-                date_list_urls = [
-                    # 正确的历史新闻URL格式，从xwlb_data.js文件中发现
-                    f"{base_url}/lm/xwlb/day/{target_date_num}.shtml",
-                    # 尝试其他可能的格式
-                    f"{base_url}/lm/xwlb/data/index_{target_date_num}.shtml",
-                    f"{base_url}/lm/xwlb/data/{target_date_num}.shtml",
-                    f"{base_url}/lm/xwlb/{target_date_num}.shtml"
-                ]
-                
-                # 先尝试历史新闻列表页
-                for date_list_url in date_list_urls:
-                    if filtered_links:  # 如果已经找到链接，停止尝试
-                        break
-                    
-                    try:
-                        print(f"  尝试访问历史新闻列表页: {date_list_url}")
-                        date_response = requests.get(date_list_url, headers=headers)
-                        
-                        # 检查响应状态
-                        if date_response.status_code != 200:
-                            print(f"  页面访问失败 (状态码: {date_response.status_code})")
-                            continue
-                            
-                        date_response.encoding = "utf-8"
-                        date_soup = BeautifulSoup(date_response.text, "html.parser")
-                        
-                        # 从特定日期的列表页中提取VIDE链接
-                        date_all_links = date_soup.find_all("a", href=True)
-                        for link in date_all_links:
-                            href = link["href"]
-                            if "shtml" in href and "VIDE" in href:
-                                full_href = href if href.startswith("http") else f"{base_url}{href}"
-                                if full_href not in seen:
-                                    seen.add(full_href)
-                                    if target_date_str in full_href:
-                                        filtered_links.append(full_href)
-                        
-                        if filtered_links:
-                            print(f"  从{date_list_url}找到 {len(filtered_links)} 个{target_date.strftime('%Y年%m月%d日')}的VIDE链接")
-                            break
-                            
-                    except Exception as e:
-                        print(f"  访问{date_list_url}时出错: {e}")
-                        continue
-                
-                # 如果还是没找到，直接检查日期目录下的内容
-                if not filtered_links:
-                    print("尝试检查日期目录下的内容...")
-                    # 尝试访问日期目录页
-                    date_dir_url = f"{base_url}/{target_date_str}/"
-                    try:
-                        response = requests.get(date_dir_url, headers=headers)
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.text, "html.parser")
-                            all_links = soup.find_all("a", href=True)
-                            for link in all_links:
-                                href = link["href"]
-                                if "shtml" in href and "VIDE" in href:
-                                    full_href = href if href.startswith("http") else f"{base_url}{href}"
-                                    if full_href not in seen:
-                                        seen.add(full_href)
-                                        if target_date_str in full_href:
-                                            filtered_links.append(full_href)
-                    except Exception as e:
-                        print(f"访问日期目录时出错: {e}")
-            
-            # 如果还是没找到，尝试直接构建单个新闻链接（不依赖列表页）
-            if not filtered_links:
-                print(f"尝试直接构建{target_date.strftime('%Y年%m月%d日')}的单个新闻链接...")
-                
-                # 根据观察到的URL格式，构建可能的新闻链接目录并尝试获取内容
-                # 注意：由于URL中包含随机字符，无法直接构建完整链接
-                # 但我们可以尝试从日期目录获取所有链接
-                date_news_dir = f"{base_url}/{target_date_str}/"
-                try:
-                    # 直接请求日期目录，查看是否有可用的新闻链接
-                    dir_response = requests.get(date_news_dir, headers=headers)
-                    if dir_response.status_code == 200:
-                        dir_soup = BeautifulSoup(dir_response.text, "html.parser")
-                        
-                        # 查找所有链接，筛选出包含VIDE的新闻链接
-                        all_news_links = dir_soup.find_all("a", href=True)
-                        for link in all_news_links:
-                            href = link["href"]
-                            if "shtml" in href and "VIDE" in href:
-                                full_href = href if href.startswith("http") else f"{base_url}{href}"
-                                if full_href not in seen:
-                                    seen.add(full_href)
-                                    filtered_links.append(full_href)
-                except Exception as e:
-                    print(f"访问日期新闻目录时出错: {e}")
-            
-            if not filtered_links:
-                print(f"未找到{target_date.strftime('%Y年%m月%d日')}的新闻链接")
-                print(f"提示：")
-                print(f"1. 当前列表页只包含{vide_links[0][20:30]}左右的最新新闻")
-                print(f"2. CCTV网站可能不提供通过直接URL访问历史新闻的功能")
-                print(f"3. 网站可能有防爬机制，限制自动化访问历史新闻")
-                print(f"4. 您可以尝试：")
-                print(f"   - 手动访问CCTV新闻联播页面寻找历史新闻")
-                print(f"   - 使用当前日期或最近日期的新闻")
-                print(f"   - 检查网络连接或尝试使用不同的网络环境")
-                return None
-            
-            print(f"找到 {len(filtered_links)} 个{target_date.strftime('%Y年%m月%d日')}的VIDE链接")
-            vide_links = filtered_links
-        
-        # 获取最新的新闻联播完整视频链接
-        latest_news_url = None
-        for link in vide_links:
-            if "VIDE0" in link:  # 完整新闻通常以VIDE0开头
-                latest_news_url = link
-                break
+        print(f"找到 {len(filtered_links)} 个{target_date.strftime('%Y年%m月%d日')}的VIDE链接")
+        vide_links = filtered_links
+    return vide_links
+
+def resolve_broadcast(client, target_date=None):
+    """找到指定日期（为空时为最新一天）的节目，返回(完整节目链接, 单条新闻链接列表, 日期)，找不到时返回None
+
+    单条新闻最多MAX_STORIES条；日期为datetime，没有指定target_date时从完整节目链接中读取，读不到时为None。
+    get_latest_xwlb_text和xwlb_api的流式接口都从这里开始。
+    """
+    vide_links = find_vide_links(client, HEADERS, BASE_URL, target_date)
+    if not vide_links:
+        return None
+    program_url = select_program_link(vide_links)
+    day = target_date
+    if day is None:
+        date_match = _DATE_PATH_RE.search(program_url)
+        if date_match:
+            day = datetime(*(int(part) for part in date_match.groups()))
+    return program_url, [link for link in vide_links if link != program_url][:MAX_STORIES], day
+
+def get_latest_xwlb_text(target_date=None, max_workers=DEFAULT_MAX_WORKERS, client=None, output_dir=None):
+    """抓取指定日期或最新一天的新闻联播文字版，包括每条新闻的详细内容
+    
+    max_workers: 并发抓取单条新闻详情页的线程数，设为1时按顺序抓取
+    client: 本次抓取使用的HttpClient，为空时创建一个连接池大小与max_workers一致的客户端
+    output_dir: 指定时边抓取边把文字版流式写入该目录（结果中content为None，filename为文件路径），
+                否则在内存中生成完整内容；两种方式下detailed_news都包含全部新闻，供导出和索引使用
+    """
+    headers = HEADERS
+    
+    # 本次抓取的所有请求共用一个连接池
+    owns_client = client is None
+    if owns_client:
+        client = HttpClient(pool_size=max_workers)
+    writer = None
+    
+    try:
+        resolved = resolve_broadcast(client, target_date)
+        if resolved is None:
+            return None
         
-        # 如果没找到VIDE0开头的，就用第一个
-        if not latest_news_url:
-            latest_news_url = vide_links[0]
+        # 新闻联播完整视频链接、单个新闻链接（除了完整新闻）和节目日期
+        latest_news_url, news_item_links, day = resolved
         
         print(f"使用完整新闻链接: {latest_news_url}")
         
         # 3. 请求新闻详情页，获取新闻大纲和单个新闻链接
         print("正在请求新闻详情页...")
-        news_response = requests.get(latest_news_url, headers=headers)
-        news_response.encoding = "utf-8"
-        news_soup = BeautifulSoup(news_response.text, "html.parser")
-        
-        # 提取完整新闻标题
-        title = news_soup.title.get_text(strip=True) if news_soup.title else "新闻联播"
-        
-        # 4. 从列表页获取所有单个新闻链接（除了完整新闻）
-        print("\n提取单个新闻链接...")
-        news_item_links = []
-        
-        for link in vide_links:
-            if link != latest_news_url:  # 排除完整新闻链接
-                news_item_links.append(link)
+        with stage(STAGE_DETAIL_FETCH) as timer:
+            news_response = client.get(latest_news_url, headers=headers)
+            news_response.encoding = "utf-8"
+            timer.add_bytes(len(news_response.content))
+        program_hash = content_hash(news_response.content)
+        
+        print(f"\n找到 {len(news_item_links)} 个单个新闻链接")
+        
+        # 确定日期，用于标题和文件名（格式：YYYY年MM月DD日）：优先使用用户提供的日期，其次是URL中的日期
+        date_str = day.strftime("%Y年%m月%d日") if day else ""
+        
+        # 输出到目录时使用与当天文件放在一起的清单：完整节目页和单条新闻没有变化时直接使用上次的提取结果；
+        # 解析后端或快讯触发词与上次不同时不复用
+        manifest = None
+        if output_dir is not None and date_str:
+            fingerprint = extraction_fingerprint(get_parser_backend(), get_default_segmenter().words)
+            manifest = StoryManifest(manifest_path_for(os.path.join(output_dir, output_filename_for(date_str))),
+                                     fingerprint)
+        
+        # 提取完整新闻标题，清单中有记录时不再解析完整节目页
+        title = manifest.program_title(program_hash) if manifest is not None else None
+        if title is None:
+            with stage(STAGE_PARSE):
+                news_soup = make_soup(news_response.text)
+            title = news_soup.title.get_text(strip=True) if news_soup.title else "新闻联播"
+            if manifest is not None:
+                manifest.set_program(program_hash, title)
+        
+        if not date_str:
+            # 如果URL中没有找到日期，尝试从标题中提取
+            date_match = re.search(r'(\d{4})(\d{2})(\d{2})', title)
+            if date_match:
+                date_str = f"{date_match.group(1)}年{date_match.group(2)}月{date_match.group(3)}日"
         
-        print(f"找到 {len(news_item_links)} 个单个新闻链接")
+        # 流式输出：日期一确定就打开文件，写入开头，之后每抓完一条新闻就按顺序写入
+        if output_dir is not None:
+            writer = MarkdownStreamWriter(os.path.join(output_dir, output_filename_for(date_str))).open(date_str)
+            print(f"正在写入: {writer.part_path}")
         
         # 5. 从单个新闻链接中提取大纲和详细内容
         print("\n提取新闻大纲和详细内容...")
         
-        # 先获取所有单个新闻的内容，然后组合大纲
         detailed_news = []
         outline_items = []
         
-        for i, news_url in enumerate(news_item_links[:20]):  # 最多处理20条新闻
-            print(f"  正在抓取第 {i+1}/{len(news_item_links)} 条: {news_url}")
-            news_content = get_news_content(news_url, headers)
-            
+        # 并发抓取各条新闻，结果按原始顺序逐条返回
+        for news_content in iter_news_contents(news_item_links, headers, max_workers=max_workers, client=client,
+                                               manifest=manifest):
             if news_content and news_content["content"]:
                 detailed_news.append(news_content)
                 
-                # 提取大纲标题（从标题中提取）
-                news_title = news_content["title"]
-                # 清理标题，去除[视频]前缀和其他多余内容
-                news_title = re.sub(r"^\[视频\]", "", news_title).strip()
-                outline_items.append(news_title)
+                # 提取大纲标题（从标题中提取），去除[视频]前缀和其他多余内容
+                outline_items.append(clean_news_title(news_content["title"]))
+                if writer is not None:
+                    writer.write_news(news_content)
+        
+        metrics = get_run_metrics()
+        if metrics is not None:
+            metrics.incr("stories", len(detailed_news))
+            metrics.incr("story_failures", len(news_item_links) - len(detailed_news))
+            if manifest is not None:
+                metrics.incr("stories_reused", manifest.reused)
+        
+        # 一条新闻都没有抓到时不生成文件，返回None：只有开头的文件会被回填和--skip-existing当作已完成而不再重抓
+        if not detailed_news:
+            print(f"\n没有抓取到{date_str or '当天'}的任何新闻详细内容")
+            if writer is not None:
+                writer.abort()
+                writer = None
+            return None
         
         # 6. 生成大纲内容
-        outline_content = ""
-        if outline_items:
-            outline_content = "\n".join([f"- {title}" for i, title in enumerate(outline_items)])
+        outline_content = render_outline_content(outline_items)
         
-        # 7. 组合最终内容
+        # 7. 组合最终内容：流式输出时补上大纲并原子地生成最终文件，否则在内存中渲染
         print("\n组合最终内容...")
-        
-        # 先添加标题（使用Markdown一级标题）
-        # 清理标题，确保它是用户要求的格式：YYYY年MM月DD日新闻联播文字版｜
-        date_str = ""
-        # 优先使用用户提供的日期
-        if target_date:
-            date_str = target_date.strftime("%Y年%m月%d日")
+        filename = None
+        if writer is not None:
+            filename = writer.finish()
+            final_content = None
+            content_length = writer.chars
+            print(f"\n新闻内容已保存到文件: {filename}")
         else:
-            # 尝试从URL中提取日期信息（URL格式更一致）
-            date_match = re.search(r'(\d{4})/(\d{2})/(\d{2})', latest_news_url)
-            if date_match:
-                # 格式化为YYYY年MM月DD日格式
-                date_str = f"{date_match.group(1)}年{date_match.group(2)}月{date_match.group(3)}日"
-            else:
-                # 如果URL中没有找到日期，尝试从标题中提取
-                date_match = re.search(r'(\d{4})(\d{2})(\d{2})', title)
-                if date_match:
-                    date_str = f"{date_match.group(1)}年{date_match.group(2)}月{date_match.group(3)}日"
-        # 在开头添加图片
-        final_content = f"![](https://files.mdnice.com/user/158914/f297f420-0530-4a26-8d81-0644824ee6e0.jpg)\n\n"
-        # 生成用户要求的标题格式
-        clean_main_title = f"{date_str}新闻联播文字版｜｜｜｜" if date_str else "新闻联播文字版｜｜｜｜"
-        final_content += f"{clean_main_title}\n\n"
-        # 添加大纲（使用Markdown五级标题）
-        if outline_content:
-            final_content += "# 新闻大纲\n"
-            final_content += outline_content
-            final_content += "\n\n"
+            final_content = render_document(date_str, detailed_news)
+            content_length = len(final_content)
         
-        # 再添加每个新闻的详细内容（使用Markdown五级标题）
-        if detailed_news:
-            final_content += "# 详细新闻\n\n"
-            
-            for i, news in enumerate(detailed_news):
-                # 清理标题，去除[视频]前缀
-                clean_title = re.sub(r"^\[视频\]", "", news['title']).strip()
-                
-                # 使用Markdown六级标题
-                final_content += f"## {clean_title}\n"
-                
-                # 特殊处理联播快讯
-                if "联播快讯" in clean_title:
-                    # 优先使用结构化内容
-                    if news.get("structured_content"):
-                        for title_part, content_part in news["structured_content"]:
-                            title_part = title_part.strip()
-                            content_part = content_part.strip()
-                            
-                            if not title_part and not content_part:
-                                continue
-                                
-                            # 确保标题不为空
-                            if not title_part:
-                                title_part = "新闻快讯"
-                            
-                            # 使用Markdown七级标题
-                            final_content += f"### {title_part}\n"
-                            
-                            # 输出内容部分
-                            if content_part:
-                                final_content += f"{content_part}\n\n"
-                    else:
-                        # 没有结构化内容时，使用传统的分割方法
-                        news_items = news['content'].split("\n\n")
-                        
-                        for item in news_items:
-                            item = item.strip()
-                            if not item:
-                                continue
-                                
-                            # 提取新闻标题（更加智能的方式）
-                            title_part = ""
-                            
-                            # 尝试查找合适的标题
-                            if len(item) > 50:
-                                # 情况1：查找第一个标点符号（。、：）前的内容作为标题
-                                for punc in ["。", "、", "：", "，"]:
-                                    if punc in item[:100]:
-                                        title_part = item.split(punc, 1)[0].strip() + punc
-                                        break
-                            
-                            # 如果没有找到合适的标点符号
-                            if not title_part:
-                                # 情况2：查找日期前的内容
-                                date_match = re.search(r"(今天|昨日|近日|[0-9]{4}年[0-9]{1,2}月[0-9]{1,2}日)", item)
-                                if date_match:
-                                    title_part = item[:date_match.start()].strip()
-                                    if title_part:
-                                        # 确保标题以标点符号结尾
-                                        if not title_part.endswith(("。", "、", "：", "，")):
-                                            title_part += "："
-                                else:
-                                    # 情况3：使用前70个字符作为标题
-                                    title_part = item[:70].strip()
-                                    if len(item) > 70:
-                                        title_part += "..."
-                            
-                            # 确保标题不为空
-                            if not title_part:
-                                title_part = "新闻快讯"
-                            
-                            # 使用Markdown三级标题
-                            final_content += f"# {title_part}\n"
-                            
-                            # 只输出item中除标题外的内容部分
-                            if title_part in item:
-                                # 去掉标题部分，只保留正文
-                                content_part = item.replace(title_part, "", 1).strip()
-                                if content_part:
-                                    final_content += f"{content_part}\n\n"
-                            else:
-                                # 如果标题不在item中，输出完整内容
-                                final_content += f"{item}\n\n"
-                else:
-                    # 普通新闻，直接添加内容
-                    final_content += f"{news['content']}\n\n"
-        
-        # 如果没有获取到详细内容，尝试直接从页面提取大纲
-        if not detailed_news and not outline_content:
-            print("\n尝试从完整新闻页面提取大纲...")
-            
-            # 查找页面中的所有div，寻找包含新闻大纲的内容
-            all_divs = news_soup.find_all("div")
-            
-            for div in all_divs:
-                text = div.get_text(strip=True)
-                if text and len(text) > 500:  # 寻找较长的文本内容
-                    # 检查是否包含新闻条目格式
-                    if re.search(r"1\..*?2\..*?3\.", text, re.DOTALL):
-                        outline_content = text
-                        break
-            
-            if outline_content:
-                # 清理大纲内容
-                outline_content = re.sub(r"\s+" , " ", outline_content).strip()
-                final_content += "【新闻大纲】\n"
-                final_content += outline_content
+        if manifest is not None:
+            manifest.prune(news_item_links)
+            manifest.save()
+            print(f"清单: {manifest.format_stats()}")
         
-        print(f"\n成功提取到完整新闻内容，总长度: {len(final_content)}字符")
+        print(f"\n成功提取到完整新闻内容，总长度: {content_length}字符")
         
         print(f"\n标题: {title}")
         if outline_content:
@@ -661,17 +533,26 @@ def get_latest_xwlb_text(target_date=None):
         
         return {
             "title": title,
+            "date": date_str,
             "url": latest_news_url,
             "content": final_content,
+            "filename": filename,
             "outline": outline_content,
-            "detailed_news": detailed_news
+            "detailed_news": detailed_news,
+            "http_stats": client.stats()
         }
         
     except Exception as e:
         print(f"抓取过程中发生错误: {e}")
         import traceback
         traceback.print_exc()
+        if writer is not None:
+            writer.abort()
         return None
+    finally:
+        print(f"\nHTTP统计: {client.format_stats()}")
+        if owns_client:
+            client.close()
 
 def extract_news_outline(content):
     """从新闻内容中提取标题大纲"""
@@ -701,10 +582,47 @@ def extract_news_outline(content):
     
     return outline
 
-def save_to_file(data, filename=None):
-    """将抓取的内容保存到文件，按照用户要求的Markdown格式，文件名包含新闻日期"""
+def find_existing_output(target_date, output_dir=".", archive_path=None, verify=False):
+    """返回指定日期已有的输出（文件路径或"归档:日期"），没有时返回None；不创建HTTP客户端，也不解析页面
+
+    没有详细新闻部分的输出（例如所有新闻都抓取失败时留下的只有开头的文件）不算已有输出，需要重新抓取。
+    verify为True时还检查内容：文件或归档帧能读出（归档帧校验CRC），并能解析出当天的新闻。
+    """
+    date_str = target_date.strftime("%Y年%m月%d日")
+    path = os.path.join(output_dir, output_filename_for(date_str))
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        location = path
+    elif archive_path and os.path.exists(archive_path):
+        from xwlb_archive import BroadcastArchive
+        archive = BroadcastArchive(archive_path, readonly=True)
+        try:
+            text = archive.get(target_date)
+        finally:
+            archive.close()
+        location = f"{archive_path}:{target_date.strftime('%Y%m%d')}"
+    else:
+        return None
+    if text is None or not _DETAIL_SECTION_RE.search(text):
+        return None
+    if not verify:
+        return location
+    from xwlb_export import parse_markdown_archive
+    records = parse_markdown_archive(text, target_date.strftime("%Y%m%d"))
+    return location if records else None
+
+def save_to_file(data, filename=None, output_dir=None):
+    """将抓取的内容保存到文件，按照用户要求的Markdown格式，文件名包含新闻日期
+    
+    output_dir: 输出目录，默认为当前目录；返回实际写入的文件路径
+    """
     if not data:
-        return
+        return None
+    
+    # 已经流式写入磁盘的结果，直接返回文件路径
+    if data.get('content') is None and data.get('filename'):
+        return data['filename']
     
     # 直接使用get_latest_xwlb_text函数生成的Markdown格式内容
     content = data['content']
@@ -720,17 +638,200 @@ def save_to_file(data, filename=None):
         # 如果没有从内容中提取到日期，使用默认文件名
         filename = "新闻联播文字版.txt"
     
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        filename = os.path.join(output_dir, filename)
+    
     # 1. 写入文件
-    with open(filename, "w", encoding="utf-8") as f:
+    with stage(STAGE_WRITE) as timer, open(filename, "w", encoding="utf-8") as f:
         f.write(content)
+        timer.add_bytes(f.tell())
     
     print(f"\n新闻内容已保存到文件: {filename}")
+    return filename
 
 if __name__ == "__main__":
+    # 全文检索子命令
+    if len(sys.argv) > 1 and sys.argv[1] in ("search", "import-archive"):
+        from xwlb_search import main as search_main
+        search_main(sys.argv[1:])
+        exit(0)
+    
     parser = argparse.ArgumentParser(description="抓取指定日期的新闻联播文字版")
     parser.add_argument("--date", help="指定日期（格式：YYYYMMDD），默认抓取最新日期", type=str)
+    parser.add_argument("--workers", help=f"并发抓取新闻详情页的线程数，默认{DEFAULT_MAX_WORKERS}，设为1时按顺序抓取", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--connect-timeout", help=f"连接超时（秒），默认{DEFAULT_CONNECT_TIMEOUT}", type=float, default=DEFAULT_CONNECT_TIMEOUT)
+    parser.add_argument("--read-timeout", help=f"读取超时（秒），默认{DEFAULT_READ_TIMEOUT}", type=float, default=DEFAULT_READ_TIMEOUT)
+    parser.add_argument("--retries", help=f"遇到5xx或连接重置时的最大重试次数，默认{DEFAULT_MAX_RETRIES}", type=int, default=DEFAULT_MAX_RETRIES)
+    parser.add_argument("--start", help="回填模式的开始日期（格式：YYYYMMDD），需与--end一起使用", type=str)
+    parser.add_argument("--end", help="回填模式的结束日期（格式：YYYYMMDD，包含该日）", type=str)
+    parser.add_argument("--dates-file", help="回填模式的日期列表文件，每行一个YYYYMMDD格式的日期", type=str)
+    parser.add_argument("--jobs", help="回填模式下并行处理的日期数（进程数），默认4", type=int, default=4)
+    parser.add_argument("--max-inflight", help="回填模式下所有进程合计的最大在途请求数，默认16", type=int, default=16)
+    parser.add_argument("--output-dir", help="输出目录，默认为当前目录", type=str, default=None)
+    parser.add_argument("--journal", help="回填进度日志文件，默认为输出目录下的.xwlb_backfill.journal", type=str, default=None)
+    parser.add_argument("--cache-dir", help=f"HTTP响应缓存目录，默认{DEFAULT_CACHE_DIR}", type=str, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--cache-max-mb", help="HTTP响应缓存的大小上限（MB），默认512", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024))
+    parser.add_argument("--list-ttl", help=f"新闻列表页缓存的有效期（秒），默认{DEFAULT_LIST_TTL}", type=int, default=DEFAULT_LIST_TTL)
+    parser.add_argument("--no-cache", help="不使用HTTP响应缓存", action="store_true")
+    parser.add_argument("--offline", help="离线模式：只从缓存读取页面，不访问网络", action="store_true")
+    parser.add_argument("--parser", help="HTML解析后端，默认auto（安装了lxml时使用lxml，否则使用html.parser）",
+                        choices=(AUTO_BACKEND,) + PARSER_BACKENDS, default=AUTO_BACKEND)
+    parser.add_argument("--export", help="同时把每条新闻作为结构化记录追加到该JSONL文件", type=str, default=None)
+    parser.add_argument("--index", help="同时把抓取到的新闻写入该全文检索索引（见search子命令）", type=str, default=None)
+    parser.add_argument("--archive", help="把每天的文字版追加到该单文件归档（见xwlb_archive.py），不再保留每天的文件", type=str, default=None)
+    parser.add_argument("--dedup-index", help="导出时用该近似重复索引标记与更早日期重复的条目（duplicate_of字段）", type=str, default=None)
+    parser.add_argument("--skip-duplicates", help="导出时不写出近似重复的条目，需要同时指定--dedup-index", action="store_true")
+    parser.add_argument("--metrics-json", help="把各阶段的耗时、字节数和每个URL的请求记录写入该JSON文件", type=str, default=None)
+    parser.add_argument("--metrics-prom", help="把各阶段的统计写入该Prometheus textfile collector文件（.prom）", type=str, default=None)
+    parser.add_argument("--profile", help="对解析阶段做cProfile，结果写入该pstats文件", type=str, default=None)
+    parser.add_argument("--date-index-url", help=f"日期索引的数据文件地址，默认{DEFAULT_DATA_URL}", type=str, default=DEFAULT_DATA_URL)
+    parser.add_argument("--watch", help="监视模式：持续轮询最新列表页，增量抓取新发布的新闻，节目完整时重写当天的文件", action="store_true")
+    parser.add_argument("--poll-interval", help="监视模式下播出时段内的轮询间隔（秒），默认60", type=int, default=60)
+    parser.add_argument("--idle-interval", help="监视模式下其余时间的轮询间隔（秒），默认1800", type=int, default=1800)
+    parser.add_argument("--serve", help="服务模式：启动本地HTTP服务，按需提供/broadcast/{日期}和/latest（Markdown或JSON）", action="store_true")
+    parser.add_argument("--host", help="服务模式的监听地址，默认127.0.0.1", type=str, default="127.0.0.1")
+    parser.add_argument("--port", help="服务模式的监听端口，默认8765", type=int, default=8765)
+    parser.add_argument("--serve-memory-mb", help="服务模式下内存缓存的大小上限（MB），默认64", type=int, default=64)
+    parser.add_argument("--rate", help=f"每个主机的初始请求速率（次/秒），之后按响应状态和延迟自动调整，设为0时不限速；回填模式下为所有进程合计，默认{DEFAULT_RATE}",
+                        type=float, default=DEFAULT_RATE)
+    parser.add_argument("--max-rate", help=f"自动调整时每个主机的速率上限（次/秒），默认{DEFAULT_MAX_RATE}", type=float, default=DEFAULT_MAX_RATE)
+    parser.add_argument("--early-stop", help="流式下载新闻详情页，正文结束后立即关闭连接，不下载页面其余部分", action="store_true")
+    parser.add_argument("--skip-existing", help="与--date一起使用：当天的输出文件（或--archive中的记录）已存在且包含详细新闻时直接返回，不再抓取", action="store_true")
+    parser.add_argument("--verify", help="与--date一起使用：只检查当天已有的输出能否完整读出，存在且完好时返回0，否则返回1", action="store_true")
+    parser.add_argument("--flash-vocab", help="联播快讯切分的额外触发词文件，每行一个词", type=str, default=None)
     args = parser.parse_args()
     
+    # 已有输出的日期：直接返回或只做检查，不创建HTTP客户端，也不导入requests和bs4
+    if args.skip_existing or args.verify:
+        if not args.date:
+            parser.error("--skip-existing和--verify需要同时指定--date")
+        try:
+            existing_date = datetime.strptime(args.date, "%Y%m%d")
+        except ValueError:
+            parser.error("日期格式错误，请使用YYYYMMDD格式")
+        try:
+            existing = find_existing_output(existing_date, args.output_dir or ".", args.archive, verify=args.verify)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"读取已有输出时出错: {e}")
+            existing = None
+        if existing:
+            print(f"已有输出: {existing}")
+            exit(0)
+        if args.verify:
+            print(f"没有{existing_date.strftime('%Y年%m月%d日')}的完好输出")
+            exit(1)
+    
+    try:
+        set_parser_backend(args.parser)
+        if args.flash_vocab:
+            configure_default_segmenter(load_trigger_words(args.flash_vocab))
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    
+    if args.offline and args.no_cache:
+        parser.error("--offline需要使用缓存，不能与--no-cache同时指定")
+    if args.skip_duplicates and not args.dedup_index:
+        parser.error("--skip-duplicates需要同时指定--dedup-index")
+    cache_options = None
+    if not args.no_cache:
+        cache_options = {"cache_dir": args.cache_dir, "max_bytes": args.cache_max_mb * 1024 * 1024, "list_ttl": args.list_ttl}
+    client_options = {"connect_timeout": args.connect_timeout, "read_timeout": args.read_timeout,
+                      "max_retries": args.retries, "offline": args.offline, "early_stop": args.early_stop,
+                      "rate_limit": args.rate, "max_rate": args.max_rate}
+    
+    # 回填模式：一次处理多个日期
+    if args.start or args.end or args.dates_file:
+        from xwlb_backfill import run_backfill, date_range, read_dates_file
+        if bool(args.start) != bool(args.end):
+            parser.error("--start和--end必须同时指定")
+        try:
+            dates = []
+            if args.start:
+                dates.extend(date_range(datetime.strptime(args.start, "%Y%m%d"), datetime.strptime(args.end, "%Y%m%d")))
+            if args.dates_file:
+                dates.extend(read_dates_file(args.dates_file))
+        except ValueError:
+            print("日期格式错误，请使用YYYYMMDD格式")
+            exit(1)
+        stats = run_backfill(dates, output_dir=args.output_dir, jobs=args.jobs, max_workers=args.workers,
+                             max_inflight=args.max_inflight, client_options=client_options,
+                             cache_options=cache_options, journal_path=args.journal, export_path=args.export,
+                             index_path=args.index, date_index_url=args.date_index_url,
+                             dedup_path=args.dedup_index, skip_duplicates=args.skip_duplicates,
+                             archive_path=args.archive)
+        print(f"\n回填完成！成功 {stats['done']} 天，失败 {stats['failed']} 天，跳过 {stats['skipped']} 天")
+        exit(1 if stats["failed"] else 0)
+    
+    # 监视模式：长时间运行，只抓取新出现的新闻
+    if args.watch:
+        from xwlb_watch import BroadcastWatcher
+        if args.date or args.offline:
+            parser.error("--watch只能抓取最新日期，不能与--date或--offline同时指定")
+        cache = ResponseCache(**cache_options) if cache_options is not None else None
+        client = HttpClient(pool_size=args.workers, cache=cache, **client_options)
+        
+        def on_complete(date_str, detailed_news, path):
+            if args.export:
+                from xwlb_export import append_jsonl, broadcast_records
+                records = broadcast_records(date_str, detailed_news)
+                if args.dedup_index:
+                    from xwlb_dedup import dedup_records
+                    records = dedup_records(args.dedup_index, records, args.skip_duplicates)
+                count = append_jsonl(args.export, records)
+                print(f"已导出 {count} 条记录到 {args.export}")
+            if args.index:
+                from xwlb_search import SearchIndex
+                index = SearchIndex(args.index)
+                count = index.add_broadcast(date_str, detailed_news)
+                index.close()
+                print(f"已索引 {count} 条新闻到 {args.index}")
+            if args.archive:
+                from xwlb_archive import archive_file
+                archive_file(args.archive, date_str, path, remove=True)
+                print(f"已归档到 {args.archive}")
+        
+        watcher = BroadcastWatcher(client, output_dir=args.output_dir or ".", max_workers=args.workers,
+                                   poll_interval=args.poll_interval, idle_interval=args.idle_interval,
+                                   on_complete=on_complete)
+        print("开始监视新闻联播列表页（Ctrl+C结束）...")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print(f"\n监视已结束: {watcher.format_stats()}")
+        finally:
+            client.close()
+        exit(0)
+    
+    # 服务模式：常驻进程，按需读取或抓取并缓存解析好的结果
+    if args.serve:
+        from xwlb_serve import BroadcastStore, make_server
+        if args.date or args.watch:
+            parser.error("--serve不能与--date或--watch同时指定")
+        cache = ResponseCache(**cache_options) if cache_options is not None else None
+        if cache_options is not None:
+            configure_strategy_cache(os.path.join(cache_options["cache_dir"], STRATEGY_FILENAME))
+            configure_date_index(os.path.join(cache_options["cache_dir"], INDEX_FILENAME), args.date_index_url)
+        else:
+            configure_date_index(None, args.date_index_url)
+        client = HttpClient(pool_size=args.workers, cache=cache, **client_options)
+        store = BroadcastStore(client, output_dir=args.output_dir or ".",
+                               max_bytes=args.serve_memory_mb * 1024 * 1024, max_workers=args.workers,
+                               archive_path=args.archive)
+        try:
+            server = make_server(store, args.host, args.port)
+        except OSError as e:
+            parser.error(f"无法监听 {args.host}:{args.port}: {e}")
+        print(f"服务已启动: http://{args.host}:{server.server_port}/latest（Ctrl+C结束）")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n服务已结束: {store.format_stats()}")
+        finally:
+            server.server_close()
+            client.close()
+        exit(0)
+    
     target_date = None
     if args.date:
         try:
@@ -740,9 +841,52 @@ if __name__ == "__main__":
             exit(1)
     
     print("开始抓取新闻联播文字版..." + (f"（日期：{target_date.strftime('%Y年%m月%d日')}）" if target_date else "（最新日期）"))
-    xwlb_data = get_latest_xwlb_text(target_date)
+    cache = ResponseCache(**cache_options) if cache_options is not None else None
+    if cache_options is not None:
+        # 历史日期链接来源的学习记录与HTTP缓存放在一起
+        configure_strategy_cache(os.path.join(cache_options["cache_dir"], STRATEGY_FILENAME))
+        configure_date_index(os.path.join(cache_options["cache_dir"], INDEX_FILENAME), args.date_index_url)
+    else:
+        configure_date_index(None, args.date_index_url)
+    client = HttpClient(pool_size=args.workers, cache=cache, **client_options)
+    if args.metrics_json or args.metrics_prom or args.profile:
+        start_run(profile=bool(args.profile))
+    xwlb_data = get_latest_xwlb_text(target_date, max_workers=args.workers, client=client,
+                                     output_dir=args.output_dir or ".")
+    client.close()
+    metrics = stop_run()
+    if metrics is not None:
+        print(f"\n阶段耗时: {metrics.format_stages()}")
+        http_stats = xwlb_data["http_stats"] if xwlb_data else client.stats()
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json, http_stats, success=bool(xwlb_data))
+            print(f"统计已写入: {args.metrics_json}")
+        if args.metrics_prom:
+            metrics.write_prometheus(args.metrics_prom, http_stats, success=bool(xwlb_data))
+            print(f"Prometheus统计已写入: {args.metrics_prom}")
+        if args.profile:
+            print(metrics.write_profile(args.profile))
+            print(f"解析阶段的profile已写入: {args.profile}")
     if xwlb_data:
-        save_to_file(xwlb_data)
+        filename = save_to_file(xwlb_data, output_dir=args.output_dir)
+        if args.export:
+            from xwlb_export import append_jsonl, broadcast_records
+            records = broadcast_records(xwlb_data["date"], xwlb_data["detailed_news"])
+            if args.dedup_index:
+                from xwlb_dedup import dedup_records
+                records = dedup_records(args.dedup_index, records, args.skip_duplicates)
+            count = append_jsonl(args.export, records)
+            print(f"已导出 {count} 条记录到 {args.export}")
+        if args.index:
+            from xwlb_search import SearchIndex
+            index = SearchIndex(args.index)
+            count = index.add_broadcast(xwlb_data["date"], xwlb_data["detailed_news"])
+            index.close()
+            print(f"已索引 {count} 条新闻到 {args.index}")
+        if args.archive and filename:
+            from xwlb_archive import archive_file
+            archive_file(args.archive, xwlb_data["date"], filename, remove=True)
+            print(f"已归档到 {args.archive}")
         print("\n抓取完成！")
     else:
         print("\n抓取失败！")
\ No newline at end of file
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""新闻联播文字版的本地全文检索：SQLite FTS5倒排索引，中文按二元组（bigram）切词
+
+索引时每段连续的汉字切成相互重叠的二元组，最后一个字单独再作为一个词；英文和数字按整词索引。
+查询词按同样方式切分后作为FTS5短语查询，因此任意长度不少于两个字的中文片段都能精确命中，
+不需要分词词典。
+
+用法：
+    python3 xwlb_scraper.py search 乡村振兴 --start 20240101 --end 20241231 --title 快讯
+    python3 xwlb_scraper.py import-archive archive/*新闻联播文字版.txt
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+from xwlb_export import archive_paths, broadcast_records, iter_markdown_archives, normalize_date
+
+# 默认的索引文件，保存在当前目录
+DEFAULT_INDEX_PATH = "xwlb_search.sqlite3"
+# 导入已有文件时每个事务写入的天数
+IMPORT_BATCH_DAYS = 200
+
+_CJK_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]+|[0-9A-Za-z]+")
+
+
+def _is_cjk(run):
+    return not run[0].isascii()
+
+
+def index_tokens(text):
+    """把文本切成索引用的词序列，用空格连接"""
+    tokens = []
+    for match in _CJK_RE.finditer(text or ""):
+        run = match.group()
+        if _is_cjk(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run.lower())
+    return " ".join(tokens)
+
+
+def _phrase(run):
+    """把查询中的一段连续文字转换为FTS5表达式"""
+    if not _is_cjk(run):
+        return f'"{run.lower()}"'
+    if len(run) == 1:
+        # 单个汉字：匹配以它开头的二元组，或者它单独成词（位于一段汉字末尾）
+        return f'("{run}" OR "{run}"*)'
+    return '"' + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + '"'
+
+
+def match_expression(query):
+    """把用户输入的查询（空格分隔的多个词，需全部命中）转换为FTS5 MATCH表达式，没有可检索的文字时返回None"""
+    phrases = [_phrase(match.group()) for match in _CJK_RE.finditer(query or "")]
+    return " AND ".join(phrases) if phrases else None
+
+
+def _snippet(body, query, width=40):
+    """截取正文中第一个命中位置附近的文字"""
+    positions = [body.find(match.group()) for match in _CJK_RE.finditer(query or "")]
+    positions = [pos for pos in positions if pos >= 0]
+    pos = min(positions) if positions else 0
+    start = max(0, pos - width)
+    text = body[start:pos + width * 2].replace("\n", " ")
+    return ("…" if start else "") + text + ("…" if pos + width * 2 < len(body) else "")
+
+
+class SearchIndex:
+    """新闻全文索引：stories表保存原文，无内容的FTS5表stories_fts只保存二元组倒排索引"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stories ("
+            " id INTEGER PRIMARY KEY,"
+            " date TEXT NOT NULL,"
+            " story_index INTEGER NOT NULL,"
+            " title TEXT NOT NULL,"
+            " url TEXT,"
+            " body TEXT NOT NULL,"
+            " UNIQUE (date, story_index))"
+        )
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS stories_fts USING fts5("
+                " title, body, content='', tokenize='unicode61 remove_diacritics 0')"
+            )
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"当前Python的SQLite不支持FTS5全文索引: {e}") from None
+
+    def _delete_dates(self, dates):
+        """删除指定日期已有的索引（同一天重新导入时覆盖旧内容）"""
+        for date in dates:
+            rows = self._conn.execute("SELECT id, title, body FROM stories WHERE date = ?", (date,)).fetchall()
+            if not rows:
+                continue
+            # 无内容的FTS5表删除时需要提供原来索引的词
+            self._conn.executemany(
+                "INSERT INTO stories_fts (stories_fts, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+                [(row_id, index_tokens(title), index_tokens(body)) for row_id, title, body in rows])
+            self._conn.execute("DELETE FROM stories WHERE date = ?", (date,))
+
+    def add_records(self, records):
+        """在一个事务中写入多天的记录（xwlb_export的记录格式），已有的日期会被覆盖，返回写入的条数"""
+        records = list(records)
+        if not records:
+            return 0
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete_dates(dict.fromkeys(record["date"] for record in records))
+            for record in records:
+                cursor = self._conn.execute(
+                    "INSERT INTO stories (date, story_index, title, url, body) VALUES (?, ?, ?, ?, ?)",
+                    (record["date"], record["story_index"], record["title"], record["url"], record["body"]))
+                self._conn.execute("INSERT INTO stories_fts (rowid, title, body) VALUES (?, ?, ?)",
+                                   (cursor.lastrowid, index_tokens(record["title"]), index_tokens(record["body"])))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return len(records)
+
+    def add_broadcast(self, date, detailed_news):
+        """写入get_latest_xwlb_text抓取到的一天新闻"""
+        return self.add_records(broadcast_records(date, detailed_news))
+
+    def search(self, query="", start=None, end=None, title=None, limit=20):
+        """检索新闻，返回按日期倒序排列的结果字典列表
+
+        query: 空格分隔的多个词，全部命中才返回
+        start/end: 日期范围（包含两端）
+        title: 只返回标题中包含这些词的新闻
+        """
+        conditions = []
+        if query and match_expression(query):
+            conditions.append(f"body : ({match_expression(query)})")
+        if title and match_expression(title):
+            conditions.append(f"title : ({match_expression(title)})")
+        if not conditions:
+            return []
+
+        sql = ("SELECT s.date, s.story_index, s.title, s.url, s.body FROM stories_fts"
+               " JOIN stories s ON s.id = stories_fts.rowid WHERE stories_fts MATCH ?")
+        params = [" AND ".join(conditions)]
+        if start:
+            sql += " AND s.date >= ?"
+            params.append(normalize_date(start))
+        if end:
+            sql += " AND s.date <= ?"
+            params.append(normalize_date(end))
+        sql += " ORDER BY s.date DESC, s.story_index LIMIT ?"
+        params.append(limit)
+        results = []
+        for date, story_index, story_title, url, body in self._conn.execute(sql, params):
+            results.append({"date": date, "story_index": story_index, "title": story_title, "url": url,
+                            "snippet": _snippet(body, query or title)})
+        return results
+
+    def count(self):
+        """返回索引中的新闻条数"""
+        return self._conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def import_archive(index, paths, batch_days=IMPORT_BATCH_DAYS, jobs=None):
+    """把已保存的文字版文件批量导入索引，文件由jobs个进程并行解析，每batch_days天一个事务，返回(文件数, 新闻条数)"""
+    files = 0
+    stories = 0
+    batch = []
+    batch_count = 0
+    for path, records in iter_markdown_archives(paths, jobs):
+        if not records:
+            print(f"跳过无法识别的文件: {path}")
+            continue
+        files += 1
+        batch.extend(records)
+        batch_count += 1
+        if batch_count >= batch_days:
+            stories += index.add_records(batch)
+            batch = []
+            batch_count = 0
+    stories += index.add_records(batch)
+    return files, stories
+
+
+def main(argv=None):
+    """search和import-archive子命令的入口"""
+    parser = argparse.ArgumentParser(prog="xwlb_scraper.py", description="新闻联播文字版的本地全文检索")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="检索已索引的新闻")
+    search.add_argument("query", nargs="*", help="检索词，多个词需全部命中")
+    search.add_argument("--start", help="开始日期（YYYYMMDD）", default=None)
+    search.add_argument("--end", help="结束日期（YYYYMMDD，包含该日）", default=None)
+    search.add_argument("--title", help="只检索标题中包含该词的新闻", default=None)
+    search.add_argument("--limit", help="最多返回的条数，默认20", type=int, default=20)
+    search.add_argument("--index", help=f"索引文件，默认{DEFAULT_INDEX_PATH}", default=DEFAULT_INDEX_PATH)
+
+    importer = subparsers.add_parser("import-archive", help="把已保存的文字版文件导入索引")
+    importer.add_argument("paths", nargs="+", help="文字版文件或目录")
+    importer.add_argument("--index", help=f"索引文件，默认{DEFAULT_INDEX_PATH}", default=DEFAULT_INDEX_PATH)
+    importer.add_argument("--jobs", help="并行解析文件的进程数，默认为CPU数", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        index = SearchIndex(args.index)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    if args.command == "import-archive":
+        start_time = time.time()
+        files, stories = import_archive(index, archive_paths(args.paths), jobs=args.jobs)
+        print(f"已导入 {files} 个文件，共 {stories} 条新闻，用时 {time.time() - start_time:.1f} 秒")
+    else:
+        query = " ".join(args.query)
+        if not match_expression(query) and not match_expression(args.title):
+            parser.error("请指定检索词或--title")
+        start_time = time.perf_counter()
+        results = index.search(query, start=args.start, end=args.end, title=args.title, limit=args.limit)
+        elapsed = (time.perf_counter() - start_time) * 1000
+        for result in results:
+            print(f"{result['date']}  {result['title']}")
+            print(f"    {result['snippet']}")
+        print(f"\n共 {len(results)} 条结果，用时 {elapsed:.1f} 毫秒")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""联播快讯的条目切分：用Aho-Corasick自动机找出条目开头的触发词，再用句末状态机一次线性扫描确定条目边界
+
+切分结果与原来的entry_pattern正则（LEGACY_ENTRY_PATTERN）完全一致，但运行时间与文本长度成线性关系，
+不会因为回溯而在长文本上变慢。
+"""
+
+import re
+import threading
+from collections import deque
+
+# 条目开头的触发词：时间词、地名和机构名
+DEFAULT_TRIGGER_WORDS = (
+    "今天", "昨日", "近日", "国家", "上海", "北京", "广东", "海南", "福建", "山东", "江苏", "浙江",
+    "河北", "河南", "湖北", "湖南", "四川", "陕西", "甘肃", "青海", "新疆", "西藏", "内蒙古", "辽宁",
+    "吉林", "黑龙江", "天津", "重庆", "广西", "宁夏", "山西", "安徽", "江西", "贵州", "云南", "香港",
+    "澳门", "台湾", "美国", "英国", "法国", "德国", "日本", "韩国", "俄罗斯", "联合国", "国际",
+    "黎巴嫩", "以色列", "伊朗",
+)
+
+# 句末标点
+SENTENCE_END = frozenset("。！？")
+
+# 原来在get_news_content中使用的切分正则，仅供测试和基准对比
+LEGACY_ENTRY_PATTERN = r"((?:[0-9]+条|今天|昨日|近日|[0-9]{4}年[0-9]{1,2}月[0-9]{1,2}日|国家|上海|北京|广东|海南|福建|山东|江苏|浙江|河北|河南|湖北|湖南|四川|陕西|甘肃|青海|新疆|西藏|内蒙古|辽宁|吉林|黑龙江|天津|重庆|广西|宁夏|山西|安徽|江西|贵州|云南|香港|澳门|台湾|美国|英国|法国|德国|日本|韩国|俄罗斯|联合国|国际|黎巴嫩|以色列|伊朗)[^。！？]*[。！？]+(?:[^。！？]*[。！？]+)*?)(?=(?:[0-9]+条|今天|昨日|近日|[0-9]{4}年[0-9]{1,2}月[0-9]{1,2}日|国家|上海|北京|广东|海南|福建|山东|江苏|浙江|河北|河南|湖北|湖南|四川|陕西|甘肃|青海|新疆|西藏|内蒙古|辽宁|吉林|黑龙江|天津|重庆|广西|宁夏|山西|安徽|江西|贵州|云南|香港|澳门|台湾|美国|英国|法国|德国|日本|韩国|俄罗斯|联合国|国际|黎巴嫩|以色列|伊朗)[^。！？]*[。！？]|$)"
+
+
+_DIGITS_RE = re.compile(r"[0-9]+")
+# 紧跟在4位数字之后的"年M月D日"
+_DATE_TAIL_RE = re.compile(r"年[0-9]{1,2}月[0-9]{1,2}日")
+_END_RUN_RE = re.compile(r"[。！？]+")
+
+
+def load_trigger_words(path):
+    """从文件读取额外的触发词，每行一个，忽略空行和#开头的注释"""
+    words = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                words.append(line)
+    return words
+
+
+class FlashSegmenter:
+    """联播快讯条目切分器
+
+    条目从触发词开始（固定的触发词，以及"数字+条"和"YYYY年M月D日"两种形式），
+    至少包含一个完整的句子，在下一个"触发词+完整句子"之前或文本末尾结束。
+    """
+
+    def __init__(self, words=DEFAULT_TRIGGER_WORDS, extra_words=()):
+        self.words = tuple(dict.fromkeys(w for w in tuple(words) + tuple(extra_words) if w))
+        self.extra_words = tuple(w for w in self.words if w not in words)
+        for word in self.words:
+            if any(char in SENTENCE_END for char in word):
+                raise ValueError(f"触发词不能包含句末标点: {word}")
+        self._build_automaton()
+
+    def _build_automaton(self):
+        """构建Aho-Corasick自动机：goto表、失败指针和每个状态匹配到的触发词长度"""
+        goto = [{}]
+        lengths = [()]
+        for word in self.words:
+            state = 0
+            for char in word:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    lengths.append(())
+                state = nxt
+            lengths[state] = lengths[state] + (len(word),)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0) if goto[f].get(char, 0) != nxt else 0
+                lengths[nxt] = lengths[nxt] + lengths[fail[nxt]]
+        self._goto = goto
+        # 所有触发词首字组成的字符类（没有固定触发词时永不匹配）
+        self._root_re = re.compile("[" + "".join(re.escape(char) for char in goto[0]) + "]" if goto[0] else "(?!)")
+        self._fail = fail
+        self._lengths = lengths
+
+    def trigger_starts(self, text):
+        """返回所有触发词开头的位置（升序）"""
+        starts = set()
+
+        # 固定触发词：Aho-Corasick一次扫描；自动机在初始状态时，用字符类直接跳到下一个可能的首字
+        goto, fail, lengths = self._goto, self._fail, self._lengths
+        root_search = self._root_re.search
+        n = len(text)
+        state = 0
+        i = 0
+        while i < n:
+            if not state:
+                match = root_search(text, i)
+                if match is None:
+                    break
+                i = match.start()
+            char = text[i]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in lengths[state]:
+                starts.add(i - length + 1)
+            i += 1
+
+        # "数字+条"和"YYYY年M月D日"：按连续数字段判断
+        for match in _DIGITS_RE.finditer(text):
+            run_start, run_end = match.span()
+            if run_end < n and text[run_end] == "条":
+                starts.update(range(run_start, run_end))
+            elif run_end - run_start >= 4 and _DATE_TAIL_RE.match(text, run_end):
+                starts.add(run_end - 4)
+        return sorted(starts)
+
+    def split(self, text):
+        """把快讯正文切分为条目列表"""
+        n = len(text)
+        starts = self.trigger_starts(text)
+        if not starts:
+            return []
+        start_set = set(starts)
+
+        # 句末状态机：每段连续句末标点结束的位置是候选边界。
+        # 边界需满足：到达文本末尾（或末尾换行之前），或者后面紧跟触发词且之后还有句末标点
+        run_ends = [match.end() for match in _END_RUN_RE.finditer(text)]
+        if not run_ends:
+            return []
+        last_end_mark = run_ends[-1] - 1
+        boundaries = [e for e in run_ends
+                      if e == n or (e == n - 1 and text[e] == "\n") or (e in start_set and last_end_mark > e)]
+
+        # 从每个触发词开始，到其后第一个合法边界为止是一个条目；条目之间不重叠
+        entries = []
+        pos = 0
+        k = 0
+        for start in starts:
+            if start < pos:
+                continue
+            while k < len(boundaries) and boundaries[k] <= start:
+                k += 1
+            if k == len(boundaries):
+                # 之后再也没有合法边界，后面的位置也不可能组成条目
+                break
+            pos = boundaries[k]
+            entries.append(text[start:pos])
+        return entries
+
+
+_default_segmenter = None
+_default_lock = threading.Lock()
+
+
+def get_default_segmenter():
+    """返回进程内共享的默认切分器"""
+    global _default_segmenter
+    with _default_lock:
+        if _default_segmenter is None:
+            _default_segmenter = FlashSegmenter()
+        return _default_segmenter
+
+
+def configure_default_segmenter(extra_words=()):
+    """在默认触发词之外加入额外的触发词，替换默认切分器"""
+    global _default_segmenter
+    with _default_lock:
+        _default_segmenter = FlashSegmenter(extra_words=extra_words)
+        return _default_segmenter
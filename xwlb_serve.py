@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""本地HTTP服务：常驻进程按需提供文字版，避免每次调用都冷启动Python、重新抓取并读写磁盘
+
+    GET /broadcast/20251226        Markdown文字版（与命令行生成的文件相同）
+    GET /broadcast/20251226.json   结构化记录（由文字版解析，xwlb_export的格式，url为null），也可以用?format=json
+    GET /latest                    最新一天，同样支持.json和?format=json
+    GET /stats                     缓存命中、抓取和合并请求的统计
+
+解析好的结果保存在按字节数限制大小的内存LRU中，命中时直接返回预先编码好的响应体。
+没有命中时先读输出目录中已保存的文件，再没有才抓取（并把文件写入输出目录）；
+同一天的并发请求只触发一次读取或抓取，其余请求等待同一个结果。
+最近两天（北京时间）的节目可能还在更新，内存和磁盘中的结果只使用LATEST_TTL秒。
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from xwlb_archive import BroadcastArchive
+from xwlb_export import normalize_date, parse_markdown_archive
+from xwlb_markdown import output_filename_for
+from xwlb_scraper import get_latest_xwlb_text, resolve_broadcast, DEFAULT_MAX_WORKERS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 内存LRU的大小上限（字节，按Markdown和JSON响应体合计）
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+# 最近两天的结果以及"最新一天是哪天"的有效期（秒）
+LATEST_TTL = 300
+
+BEIJING = timezone(timedelta(hours=8))
+MARKDOWN_TYPE = "text/markdown; charset=utf-8"
+JSON_TYPE = "application/json; charset=utf-8"
+
+
+class NotFound(LookupError):
+    """指定日期没有节目或抓取失败"""
+
+
+class Broadcast:
+    """内存中的一天：预先编码好的Markdown和JSON响应体"""
+
+    __slots__ = ("date", "markdown", "json", "expires")
+
+    def __init__(self, date, markdown, records, expires=None):
+        self.date = date
+        self.markdown = markdown.encode("utf-8")
+        self.json = json.dumps({"date": date, "records": records}, ensure_ascii=False).encode("utf-8")
+        self.expires = expires
+
+    @property
+    def size(self):
+        return len(self.markdown) + len(self.json)
+
+    def body(self, fmt):
+        return (self.json, JSON_TYPE) if fmt == "json" else (self.markdown, MARKDOWN_TYPE)
+
+
+class _Call:
+    """一次进行中的读取或抓取，同一个键的并发请求等待同一个结果"""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _is_settled(date, now=None):
+    """两天以前的节目不会再变化"""
+    today = (now or datetime.now(timezone.utc)).astimezone(BEIJING).date()
+    return datetime.strptime(date, "%Y-%m-%d").date() < today - timedelta(days=1)
+
+
+class BroadcastStore:
+    """按日期提供解析好的文字版：内存LRU -> 输出目录中的文件 -> 抓取，线程安全"""
+
+    def __init__(self, client, output_dir=".", max_bytes=DEFAULT_MEMORY_BYTES, max_workers=DEFAULT_MAX_WORKERS,
+                 clock=time.monotonic, archive_path=None):
+        """archive_path: 可选的xwlb_archive单文件归档，没有对应的文件时从归档中读取（只读打开）"""
+        self.client = client
+        self.archive_path = archive_path
+        self.archive = None
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._calls = {}
+        self._latest = None
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "disk_loads": 0, "scrapes": 0, "evictions": 0}
+
+    def _expires(self, date):
+        return None if _is_settled(date) else self.clock() + LATEST_TTL
+
+    def _lookup(self, date):
+        with self._lock:
+            entry = self._entries.get(date)
+            if entry is not None and entry.expires is not None and entry.expires <= self.clock():
+                self._remove(date)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(date)
+                self.stats["hits"] += 1
+            return entry
+
+    def _remove(self, date):
+        entry = self._entries.pop(date)
+        self._bytes -= entry.size
+
+    def _insert(self, entry):
+        with self._lock:
+            if entry.date in self._entries:
+                self._remove(entry.date)
+            if entry.size > self.max_bytes:
+                return
+            self._entries[entry.date] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _coalesced(self, key, load):
+        """同一个键同时只执行一次load，其余调用者等待它的结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            call.event.wait()
+        else:
+            try:
+                call.result = load()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def get(self, date):
+        """返回指定日期（YYYY-MM-DD）的Broadcast，没有节目时抛出NotFound"""
+        entry = self._lookup(date)
+        if entry is not None:
+            return entry
+        return self._coalesced(date, lambda: self._lookup(date) or self._load(date))
+
+    def latest(self):
+        """返回最新一天的Broadcast；最新日期在LATEST_TTL秒内直接使用上次的结果
+
+        先确定最新一天是哪天，再按日期读取或抓取：与同时到达的/broadcast/{该日期}合并为一次抓取，
+        不会有两个抓取同时写同一天的文件。
+        """
+        latest = self._latest
+        if latest is not None and latest[1] > self.clock():
+            date = latest[0]
+        else:
+            date = self._coalesced("latest", self._resolve_latest)
+        return self.get(date)
+
+    def _resolve_latest(self):
+        resolved = resolve_broadcast(self.client)
+        if resolved is None or resolved[2] is None:
+            raise NotFound("未找到最新一天的新闻联播文字版")
+        date = resolved[2].strftime("%Y-%m-%d")
+        self._latest = (date, self.clock() + LATEST_TTL)
+        return date
+
+    def _path_for(self, date):
+        date_str = datetime.strptime(date, "%Y-%m-%d").strftime("%Y年%m月%d日")
+        return os.path.join(self.output_dir, output_filename_for(date_str))
+
+    def _load(self, date):
+        path = self._path_for(date)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            fresh = _is_settled(date) or age < LATEST_TTL
+        except OSError:
+            fresh = False
+        markdown = None
+        if fresh:
+            with open(path, encoding="utf-8") as f:
+                markdown = f.read()
+        elif self.archive_path and _is_settled(date):
+            markdown = self._from_archive(date)
+        if markdown is not None:
+            records = parse_markdown_archive(markdown, date)
+            if records:
+                entry = Broadcast(date, markdown, records, self._expires(date))
+                self._insert(entry)
+                with self._lock:
+                    self.stats["disk_loads"] += 1
+                return entry
+        return self._scrape(date)
+
+    def _from_archive(self, date):
+        """从归档中读取一天，归档文件还不存在时返回None（之后创建的归档在下次读取时打开）"""
+        with self._lock:
+            if self.archive is None and os.path.exists(self.archive_path):
+                self.archive = BroadcastArchive(self.archive_path, readonly=True)
+            archive = self.archive
+        return archive.get(date) if archive is not None else None
+
+    def _scrape(self, date):
+        with self._lock:
+            self.stats["scrapes"] += 1
+        data = get_latest_xwlb_text(datetime.strptime(date, "%Y-%m-%d"), max_workers=self.max_workers,
+                                    client=self.client, output_dir=self.output_dir)
+        if not data or not data["detailed_news"]:
+            raise NotFound(f"未找到{date}的新闻联播文字版")
+        with open(data["filename"], encoding="utf-8") as f:
+            markdown = f.read()
+        # 与从输出目录或归档读取时一样由写出的文件解析记录，同一天的JSON不因来源不同而不同
+        entry = Broadcast(date, markdown, parse_markdown_archive(markdown, date), self._expires(date))
+        self._insert(entry)
+        return entry
+
+    def format_stats(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self._bytes}
+
+
+class BroadcastHandler(BaseHTTPRequestHandler):
+    """/broadcast/{date}、/latest和/stats，store保存在server.store中"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        fmt = parse_qs(url.query).get("format", ["md"])[0]
+        for suffix in (".json", ".md"):
+            if path.endswith(suffix):
+                path, fmt = path[:-len(suffix)], suffix[1:]
+        if fmt not in ("md", "json"):
+            return self._send_error(400, f"不支持的格式: {fmt}")
+
+        store = self.server.store
+        try:
+            if path == "/stats":
+                body = json.dumps(store.format_stats(), ensure_ascii=False).encode("utf-8")
+                return self._send(200, body, JSON_TYPE)
+            if path == "/latest":
+                entry = store.latest()
+            elif path.startswith("/broadcast/"):
+                date = normalize_date(path[len("/broadcast/"):])
+                try:
+                    datetime.strptime(date or "", "%Y-%m-%d")
+                except ValueError:
+                    return self._send_error(400, "日期格式错误，请使用YYYYMMDD或YYYY-MM-DD格式")
+                entry = store.get(date)
+            else:
+                return self._send_error(404, "未知的路径")
+        except NotFound as e:
+            return self._send_error(404, str(e))
+        except Exception as e:
+            return self._send_error(500, f"处理请求时出错: {e}")
+        body, content_type = entry.body(fmt)
+        self._send(200, body, content_type)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, JSON_TYPE)
+
+
+def make_server(store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """创建每个请求一个线程的HTTP服务，port为0时使用任意空闲端口"""
+    server = ThreadingHTTPServer((host, port), BroadcastHandler)
+    server.daemon_threads = True
+    server.store = store
+    return server
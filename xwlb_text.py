@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""新闻正文清理：去掉编辑信息和"央视网消息（新闻联播）："，去掉紧邻的重复行，规范空行"""
+
+import re
+
+from xwlb_metrics import stage, STAGE_CLEANUP
+
+# 需要删除的固定文本，一次扫描全部去掉：
+# "编辑：...责任编辑："（同一行内）、单独的"责任编辑："和"编辑："、"刘亮"、"央视网消息（新闻联播）："
+_REMOVE_RE = re.compile(r"编辑：[^\n]*?责任编辑：|责任编辑：|编辑：|刘亮|央视网消息（新闻联播）：")
+_SPACES_RE = re.compile(r"[ \t]+")
+
+NEWS_SOURCE_PREFIX = "央视网消息（新闻联播）："
+
+
+def _dedup_and_normalize_lines(text):
+    """一次遍历所有行：下一行与当前行的结尾完全相同时去掉下一行，连续的多个空行合并为一个"""
+    lines = text.split("\n")
+    last = len(lines) - 1
+    out = []
+    i = 0
+    while i <= last:
+        line = lines[i]
+        if not line:
+            # 连续空行只保留一个（即段落之间最多空一行）
+            if out and not out[-1]:
+                i += 1
+                continue
+        elif i + 1 < last and lines[i + 1] and line.endswith(lines[i + 1]):
+            # 与正则 (.+?)\n\1\n -> \1\n 相同：去掉紧跟其后的重复行
+            out.append(line)
+            i += 2
+            continue
+        out.append(line)
+        i += 1
+    return "\n".join(out)
+
+
+def clean_text(text):
+    """清理新闻正文，所有提取分支共用
+
+    依次完成：删除编辑信息和"央视网消息（新闻联播）："、删除紧邻的重复行、
+    将三个及以上的换行合并为一个空行、去掉首尾空白
+    """
+    if not text:
+        return ""
+    with stage(STAGE_CLEANUP):
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        text = _REMOVE_RE.sub("", text)
+        return _dedup_and_normalize_lines(text).strip()
+
+
+def clean_title(title):
+    """清理标题：去掉首尾空白和"央视网消息（新闻联播）：\""""
+    return title.replace(NEWS_SOURCE_PREFIX, "").strip()
+
+
+def collapse_spaces(text):
+    """将连续的空格和制表符合并为一个空格，保留换行符"""
+    return _SPACES_RE.sub(" ", text).strip()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""监视模式：长时间运行，按自适应的间隔轮询最新列表页，增量抓取新发布的新闻
+
+每次轮询都对列表页做条件请求，没有变化时服务器只返回304；列表页变化时比较VIDE链接集合，
+只抓取还没抓过的新闻。链接集合连续几次轮询都不再变化时认为当天的节目已经完整，
+重新生成当天的输出文件（之后又出现新链接时会再次重写）。轮询间隔在播出时段前后缩短，
+其余时间放长；已抓到的新闻保存在输出目录的状态文件中，重启后不会重新抓取。
+"""
+
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from xwlb_html import extract_vide_links
+from xwlb_markdown import output_filename_for, output_lock, render_document
+from xwlb_metrics import stage, STAGE_LIST_PAGE, STAGE_WRITE
+from xwlb_scraper import iter_news_contents, select_program_link, DEFAULT_MAX_WORKERS, BASE_URL, HEADERS, MAX_STORIES
+
+LIST_URL = f"{BASE_URL}/lm/xwlb/"
+
+# 新闻联播19:00播出，单条新闻在播出后陆续发布；这段时间内按短间隔轮询（北京时间）
+BEIJING = timezone(timedelta(hours=8))
+WINDOW_START = (18, 55)
+WINDOW_END = (21, 30)
+# 播出时段内或当天节目还不完整时的轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 60
+# 其余时间的轮询间隔（秒），不会越过下一个播出时段的开始
+DEFAULT_IDLE_INTERVAL = 1800
+# 链接集合连续这么多次轮询没有变化，就认为当天的节目已经完整
+DEFAULT_SETTLE_POLLS = 3
+# 状态文件名，保存在输出目录下
+STATE_FILENAME = ".xwlb_watch.json"
+
+_DATE_PATH_RE = re.compile(r"/(\d{4})/(\d{2})/(\d{2})/")
+
+
+def _link_date(link):
+    match = _DATE_PATH_RE.search(link)
+    return "".join(match.groups()) if match else None
+
+
+def latest_day_links(vide_links):
+    """从列表页的VIDE链接中取出最新一天的链接，返回(日期YYYYMMDD, 链接列表)"""
+    dated = [(date_num, link) for link in vide_links for date_num in [_link_date(link)] if date_num]
+    if not dated:
+        return None, []
+    latest = max(date_num for date_num, _ in dated)
+    return latest, [link for date_num, link in dated if date_num == latest]
+
+
+def _in_window(local):
+    return WINDOW_START <= (local.hour, local.minute) < WINDOW_END
+
+
+def _until_window(local):
+    """距下一个播出时段开始的秒数"""
+    start = local.replace(hour=WINDOW_START[0], minute=WINDOW_START[1], second=0, microsecond=0)
+    if start <= local:
+        start += timedelta(days=1)
+    return (start - local).total_seconds()
+
+
+class BroadcastWatcher:
+    """轮询列表页并增量抓取最新一天的新闻，完整时重写当天的输出文件"""
+
+    def __init__(self, client, output_dir=".", max_workers=DEFAULT_MAX_WORKERS, poll_interval=DEFAULT_POLL_INTERVAL,
+                 idle_interval=DEFAULT_IDLE_INTERVAL, settle_polls=DEFAULT_SETTLE_POLLS, on_complete=None):
+        """on_complete: 每次写出完整的一天后调用 on_complete(date_str, detailed_news, path)"""
+        self.client = client
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.idle_interval = idle_interval
+        self.settle_polls = settle_polls
+        self.on_complete = on_complete
+        self.state_path = os.path.join(output_dir, STATE_FILENAME)
+        self.date_num = None
+        self.links = []
+        self.stories = {}
+        self.written = None
+        self.stable = 0
+        self.validators = {}
+        self.stats = {"polls": 0, "not_modified": 0, "fetched": 0, "writes": 0, "errors": 0}
+        self._load_state()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            # 损坏的状态文件直接重新抓取
+            return
+        self.date_num = state.get("date")
+        self.links = state.get("links", [])
+        self.stories = state.get("stories", {})
+        self.written = state.get("written")
+        self.validators = state.get("validators", {})
+
+    def _save_state(self):
+        data = json.dumps({"date": self.date_num, "links": self.links, "stories": self.stories,
+                           "written": self.written, "validators": self.validators}, ensure_ascii=False)
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.state_path)
+
+    def story_links(self):
+        """当前链接集合中除完整节目外的单条新闻链接（最多MAX_STORIES条）"""
+        if not self.links:
+            return []
+        program_url = select_program_link(self.links)
+        return [link for link in self.links if link != program_url][:MAX_STORIES]
+
+    def detailed_news(self):
+        return [self.stories[link] for link in self.story_links() if link in self.stories]
+
+    @property
+    def complete(self):
+        """当天的节目已经完整且已经写出"""
+        included = [link for link in self.story_links() if link in self.stories]
+        return self.stable >= self.settle_polls and self.written == included
+
+    def _fetch_list_page(self):
+        """条件请求列表页，返回页面的原始内容；没有变化时返回None"""
+        with stage(STAGE_LIST_PAGE) as timer:
+            response = self.client.get(LIST_URL, headers={**HEADERS, **self.validators}, revalidate=True)
+            if response.status_code == 304 or getattr(response, "from_cache", False):
+                # 已经解析过列表页时304表示没有变化；刚启动时缓存中的页面仍需解析一次
+                if self.links:
+                    return None
+                if response.status_code == 304:
+                    self.validators = {}
+                    return None
+            elif response.status_code != 200:
+                raise LookupError(f"列表页访问失败 (状态码: {response.status_code})")
+            response.encoding = "utf-8"
+            timer.add_bytes(len(response.content))
+            self.validators = {}
+            if response.headers.get("ETag"):
+                self.validators["If-None-Match"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                self.validators["If-Modified-Since"] = response.headers["Last-Modified"]
+            return response.content
+
+    def poll_once(self):
+        """轮询一次：列表页有变化时抓取新出现的新闻，链接集合稳定后重写输出文件，返回新抓到的新闻数"""
+        self.stats["polls"] += 1
+        try:
+            html = self._fetch_list_page()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"轮询列表页时出错: {e}")
+            return 0
+
+        if html is None:
+            self.stats["not_modified"] += 1
+            self.stable += 1
+        else:
+            date_num, links = latest_day_links(list(dict.fromkeys(extract_vide_links(html, BASE_URL))))
+            if date_num is None:
+                print("列表页中没有找到VIDE链接")
+                self.stable += 1
+            elif date_num != self.date_num:
+                print(f"发现新的一天: {date_num}，{len(links)} 个VIDE链接")
+                self.date_num, self.links, self.stories, self.written, self.stable = date_num, links, {}, None, 0
+            elif links != self.links:
+                print(f"链接有变化: {len(self.links)} -> {len(links)} 个VIDE链接")
+                self.links, self.stable = links, 0
+            else:
+                self.stable += 1
+
+        # 只抓取还没有抓到的新闻；之前失败的新闻每次轮询都会重试
+        pending = [link for link in self.story_links() if link not in self.stories]
+        fetched = 0
+        if pending:
+            print(f"抓取 {len(pending)} 条新的新闻...")
+            for link, news in zip(pending, iter_news_contents(pending, HEADERS, max_workers=self.max_workers,
+                                                               client=self.client)):
+                if news and news["content"]:
+                    self.stories[link] = news
+                    fetched += 1
+            self.stats["fetched"] += fetched
+
+        if self.stable >= self.settle_polls and not self.complete:
+            self._write_output()
+        if html is not None or fetched or pending:
+            self._save_state()
+        return fetched
+
+    def _write_output(self):
+        detailed_news = self.detailed_news()
+        if not detailed_news:
+            return
+        date_str = datetime.strptime(self.date_num, "%Y%m%d").strftime("%Y年%m月%d日")
+        path = os.path.join(self.output_dir, output_filename_for(date_str))
+        content = render_document(date_str, detailed_news)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        # 与同一天的其他抓取（--date、回填、--serve）使用同一个输出锁，不会互相覆盖
+        with output_lock(path):
+            with stage(STAGE_WRITE) as timer, open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+                timer.add_bytes(f.tell())
+            os.replace(tmp_path, path)
+        self.written = [news["url"] for news in detailed_news]
+        self.stats["writes"] += 1
+        self._save_state()
+        print(f"{date_str}的节目已完整（{len(detailed_news)} 条新闻），已写入: {path}")
+        if self.on_complete is not None:
+            self.on_complete(date_str, detailed_news, path)
+
+    def next_delay(self, now=None):
+        """下一次轮询前等待的秒数：播出时段内等待新节目或当天节目还不完整时、
+        以及已抓到新闻但还没有写出时用短间隔，否则用长间隔"""
+        local = (now or datetime.now(timezone.utc)).astimezone(BEIJING)
+        waiting = self.date_num != local.strftime("%Y%m%d")
+        complete = self.complete
+        if _in_window(local) and (waiting or not complete):
+            return self.poll_interval
+        # 一条新闻都没有抓到时永远不会完整，播出时段以外不必一直按短间隔重试
+        if not complete and self.detailed_news():
+            return self.poll_interval
+        return max(self.poll_interval, min(self.idle_interval, _until_window(local)))
+
+    def format_stats(self):
+        return (f"轮询 {self.stats['polls']} 次（未变化 {self.stats['not_modified']} 次），"
+                f"抓取新闻 {self.stats['fetched']} 条，写出 {self.stats['writes']} 次，出错 {self.stats['errors']} 次")
+
+    def run(self, max_polls=None, sleep=time.sleep):
+        """持续轮询，max_polls为None时一直运行（Ctrl+C结束）"""
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            self.poll_once()
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            delay = self.next_delay()
+            print(f"{self.format_stats()}；{delay:.0f}秒后再次检查")
+            sleep(delay)